@@ -1,21 +1,69 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 from array import array
+import collections
+import itertools
 import logging
+import queue
 import socket
 import struct
 import threading
 import time
+from typing import Callable  # noqa
 from typing import Dict
 from typing import Optional
 from typing import Tuple  # noqa
+from typing import Union  # noqa
 from typing import List  # noqa
 
+import numpy as np
+
 from pyslmpclient import const
+from pyslmpclient import timer
 from pyslmpclient import util
+from pyslmpclient import address
+from pyslmpclient.address import to_spec
+from pyslmpclient.retransmit import Retransmitter
+from pyslmpclient.trace import RECV
+from pyslmpclient.trace import SEND
 
 VERSION = "0.0.1"
 """バージョン表記(major.minor.serial)"""
+FILE_CHUNK_SIZE = 1920
+"""ファイルの読み書き1回あたりの最大バイト数"""
+MEMORY_CHUNK_WORDS = 480
+"""メモリの読み書き1回あたりの最大ワード数"""
+EXTEND_UNIT_CHUNK_SIZE = 1920
+"""インテリジェント機能ユニットのバッファメモリの読み書き1回あたりの最大バイト数"""
+ON_DEMAND_QUEUE_SIZE = 64
+"""受信したオンデマンド送信データを保持する最大数"""
+RECV_BUFFER_SIZE = 8192
+"""1回の受信で読み出す最大バイト数"""
+WORD_CHUNK_WORDS = 960
+"""ワード単位の一括読み出し1回あたりの最大ワード数"""
+RANDOM_CHUNK_POINTS = 192
+"""ランダム読み出し1回あたりの最大点数"""
+RANDOM_CHUNK_POINTS_EXTENDED = 96
+"""4バイトアドレス(サブコマンド0x0002)でのランダム読み出し1回あたりの最大点数"""
+LABEL_CACHE_SIZE = 256
+"""キャッシュするラベルの要求電文と応答電文の書式の最大数"""
+COMPLETED_HOLD = 2.0
+"""応答を受け取った要求のシリアル番号を、重複した応答の判別のために覚えておく時間[sec]"""
+
+_LENGTH = struct.Struct("<H")
+"""ラベルの読み出し結果のデータ長"""
+
+
+def _wait_seconds(timeout):
+    """監視タイマの値から応答を待つ時間を求める
+
+    :param int timeout: 監視タイマ 250msec単位、0の場合は無制限
+    :return: 応答を待つ時間[sec]、無制限の場合は100秒
+    :rtype: float
+    """
+    if timeout == 0:
+        return 100
+    return timeout * 0.25
 
 
 class SLMPClient(object):
@@ -37,34 +85,60 @@ class SLMPClient(object):
         assert 0 < port, port
         self.__addr = (addr, port)
         """IPアドレス, ポート番号
-        
+
         このまま :py:func:`socket.socket` の引数になる
-        
+
          :type: str, int"""
+        self.__endpoint = "%s:%d" % self.__addr
+        """計測値で接続先を区別する名前"""
         assert ver in (3, 4), ver
         self.__protocol = (binary, ver, tcp)
         """バイナリ, フレームバージョン, TCP
-        
+
         :type: bool, int, bool"""
         self.__socket = None  # type: Optional[socket.socket]
-        self.__seq = 0  # type: int
-        """コマンドに付加するシーケンス番号
-        
-         :type: int"""
+        self.__serial = itertools.count()
+        """コマンドに付加するシリアル番号の払い出し、nextは他のスレッドと競合しない"""
         self.__recv_queue = (
             dict()
-        )  # type: Dict[int, (int, int, int, int, int, bytes)]
+        )  # type: Dict[int, Union[util.Response, OSError]]
+        self.__recv_cond = threading.Condition(threading.Lock())
+        """受信キューの保護と応答の到着の通知"""
+        self.__deadlines = timer.TimerWheel(time.monotonic())
+        """応答を受け取る要求の期限、受信キューと同じロックで保護する"""
+        self.__completed = timer.TimerWheel(time.monotonic())
+        """応答を受け取り済みの要求のシリアル番号(4Eフレームのみ)、
+        受信キューと同じロックで保護する"""
+        self.dropped_replies = 0
+        """期限切れや、応答を待たない要求のため捨てた応答の数
+
+        :type: int"""
+        self.expired_replies = 0
+        """受け取られないまま期限の切れた応答の数
+
+        :type: int"""
+        self.duplicate_replies = 0
+        """同じシリアル番号に対して重複して受信した応答の数
+
+        :type: int"""
+        self.__retransmitter = None  # type: Optional[Retransmitter]
+        self.__send_lock = threading.Lock()
+        """送信(sendall)のみを保護する"""
         self.__lock = threading.Lock()
+        """接続の開始と終了、モニタ登録の内訳を保護する"""
         self.target = util.Target()
         """通信対象(接続先と通信対象は別個に指定する)
-        
+
         :type: :class:`pyslmpclient.util.Target`"""
         self.__rest = b""
+        self.__recv_buf = bytearray(RECV_BUFFER_SIZE)
+        """受信用のバッファ、受信毎に確保しないよう使いまわす"""
+        self.__recv_view = memoryview(self.__recv_buf)
         self.logger = logging.getLogger(__name__).getChild(
             self.__class__.__name__
         )
         """モジュールで使用するロガー
-        
+
         :type: logging.Logger"""
 
         self.__recv_thread = threading.Thread(
@@ -73,20 +147,86 @@ class SLMPClient(object):
         self.__ctx_cnt = 0
         self.__monitor_device_num = (0, 0)  # type: (int, int)
         """モニタデバイスの内訳(ワードデバイス, ダブルワードデバイス)
-        
+
         :vartype: int, int"""
+        self.__on_demand_queue = queue.Queue(ON_DEMAND_QUEUE_SIZE)
+        """受信したオンデマンド送信データ(終了コード, データ)"""
+        self.on_demand_callback = (
+            None
+        )  # type: Optional[Callable[[bytes], None]]
+        """オンデマンド送信データを受信した際に、受信スレッドから呼ばれる関数
+
+        :type: Callable[[bytes], None]"""
+        self.distribute_callback = (
+            None
+        )  # type: Optional[Callable[[bytes], None]]
+        """リアルタイムデータ収集の配信データを受信した際に、受信スレッドから呼ばれる関数
+
+        :type: Callable[[bytes], None]"""
+        self.metrics = None
+        """要求と応答の計測値の記録先、Noneの場合は計測しない
+
+        :type: pyslmpclient.metrics.ClientMetrics"""
+        self.tracer = None
+        """送受信したフレームの記録先、Noneの場合は記録しない
+
+        :type: pyslmpclient.trace.FrameTracer"""
+        self.on_connection_lost = (
+            None
+        )  # type: Optional[Callable[[OSError], None]]
+        """接続が失われた際に、受信スレッドから呼ばれる関数
+
+        :type: Callable[[OSError], None]"""
+        self.__lost = None  # type: Optional[OSError]
+        """受信スレッドが検出した接続断の原因、 :meth:`open` で解除する"""
+        self.on_demand_dropped = 0
+        """キューが一杯のため捨てたオンデマンド送信データの数
+
+        :type: int"""
+        self.__label_frames = util.LRUCache(LABEL_CACHE_SIZE)
+        """ラベル名の一覧毎の要求電文のキャッシュ"""
+        self.__label_layouts = util.LRUCache(LABEL_CACHE_SIZE)
+        """ラベル名の一覧毎の応答電文の書式と、ラベル毎のデータ長の位置と値"""
 
     def __worker(self):
-        while self.__socket:
+        sock = self.__socket
+        # 閉じられた後や、開き直した後の古いソケットの受信スレッドは何もせず終わる
+        while sock is not None and self.__socket is sock:
             try:
-                self.__recv()
+                if self.__recv(sock) is False and self.__protocol[2]:
+                    raise ConnectionResetError("接続先が切断した")
             except RuntimeError as e:
                 self.logger.error(e)
+            except OSError as e:
+                if self.__socket is not sock:  # 受信待ちの間に閉じられた
+                    return
+                self.__connection_lost(e)
+                return
+            self.__expire()
+
+    def __connection_lost(self, e):
+        """接続が失われたことを応答待ちの要求と on_connection_lost に知らせる
+
+        :param OSError e: 原因
+        """
+        self.logger.error("接続断: %r", e)
+        with self.__recv_cond:
+            self.__lost = e
+            # 再接続後も応答待ちの要求が接続断を知ることができるよう、応答の代わりに置く
+            for seq in self.__deadlines:
+                self.__recv_queue[seq] = e
+            self.__recv_cond.notify_all()
+        if self.on_connection_lost is not None:
+            self.on_connection_lost(e)
 
-    def open(self):
+    def open(self, connect_timeout=None):
         """通信の開始
 
-        必ず :meth:`close` とセットで使用する"""
+        必ず :meth:`close` とセットで使用する。
+        接続に失敗した場合は例外を送出し、 :meth:`close` は不要。
+
+        :param float connect_timeout: 接続のタイムアウト[sec]、Noneの場合はOSに任せる
+        """
         with self.__lock:
             self.__ctx_cnt += 1
         if self.__socket:
@@ -95,15 +235,20 @@ class SLMPClient(object):
             if self.__socket:
                 return
             if self.__protocol[2]:
-                self.__socket = socket.socket(
-                    socket.AF_INET, socket.SOCK_STREAM
-                )
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             else:
-                self.__socket = socket.socket(
-                    socket.AF_INET, socket.SOCK_DGRAM
-                )
-            self.__socket.connect(self.__addr)
-            self.__socket.settimeout(1)
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                if connect_timeout is not None:
+                    sock.settimeout(connect_timeout)
+                sock.connect(self.__addr)
+                sock.settimeout(1)
+            except OSError:
+                sock.close()
+                self.__ctx_cnt -= 1
+                raise
+            self.__lost = None
+            self.__socket = sock
             self.__recv_thread.start()
 
     def close(self):
@@ -114,79 +259,211 @@ class SLMPClient(object):
             self.__ctx_cnt -= 1
         if self.__socket and self.__ctx_cnt == 0:
             with self.__lock:
+                # 受信スレッドが受信待ちの解除を閉じたことによるものと判断できるよう、
+                # 先に参照を外す
+                sock, self.__socket = self.__socket, None
                 try:
-                    self.__socket.shutdown(socket.SHUT_RDWR)
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    if self.__lost is None:
+                        raise
                 finally:
-                    self.__socket.close()
-                    self.__socket = None
+                    sock.close()
                 self.__recv_thread = threading.Thread(
                     target=self.__worker, daemon=True
                 )
 
-    def __cmd_format(self, timeout, cmd, sub_cmd, data):
+    def __cmd_format(self, timeout, cmd, sub_cmd, data, collect=True):
         """コマンドにヘッダを加え送信する
 
+        フレームの作成はロックの外で行い、送信のみを他のスレッドと排他する
+
         :param int timeout: 監視タイマ 250msec単位
         :param cmd: コマンド
         :type cmd: SLMPCommand
         :param int sub_cmd: サブコマンド
-        :param bytes data: データ
+        :param data: データ、またはバイト単位のバッファの断片のタプル
+        :type data: bytes or tuple
+        :param bool collect: 応答を受け取るかどうか、
+            Falseの場合は応答を待たず、受信した応答は捨てる
         :return: 送信時に付加したシリアル番号、3Eフレーム選択時は常に0
         :rtype: int
         """
-        with self.__lock:
-            if self.__seq > 0xFF:
-                self.__seq = 0
         if not isinstance(cmd, const.SLMPCommand):
             raise ValueError(cmd)
-        if self.__protocol[0]:  # バイナリ
+        binary, ver, _ = self.__protocol
+        if ver == 4:  # 4Eフレーム
+            seq = next(self.__serial) & 0xFFFF
+        elif ver == 3:  # 3Eフレーム
+            seq = 0
+        else:
+            raise RuntimeError(ver)
+        if binary:
             make_frame = util.make_binary_frame
         else:  # ASCII
             make_frame = util.make_ascii_frame
-        with self.__lock:
-            buf = make_frame(
-                self.__seq,
-                self.target,
-                timeout,
-                cmd,
-                sub_cmd,
-                data,
-                self.__protocol[1],
-            )
-            self.__socket.sendall(buf)
-            if self.__protocol[1] == 4:  # 4Eフレーム
-                self.__seq += 1
-                return self.__seq - 1
-            elif self.__protocol[1] == 3:  # 3Eフレーム
-                return 0
-            else:
-                raise RuntimeError(self.__protocol[1])
+        buf = make_frame(seq, self.target, timeout, cmd, sub_cmd, data, ver)
+        if collect:
+            # 送信直後に応答を受信しても受け取れるよう、送信前に期限を登録する
+            with self.__recv_cond:
+                self.__recv_queue.pop(seq, None)
+                self.__completed.cancel(seq)
+                self.__deadlines.add(
+                    seq, _wait_seconds(timeout), time.monotonic()
+                )
+            retransmitter = self.__retransmitter
+            if retransmitter is not None and cmd in const.IDEMPOTENT_COMMANDS:
+                retransmitter.track(seq, buf)
+        # 送信できたフレームのみ、送信した時刻で記録する
+        tracer = self.tracer
+        metrics = self.metrics
+        if metrics is None:
+            with self.__send_lock:
+                self.__socket.sendall(buf)
+                sent = time.monotonic()
+            if tracer is not None:
+                tracer.record(SEND, buf, sent)
+            return seq
+        # 送信直後に応答を受信しても計測できるよう、送信前に登録する
+        start = time.monotonic()
+        key = metrics.on_send(
+            self.__endpoint,
+            seq,
+            self.target,
+            cmd,
+            len(buf),
+            start,
+            _wait_seconds(timeout),
+        )
+        try:
+            with self.__send_lock:
+                self.__socket.sendall(buf)
+                sent = time.monotonic()
+        except OSError:
+            metrics.on_send_failed(self.__endpoint, seq)
+            raise
+        if tracer is not None:
+            tracer.record(SEND, buf, sent)
+        metrics.on_sent(key, sent - start)
+        return seq
 
-    def __recv(self):
-        if not self.__socket:
+    def enable_retransmit(
+        self,
+        max_retries=3,
+        min_rto=0.02,
+        max_rto=2.0,
+        hedge=False,
+        hedge_quantile=0.95,
+    ):
+        """UDPで読み出し要求(:py:data:`const.IDEMPOTENT_COMMANDS`)の再送を有効にする
+
+        応答を重複して受信した場合はシリアル番号で判別して捨てるため、
+        UDPかつ4Eフレームの場合のみ使用できる。
+
+        :param int max_retries: 最大の再送回数
+        :param float min_rto: 再送タイムアウトの下限[sec]
+        :param float max_rto: 再送タイムアウトの上限[sec]
+        :param bool hedge: 応答時間の分位点を過ぎた時点で複製を送るかどうか
+        :param float hedge_quantile: 複製を送るまでの時間とする応答時間の分位点
+        :return: 再送の状態
+        :rtype: pyslmpclient.retransmit.Retransmitter
+        """
+        _, ver, tcp = self.__protocol
+        if tcp or ver != 4:
+            raise ValueError("UDPかつ4Eフレームの場合のみ再送できる")
+        self.disable_retransmit()
+        self.__retransmitter = Retransmitter(
+            self.__resend,
+            max_retries,
+            min_rto,
+            max_rto,
+            hedge,
+            hedge_quantile,
+        )
+        return self.__retransmitter
+
+    def disable_retransmit(self):
+        """再送を無効にする
+
+        :return: None
+        """
+        retransmitter, self.__retransmitter = self.__retransmitter, None
+        if retransmitter is not None:
+            retransmitter.stop()
+
+    @property
+    def retransmitter(self):
+        """再送の状態、無効の場合はNone
+
+        :rtype: Optional[pyslmpclient.retransmit.Retransmitter]
+        """
+        return self.__retransmitter
+
+    @property
+    def protocol(self):
+        """交信コードとフレームのバージョン、トランスポート
+
+        :return: (バイナリかどうか, フレームのバージョン, TCPかどうか)
+        :rtype: (bool, int, bool)
+        """
+        return self.__protocol
+
+    def __resend(self, buf):
+        """フレームを再送する
+
+        :param bytes buf: フレーム
+        :return: None
+        """
+        sock = self.__socket
+        if not sock:
             return
-        with self.__lock:
-            if not self.__socket:
-                return
-            try:
-                self.__socket.settimeout(0)
-                buf = self.__socket.recv(512)
-                self.__socket.settimeout(1)
-            except socket.timeout and BlockingIOError:
+        tracer = self.tracer
+        with self.__send_lock:
+            sock.sendall(buf)
+            sent = time.monotonic()
+        if tracer is not None:
+            tracer.record(SEND, buf, sent)
+
+    def __recv(self, sock):
+        """1フレーム分を受信して振り分ける
+
+        受信スレッドのみから呼ばれるため、持ち越しのデータはロックせずに扱う
+
+        :param socket.socket sock: 受信スレッドが受け持つソケット
+        :return: フレームを処理した場合はTrue、
+            接続先が切断した場合(TCP)や閉じられた場合はFalse
+        """
+        # 前回の受信で揃っているフレームがあれば先に処理する
+        if self.__rest and self.__dispatch(self.__rest):
+            return True
+        try:
+            size = sock.recv_into(self.__recv_buf)
+        except (socket.timeout, BlockingIOError):
+            return
+        except OSError:
+            if self.__socket is not sock:  # 受信待ちの間に閉じられた
                 return
-            buf = self.__rest + buf
-            self.__rest = b""
+            raise
+        buf = self.__rest + self.__recv_view[:size]
+        self.__rest = b""
         if not buf:
             return False
+        return self.__dispatch(buf)
+
+    def __dispatch(self, buf):
+        """受信データの先頭のフレームを解析し、応答キュー等に振り分ける
+
+        :param bytes buf: 受信データ
+        :return: フレームを処理した場合はTrue、揃っていない場合はNone
+        """
+        # フレームが揃っていない場合は受信データ全体を次回に持ち越す
+        frame = buf
+        self.__rest = frame
         if len(buf) < 11:
-            with self.__lock:
-                self.__rest = buf
             return
         seq = 0
         if buf[0] == ord("D"):  # ASCII
             if len(buf) < 22:
-                with self.__lock:
-                    self.__rest = buf
                 return
             if buf[1] == ord("0"):  # 3E
                 buf = buf[4:]
@@ -196,8 +473,6 @@ class SLMPClient(object):
             else:
                 RuntimeError(buf)
             if len(buf) < 18:
-                with self.__lock:
-                    self.__rest = buf
                 return
             network_num = int(buf[0:2].decode("ascii"), base=16)
             pc_num = int(buf[2:4].decode("ascii"), base=16)
@@ -206,14 +481,10 @@ class SLMPClient(object):
             length = int(buf[10:14].decode("ascii"), base=16)
             term_code = int(buf[14:18].decode("ascii"), base=16)
             if len(buf) < length + 14:
-                with self.__lock:
-                    self.__rest = buf
                 return
-            data = buf[18:]
             new_length = length - 4
-            data = data[:new_length]
-            with self.__lock:
-                self.__rest = data[new_length:]
+            data = buf[18 : 18 + new_length]
+            self.__rest = buf[18 + new_length :]
             data = data.decode("ascii")
             assert len(data) == length - 4, (len(data), length)
         elif buf[0] in (0xD0, 0xD4):  # Binary
@@ -226,34 +497,83 @@ class SLMPClient(object):
                 assert buf[4:6] == b"\x00\x00", buf[:6]
                 buf = buf[6:]
             if len(buf) < 9:
-                with self.__lock:
-                    self.__rest = buf
                 return
             tmp = struct.unpack("<BBHBHH", buf[:9])
             network_num, pc_num, io_num, m_drop_num, length, term_code = tmp
             if len(buf) < length + 7:
-                with self.__lock:
-                    self.__rest = buf
                 return
-            data = buf[9:]
             new_length = length - 2
-            data = data[:new_length]
-            with self.__lock:
-                self.__rest = data[new_length:]
+            data = buf[9 : 9 + new_length]
+            self.__rest = buf[9 + new_length :]
             assert len(data) == length - 2, (len(data), length)
         else:
+            self.__rest = b""
             raise RuntimeError(buf)
-        with self.__lock:
-            self.__recv_queue[seq] = (
-                network_num,
-                pc_num,
-                io_num,
-                m_drop_num,
+        tracer = self.tracer
+        if tracer is not None:
+            tracer.record(RECV, frame[: len(frame) - len(self.__rest)])
+        # 要求への応答を待っていないシリアル番号(3Eフレームの場合は応答待ちの
+        # 要求がない時)のフレームのみ、コマンドで相手からの送信データと判別する
+        with self.__recv_cond:
+            solicited = (
+                seq in self.__deadlines
+                or seq in self.__recv_queue
+                or seq in self.__completed
+            )
+        if not solicited:
+            if isinstance(data, str):
+                on_demand = data[:8] == "21010000"
+            else:
+                on_demand = data[:4] == b"\x01\x21\x00\x00"
+            if on_demand:
+                self.__push_on_demand(term_code, data)
+                return True
+            if isinstance(data, str):
+                distribute = data[:8] == "40030000"
+            else:
+                distribute = data[:4] == b"\x03\x40\x00\x00"
+            if distribute:
+                self.__push_distribute(term_code, data)
+                return True
+        with self.__recv_cond:
+            # 再送や複製に対する応答、受け取り済みでも一定時間は判別できる
+            if seq in self.__recv_queue or seq in self.__completed:
+                self.duplicate_replies += 1
+                return True
+        # 重複した応答は計測しない
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.on_reply(
+                self.__endpoint,
+                seq,
                 term_code,
-                data,
+                len(frame) - len(self.__rest),
             )
+        with self.__recv_cond:
+            if seq in self.__deadlines:
+                self.__recv_queue[seq] = util.Response(
+                    network_num, pc_num, io_num, m_drop_num, term_code, data
+                )
+                self.__recv_cond.notify_all()
+                retransmitter = self.__retransmitter
+                if retransmitter is not None:
+                    retransmitter.done(seq)
+                return True
+            self.dropped_replies += 1
+        # 期限切れ、または応答を待たない要求(書き込み等)の応答
+        if term_code:
+            self.logger.error("serial %d: end code 0x%04X", seq, term_code)
         return True
 
+    def __expire(self):
+        """期限の切れた要求と、受け取られずに残っている応答を破棄する"""
+        now = time.monotonic()
+        with self.__recv_cond:
+            for seq in self.__deadlines.advance(now):
+                if self.__recv_queue.pop(seq, None) is not None:
+                    self.expired_replies += 1
+            self.__completed.advance(now)
+
     def __enter__(self):
         """コンテキスト構文用
 
@@ -277,42 +597,65 @@ class SLMPClient(object):
         self.close()
 
     def __recv_loop(self, seq: int, timeout: int):
-        timeout *= 0.25
-        if timeout == 0:
-            timeout = 100
-        start = time.monotonic()
-        while seq not in self.__recv_queue.keys():
-            end = time.monotonic()
-            if end - start > timeout:
-                break
-        if seq not in self.__recv_queue.keys():
-            raise TimeoutError()
-        data = self.__recv_queue[seq]
-        with self.__lock:
-            del self.__recv_queue[seq]
-        end_code = util.EndCode(data[4])
-        if end_code != util.EndCode.Success:
-            raise util.SLMPCommunicationError(end_code)
+        with self.__recv_cond:
+            if not self.__recv_cond.wait_for(
+                lambda: seq in self.__recv_queue, _wait_seconds(timeout)
+            ):
+                self.__deadlines.cancel(seq)
+                if self.__retransmitter is not None:
+                    self.__retransmitter.cancel(seq)
+                if self.metrics is not None:
+                    self.metrics.on_timeout(self.__endpoint, seq)
+                raise TimeoutError()
+            data = self.__recv_queue.pop(seq)
+            self.__deadlines.cancel(seq)
+            if self.__protocol[1] == 4:
+                self.__completed.add(seq, COMPLETED_HOLD, time.monotonic())
+        if isinstance(data, OSError):  # 接続断
+            raise ConnectionAbortedError() from data
+        if data.term_code:
+            raise util.SLMPCommunicationError(util.EndCode(data.term_code))
         return data
 
+    def __pipeline(self, requests, window, timeout):
+        """複数の要求を応答を待たずに送信し、応答を要求順に返す
+
+        4Eフレームの場合はシリアル番号で応答を区別できるため、
+        最大で window 個の要求を応答待ちにする。3Eフレームの場合は1個ずつ処理する。
+
+        :param requests: (コマンド, サブコマンド, データ)のイテラブル
+        :type requests: Iterable[(const.SLMPCommand, int, bytes)]
+        :param int window: 同時に応答待ちとする要求の最大数
+        :param int timeout: タイムアウト、250msec単位
+        :return: 要求毎の応答データ
+        :rtype: Iterator[bytes or str]
+        """
+        if self.__protocol[1] != 4:  # 3Eフレーム
+            window = 1
+        assert 0 < window <= 0xFF, window
+        pending = collections.deque()
+        for cmd, sub_cmd, data in requests:
+            pending.append(self.__cmd_format(timeout, cmd, sub_cmd, data))
+            if len(pending) >= window:
+                yield self.__recv_loop(pending.popleft(), timeout).data
+        while pending:
+            yield self.__recv_loop(pending.popleft(), timeout).data
+
     def __read_devices(self, device_code, start_num, count, timeout, sub_cmd):
         cmd = const.SLMPCommand.Device_Read
         if not isinstance(device_code, const.DeviceCode):
             raise ValueError(device_code)
-        assert 0 < start_num < 0xFFF, start_num
         assert 0 < count < 3584, count
+        extended = util.is_extended_device(
+            device_code, start_num, self.__protocol[0]
+        )
+        if extended:
+            sub_cmd |= 0x0002
+        cmd_text = self.__encode_device(device_code, start_num, extended)
         if self.__protocol[0]:
-            cmd_text = struct.pack("<I", start_num)[:-1]
-            cmd_text += struct.pack("<B", device_code.value)
             cmd_text += struct.pack("<H", count)
         else:
-            cmd_text = b"%s" % device_code.name.encode("ascii")
-            if len(cmd_text) == 1:
-                cmd_text += b"*"
-            if device_code in const.D_ADDR_16:
-                cmd_text += b"%06X%04d" % (start_num, count)
-            else:
-                cmd_text += b"%06d%04d" % (start_num, count)
+            cmd_text += b"%04d" % count
         seq = self.__cmd_format(timeout, cmd, sub_cmd, cmd_text)
         try:
             data = self.__recv_loop(seq, timeout)
@@ -320,25 +663,50 @@ class SLMPClient(object):
             raise TimeoutError(device_code, start_num, count) from e
         return data
 
-    def read_bit_devices(self, device_code, start_num, count, timeout=0):
+    def read_bit_devices(
+        self, device_code, start_num, count, timeout=0, word_access=None
+    ):
         """デバイスコードで指定したビットデバイスを開始アドレスから指定の個数分だけ読み取る。
 
+        ワードアクセスでは16点単位(開始アドレスを16の倍数に切り下げる)で読み出し、
+        受信後に1点毎に展開する。
+
         :param device_code: デバイスコード
         :type device_code: const.DeviceCode
         :param int start_num: 開始アドレス
         :param int count: 個数
         :param int timeout: 監視時間, 250msec単位
+        :param bool word_access: ワードアクセスで読み出すかどうか、
+            Noneの場合は応答のデータが少なくなる方を選ぶ
         :return: デバイスの値
         :rtype: Tuple[bool]
         """
+        head = start_num % 16
+        words = -(-(head + count) // 16)
+        if word_access is None:
+            if self.__protocol[0]:  # Binary
+                word_access = words * 2 < (count + 1) // 2
+            else:  # ASCII
+                word_access = words * 4 < count
+            word_access = word_access and words <= WORD_CHUNK_WORDS
+        if word_access:
+            assert words <= WORD_CHUNK_WORDS, words
+            data = self.__read_devices(
+                device_code, start_num - head, words, timeout, 0x0000
+            )
+            buf = data.data
+            if isinstance(buf, str):
+                buf = util.hex2words(buf)
+            bits = util.unpack_word_bits(buf)
+            return tuple(bits[head : head + count].tolist())
         data = self.__read_devices(
             device_code, start_num, count, timeout, 0x0001
         )
 
-        if isinstance(data[5], str):
-            ret = tuple(x == "1" for x in data[5])
+        if isinstance(data.data, str):
+            ret = tuple(x == "1" for x in data.data)
         else:
-            ret = tuple(x == 1 for x in util.decode_bcd(list(data[5])))
+            ret = tuple(x == 1 for x in util.decode_bcd(list(data.data)))
             if count % 2 == 1:
                 ret = ret[:-1]
         assert len(ret) == count, len(ret)
@@ -358,16 +726,16 @@ class SLMPClient(object):
         data = self.__read_devices(
             device_code, start_num, count, timeout, 0x0000
         )
-        if isinstance(data[5], str):
+        if isinstance(data.data, str):
             ret = array(
                 "H",
                 [
-                    int(data[5][x:][:4], base=16)
-                    for x in range(0, len(data[5]), 4)
+                    int(data.data[x:][:4], base=16)
+                    for x in range(0, len(data.data), 4)
                 ],
             )
         else:
-            ret = array("H", data[5])
+            ret = array("H", data.data)
         return ret
 
     def __write_devices(self, dc2, start_num, data, timeout, sub_cmd):
@@ -376,8 +744,8 @@ class SLMPClient(object):
         :param dc2:
         :type dc2: const.DeviceCode
         :param int start_num:
-        :param data:
-        :type data: List[int]
+        :param data: ビットの場合はList[int]、
+            ワードの場合は :py:func:`util.word_buffer` で扱えるもの
         :param int timeout:
         :param int sub_cmd:
         :return:
@@ -385,46 +753,42 @@ class SLMPClient(object):
         cmd = const.SLMPCommand.Device_Write
         if not isinstance(dc2, const.DeviceCode):
             raise ValueError(dc2)
-        assert 0 < start_num < 0xFFF, start_num
-        if self.__protocol[0]:  # Binary
-            buf = struct.pack("<I", start_num)[:-1]
-            buf += struct.pack("<BH", dc2.value, len(data))
-            if sub_cmd & 0x01:  # ビット
-                for i in range(0, len(data), 2):
-                    tmp = data[i:][:2]
-                    if len(tmp) == 2:
-                        if tmp[0]:
-                            if tmp[1]:
-                                buf += b"\x11"
-                            else:
-                                buf += b"\x10"
+        extended = util.is_extended_device(dc2, start_num, self.__protocol[0])
+        if extended:
+            sub_cmd |= 0x0002
+        buf = self.__encode_device(dc2, start_num, extended)
+        if not sub_cmd & 0x01:  # ワード
+            view = util.word_buffer(data)
+            if self.__protocol[0]:  # Binary
+                # 書き込みデータはフレームの作成時に一度だけコピーする
+                buf = (buf + struct.pack("<H", len(view) // 2), view)
+            else:  # ASCII
+                buf += b"%04d" % (len(view) // 2) + util.words2hex(view)
+        elif self.__protocol[0]:  # Binary
+            buf += struct.pack("<H", len(data))
+            for i in range(0, len(data), 2):
+                tmp = data[i:][:2]
+                if len(tmp) == 2:
+                    if tmp[0]:
+                        if tmp[1]:
+                            buf += b"\x11"
                         else:
-                            if tmp[1]:
-                                buf += b"\x01"
-                            else:
-                                buf += b"\x00"
-                    else:
-                        if tmp[0]:
                             buf += b"\x10"
+                    else:
+                        if tmp[1]:
+                            buf += b"\x01"
                         else:
                             buf += b"\x00"
-            else:
-                buf += array("H", data).tobytes()
+                else:
+                    if tmp[0]:
+                        buf += b"\x10"
+                    else:
+                        buf += b"\x00"
         else:  # ASCII
-            buf = b"%s" % dc2.name.encode("ascii")
-            if len(buf) == 1:
-                buf += b"*"
-            if dc2 in const.D_ADDR_16:
-                buf += b"%06X%04d" % (start_num, len(data))
-            else:
-                buf += b"%06d%04d" % (start_num, len(data))
-            if sub_cmd & 0x01:  # ビット
-                for v in data:
-                    buf += b"1" if v else b"0"
-            else:
-                for v in data:
-                    buf += b"%04X" % v
-        self.__cmd_format(timeout, cmd, sub_cmd, buf)
+            buf += b"%04d" % len(data)
+            for v in data:
+                buf += b"1" if v else b"0"
+        self.__cmd_format(timeout, cmd, sub_cmd, buf, collect=False)
 
     def write_bit_devices(self, dc2, start_num, data, timeout=0):
         """デバイスコードで指定したビットデバイスを開始アドレスから指定したデータで書き換える。
@@ -445,50 +809,69 @@ class SLMPClient(object):
         :param dc2: デバイスコード
         :type dc2: const.DeviceCode
         :param int start_num: 開始アドレス
-        :param data: 書き込むデータ
-        :type data: List[int]
+        :param data: 書き込むデータ、整数のリストまたは :py:class:`numpy.ndarray`
+            などバッファプロトコルに対応したもの
+            (バイト単位の場合はワード毎にリトルエンディアンとしたバイト列)
+        :type data: List[int] or bytes or numpy.ndarray
         :param timeout: タイムアウト、250msec単位
         :return: None
         """
         self.__write_devices(dc2, start_num, data, timeout, 0x00)
 
+    def __encode_device(self, device_code, address, extended):
+        """デバイス表記を交信コードに合わせて作成する
+
+        :param device_code: デバイス種別
+        :type device_code: const.DeviceCode
+        :param int address: アドレス
+        :param bool extended: 4バイトアドレスの表記とするかどうか
+        :return: 要求電文の形式となったデバイス表記
+        :rtype: bytes
+        """
+        return to_spec((device_code, address)).encode(
+            self.__protocol[0], extended
+        )
+
     def __format_device_list(self, word_list, dword_list):
         """デバイスリストを要求電文としてフォーマットする
 
+        4バイトアドレスでのアクセスが必要なデバイスを含む場合、
+        全てのデバイスを4バイトアドレスで表記する。
+        デバイスは (デバイス種別, アドレス) の他、"D100" のような文字列表記や
+        :py:class:`pyslmpclient.address.DeviceSpec` でも指定でき、
+        作成済みのデバイス表記をつなげて要求電文とする。
+        :py:data:`pyslmpclient.address.DEVICE_DTYPE` の構造化配列で指定した場合は
+        配列のままでまとめて変換する。
+
         :param word_list: ワードアクセスするデバイスのリスト
         :type word_list: List[(const.DeviceCode, int)]
         :param dword_list: ダブルワードアクセスするデバイスのリスト
         :type dword_list: List[(const.DeviceCode, int)]
-        :return: 要求電文の形式となったデバイスリスト
-        :rtype: bytes
+        :return: 要求電文の形式となったデバイスリストと、
+            4バイトアドレスで表記したかどうか
+        :rtype: (bytes, bool)
         """
-        if self.__protocol[0]:  # Binary
+        binary = self.__protocol[0]
+        if binary:
             buf = struct.pack("<BB", len(word_list), len(dword_list))
-            for dc, addr in word_list:
-                buf += struct.pack("<I", addr)[:-1]
-                buf += struct.pack("<B", dc.value)
-            for dc, addr in dword_list:
-                buf += struct.pack("<I", addr)[:-1]
-                buf += struct.pack("<B", dc.value)
         else:  # ASCII
             buf = b"%02X%02X" % (len(word_list), len(dword_list))
-            for dc, addr in word_list:
-                buf += dc.name.encode("ascii")
-                if len(dc.name) == 1:
-                    buf += b"*"
-                if dc in const.D_ADDR_16:
-                    buf += b"%06X" % addr
-                else:
-                    buf += b"%06d" % addr
-            for dc, addr in dword_list:
-                buf += dc.name.encode("ascii")
-                if len(dc.name) == 1:
-                    buf += b"*"
-                if dc in const.D_ADDR_16:
-                    buf += b"%06X" % addr
-                else:
-                    buf += b"%06d" % addr
-        return buf
+        if isinstance(word_list, np.ndarray) or isinstance(
+            dword_list, np.ndarray
+        ):
+            words = address.device_array(word_list)
+            dwords = address.device_array(dword_list)
+            extended = address.needs_extended(
+                words, binary
+            ) or address.needs_extended(dwords, binary)
+            buf += address.encode_devices(words, binary, extended)
+            buf += address.encode_devices(dwords, binary, extended)
+            return buf, extended
+        specs = [to_spec(x) for x in word_list]
+        specs.extend(to_spec(x) for x in dword_list)
+        extended = any(x.needs_extended(binary) for x in specs)
+        buf += b"".join(x.encode(binary, extended) for x in specs)
+        return buf, extended
 
     def read_random_devices(self, word_list, dword_list, timeout=0):
         """指定した連続していないデバイスのデータを読む
@@ -503,14 +886,14 @@ class SLMPClient(object):
         :rtype: (List[int], List[bytes])
         """
         cmd = const.SLMPCommand.Device_ReadRandom
-        sub_cmd = 0x0000
-        buf = self.__format_device_list(word_list, dword_list)
+        buf, extended = self.__format_device_list(word_list, dword_list)
+        sub_cmd = 0x0002 if extended else 0x0000
         seq = self.__cmd_format(timeout, cmd, sub_cmd, buf)
         try:
             data = self.__recv_loop(seq, timeout)
         except TimeoutError as e:
             raise TimeoutError(word_list, dword_list) from e
-        buf = data[5]
+        buf = data.data
         if isinstance(buf, str):  # ASCII
             bytes_buf = util.str2bytes_buf(buf)
             bytes_buf.reverse()
@@ -533,53 +916,168 @@ class SLMPClient(object):
             )
         return word_data, dword_data
 
-    def write_random_bit_devices(self, device_list, timeout=0):
+    def read_random_bit_devices(self, device_list, timeout=0, window=4):
+        """指定した連続していないビットデバイスの値を読む
+
+        デバイスを含む16点をワードアクセスでランダム読み出しし、受信後に1点毎に展開する。
+        同じ16点に含まれるデバイスは1回だけ読み出す。
+        "D100.3" のようにワードデバイスのビットも指定できる。
+
+        :param device_list: ビットデバイスのリスト、
+            (デバイス種別, アドレス), 文字列表記または
+            :py:class:`pyslmpclient.address.DeviceSpec`
+        :type device_list: List[(const.DeviceCode, int)]
+        :param int timeout: タイムアウト、250msec単位
+        :param int window: 同時に応答待ちとする要求の最大数
+        :return: デバイスの値
+        :rtype: Tuple[bool]
+        """
+        cmd = const.SLMPCommand.Device_ReadRandom
+        # (デバイスコード, 16点の先頭アドレス)と読み出す順番
+        words = collections.OrderedDict()  # type: Dict[tuple, int]
+        index = np.empty(len(device_list), np.intp)
+        for i, device in enumerate(device_list):
+            spec = to_spec(device)
+            if spec.bit is None:  # ビットデバイス
+                head = spec.address % 16
+                key = (spec.device_code, spec.address - head)
+            else:  # ワードデバイスのビット
+                head = spec.bit
+                key = (spec.device_code, spec.address)
+            n = words.setdefault(key, len(words))
+            index[i] = n * 16 + head
+        word_list = list(words)
+        # 4バイトアドレスが必要な場合は全ての要求をその点数の上限で分ける
+        if any(
+            to_spec(x).needs_extended(self.__protocol[0]) for x in word_list
+        ):
+            chunk = RANDOM_CHUNK_POINTS_EXTENDED
+        else:
+            chunk = RANDOM_CHUNK_POINTS
+
+        def requests():
+            for pos in range(0, len(word_list), chunk):
+                buf, extended = self.__format_device_list(
+                    word_list[pos : pos + chunk], []
+                )
+                yield cmd, 0x0002 if extended else 0x0000, buf
+
+        raw = bytearray()
+        try:
+            for buf in self.__pipeline(requests(), window, timeout):
+                if isinstance(buf, str):  # ASCII
+                    buf = util.hex2words(buf)
+                raw += buf
+        except TimeoutError as e:
+            raise TimeoutError(device_list) from e
+        return tuple(util.unpack_word_bits(bytes(raw))[index].tolist())
+
+    def __write_request(self, timeout, cmd, sub_cmd, data, wait):
+        """書き込み要求を送信する
+
+        :param int timeout: タイムアウト、250msec単位
+        :param cmd: コマンド
+        :type cmd: const.SLMPCommand
+        :param int sub_cmd: サブコマンド
+        :param data: データ、またはバイト単位のバッファの断片のタプル
+        :type data: bytes or tuple
+        :param bool wait: 応答を待って終了コードを確かめるかどうか
+        :return: None
+        """
+        seq = self.__cmd_format(timeout, cmd, sub_cmd, data, collect=wait)
+        if not wait:
+            return
+        try:
+            self.__recv_loop(seq, timeout)
+        except TimeoutError as e:
+            raise TimeoutError(cmd) from e
+
+    def write_random_bit_devices(self, device_list, timeout=0, wait=False):
         """連続していないビットデバイスに書き込む
 
         :param device_list: 書き込むデバイスと値のリスト(デバイス種別、アドレス、値)
         :type device_list: List[(const.DeviceCode, int, bool)]
         :param int timeout: タイムアウト、250msec単位
+        :param bool wait: 応答を待つかどうか、
+            Trueの場合は異常応答で :class:`util.SLMPCommunicationError` を送出する
         :return: None
         """
         cmd = const.SLMPCommand.Device_WriteRandom
-        sub_cmd = 0x01
+        extended = any(
+            util.is_extended_device(v[0], v[1], self.__protocol[0])
+            for v in device_list
+        )
+        sub_cmd = 0x03 if extended else 0x01
         if self.__protocol[0]:  # Binary
             buf = struct.pack("<B", len(device_list))
             for v in device_list:
-                buf += struct.pack("<I", v[1])[:-1]
-                buf += struct.pack("<BB", v[0].value, v[2])
+                buf += util.device2binary(v[0], v[1], extended)
+                buf += struct.pack("<B", v[2])
         else:  # ASCII
             buf = b"%02X" % len(device_list)
             for v in device_list:
-                buf += util.device2ascii(v[0], v[1])
+                buf += util.device2ascii(v[0], v[1], extended)
                 if v[2]:
                     buf += b"01"
                 else:
                     buf += b"00"
-        self.__cmd_format(timeout, cmd, sub_cmd, buf)
+        self.__write_request(timeout, cmd, sub_cmd, buf, wait)
 
-    def write_random_word_devices(self, word_list, dword_list, timeout=0):
+    def write_random_word_devices(
+        self, word_list, dword_list, timeout=0, wait=False
+    ):
         """連続していないワードデバイスに書き込む
 
-        :param word_list: ワード単位でアクセスするデバイス
+        :param word_list: ワード単位でアクセスするデバイス、
+            :py:data:`pyslmpclient.address.WORD_VALUE_DTYPE` の構造化配列も可
         :type word_list: List[(const.DeviceCode, int, bytes)]
-        :param dword_list: ダブルワード単位でアクセスするデバイス
+        :param dword_list: ダブルワード単位でアクセスするデバイス、
+            :py:data:`pyslmpclient.address.DWORD_VALUE_DTYPE` の構造化配列も可
         :type dword_list: List[(const.DeviceCode, int, bytes)]
         :param int timeout: タイムアウト、250msec単位
+        :param bool wait: 応答を待つかどうか、
+            Trueの場合は異常応答で :class:`util.SLMPCommunicationError` を送出する
         :return: None
         """
+        if isinstance(word_list, np.ndarray) or isinstance(
+            dword_list, np.ndarray
+        ):
+            words = address.device_array(word_list, address.WORD_VALUE_DTYPE)
+            dwords = address.device_array(
+                dword_list, address.DWORD_VALUE_DTYPE
+            )
+            binary = self.__protocol[0]
+            extended = address.needs_extended(
+                words, binary
+            ) or address.needs_extended(dwords, binary)
+            if binary:
+                buf = struct.pack("<BB", len(words), len(dwords))
+            else:  # ASCII
+                buf = b"%02X%02X" % (len(words), len(dwords))
+            buf += address.encode_devices(words, binary, extended, "value")
+            buf += address.encode_devices(dwords, binary, extended, "value")
+            self.__write_request(
+                timeout,
+                const.SLMPCommand.Device_WriteRandom,
+                0x0002 if extended else 0x0000,
+                buf,
+                wait,
+            )
+            return
+        extended = any(
+            util.is_extended_device(v[0], v[1], self.__protocol[0])
+            for v in word_list + dword_list
+        )
         if self.__protocol[0]:  # Binary
             buf = struct.pack("<BB", len(word_list), len(dword_list))
             for v in word_list:
-                buf += struct.pack("<I", v[1])[:-1]
-                buf += struct.pack("<B", v[0].value)
+                buf += util.device2binary(v[0], v[1], extended)
                 byte_buf = v[2][:]
                 while len(byte_buf) < 2:
                     byte_buf += b"\x00"
                 buf += byte_buf[:2]
             for v in dword_list:
-                buf += struct.pack("<I", v[1])[:-1]
-                buf += struct.pack("<B", v[0].value)
+                buf += util.device2binary(v[0], v[1], extended)
                 byte_buf = v[2][:]
                 while len(byte_buf) < 4:
                     byte_buf += b"\x00"
@@ -587,19 +1085,23 @@ class SLMPClient(object):
         else:
             buf = b"%02X%02X" % (len(word_list), len(dword_list))
             for v in word_list:
-                buf += util.device2ascii(v[0], v[1])
+                buf += util.device2ascii(v[0], v[1], extended)
                 tmp = v[2][:]
                 while len(tmp) < 2:
                     tmp += b"\x00"
                 buf += b"%02X%02X" % (tmp[1], tmp[0])
             for v in dword_list:
-                buf += util.device2ascii(v[0], v[1])
+                buf += util.device2ascii(v[0], v[1], extended)
                 tmp = v[2][:]
                 while len(tmp) < 4:
                     tmp += b"\x00"
                 buf += b"%02X%02X%02X%02X" % (tmp[3], tmp[2], tmp[1], tmp[0])
-        self.__cmd_format(
-            timeout, const.SLMPCommand.Device_WriteRandom, 0x0, buf
+        self.__write_request(
+            timeout,
+            const.SLMPCommand.Device_WriteRandom,
+            0x0002 if extended else 0x0000,
+            buf,
+            wait,
         )
 
     def entry_monitor_device(self, word_list, dword_list, timeout=0):
@@ -613,13 +1115,13 @@ class SLMPClient(object):
         :return: None
         """
         cmd = const.SLMPCommand.Device_EntryMonitorDevice
-        sub_cmd = 0x0000
         assert 1 < len(word_list) + len(dword_list) <= 192, (
             len(word_list),
             len(dword_list),
         )
-        buf = self.__format_device_list(word_list, dword_list)
-        self.__cmd_format(timeout, cmd, sub_cmd, buf)
+        buf, extended = self.__format_device_list(word_list, dword_list)
+        sub_cmd = 0x0002 if extended else 0x0000
+        self.__cmd_format(timeout, cmd, sub_cmd, buf, collect=False)
         with self.__lock:
             self.__monitor_device_num = (len(word_list), len(dword_list))
 
@@ -643,7 +1145,7 @@ class SLMPClient(object):
             data = self.__recv_loop(seq, timeout)
         except TimeoutError as e:
             raise TimeoutError() from e
-        buf = data[5]
+        buf = data.data
         if isinstance(buf, str):  # ASCII
             bytes_buf = util.str2bytes_buf(buf)
             bytes_buf.reverse()
@@ -666,43 +1168,89 @@ class SLMPClient(object):
             )
         return word_data, dword_data
 
-    def read_block(self, word_list, bit_list, timeout=0):
-        """ブロックで読み出す
+    def __read_block(self, word_list, bit_list, timeout):
+        """ブロック読み出しの要求を送信し、応答データを受け取る
 
         :param word_list: ワード単位でアクセスするデバイスブロックのリスト
-            (デバイスコード, アドレス, 点数)
+            (デバイスコード, アドレス, 点数)、
+            :py:data:`pyslmpclient.address.COUNT_DTYPE` の構造化配列も可
         :type word_list: List[(const.DeviceCode, int, int)]
         :param bit_list: ビット単位でアクセスするデバイスブロックのリスト
-            (デバイスコード, アドレス, 点数)
+            (デバイスコード, アドレス, 点数)、
+            :py:data:`pyslmpclient.address.COUNT_DTYPE` の構造化配列も可
         :type bit_list: List[(const.DeviceCode, int, int)]
         :param int timeout: タイムアウト、250msec単位
-        :return: デバイスに入っていたデータ(ワードアクセス分のリスト,
-            ビットアクセス分のリスト)
-        :rtype: (List[List[int]], List[List[bool])
+        :return: 応答データ、ASCIIの場合は16進表現の文字列
+        :rtype: bytes or str
         """
         cmd = const.SLMPCommand.Device_ReadBlock
-        sub_smd = 0x00
+        buf, extended = self.__block_list(word_list, bit_list)
+        seq = self.__cmd_format(timeout, cmd, 0x02 if extended else 0x00, buf)
+        try:
+            data = self.__recv_loop(seq, timeout)
+        except TimeoutError as e:
+            raise TimeoutError() from e
+        return data.data
+
+    def __block_list(self, word_list, bit_list):
+        """ブロック読み出しのデバイスブロックのリストを要求電文の形式にする
+
+        :param word_list: ワード単位でアクセスするデバイスブロックのリスト
+        :type word_list: List[(const.DeviceCode, int, int)]
+        :param bit_list: ビット単位でアクセスするデバイスブロックのリスト
+        :type bit_list: List[(const.DeviceCode, int, int)]
+        :return: 要求電文の形式となったリストと、4バイトアドレスで表記したかどうか
+        :rtype: (bytes, bool)
+        """
+        if isinstance(word_list, np.ndarray) or isinstance(
+            bit_list, np.ndarray
+        ):
+            words = address.device_array(word_list, address.COUNT_DTYPE)
+            bits = address.device_array(bit_list, address.COUNT_DTYPE)
+            binary = self.__protocol[0]
+            extended = address.needs_extended(
+                words, binary
+            ) or address.needs_extended(bits, binary)
+            if binary:
+                buf = struct.pack("<BB", len(words), len(bits))
+            else:  # ASCII
+                buf = b"%02X%02X" % (len(words), len(bits))
+            buf += address.encode_devices(words, binary, extended, "count")
+            buf += address.encode_devices(bits, binary, extended, "count")
+            return buf, extended
+        extended = any(
+            util.is_extended_device(dc, addr, self.__protocol[0])
+            for dc, addr, _ in word_list + bit_list
+        )
         if self.__protocol[0]:  # Binary
             buf = struct.pack("<BB", len(word_list), len(bit_list))
             for dc, addr, num in word_list + bit_list:
-                buf += struct.pack("<I", addr)[:-1]
-                buf += struct.pack("<BH", dc.value, num)
+                buf += util.device2binary(dc, addr, extended)
+                buf += struct.pack("<H", num)
         else:  # ASCII
             buf = b"%02X%02X" % (len(word_list), len(bit_list))
             for dc, addr, num in word_list + bit_list:
-                buf += dc.name.encode("ascii")
-                if len(dc.name) == 1:
-                    buf += b"*"
-                if dc in const.D_ADDR_16:
-                    buf += b"%06X%04X" % (addr, num)
-                else:
-                    buf += b"%06d%04X" % (addr, num)
-        seq = self.__cmd_format(timeout, cmd, sub_smd, buf)
-        try:
-            data = self.__recv_loop(seq, timeout)
-        except TimeoutError as e:
-            raise TimeoutError() from e
-        buf = data[5]
+                buf += util.device2ascii(dc, addr, extended)
+                buf += b"%04X" % num
+        return buf, extended
+
+    def read_block(self, word_list, bit_list, timeout=0):
+        """ブロックで読み出す
+
+        :param word_list: ワード単位でアクセスするデバイスブロックのリスト
+            (デバイスコード, アドレス, 点数)、
+            :py:data:`pyslmpclient.address.COUNT_DTYPE` の構造化配列も可
+        :type word_list: List[(const.DeviceCode, int, int)]
+        :param bit_list: ビット単位でアクセスするデバイスブロックのリスト
+            (デバイスコード, アドレス, 点数)、
+            :py:data:`pyslmpclient.address.COUNT_DTYPE` の構造化配列も可
+        :type bit_list: List[(const.DeviceCode, int, int)]
+        :param int timeout: タイムアウト、250msec単位
+        :return: デバイスに入っていたデータ(ワードアクセス分のリスト,
+            ビットアクセス分のリスト)
+        :rtype: (List[List[int]], List[List[bool])
+        """
+        buf = self.__read_block(word_list, bit_list, timeout)
         if isinstance(buf, str):  # ASCII
             bytes_buf = util.str2bytes_buf(buf)
             a_flag = True
@@ -732,9 +1280,35 @@ class SLMPClient(object):
             bit_data.append(tmp_buf)
         return word_data, bit_data
 
-    def write_block(self, word_list, bit_list, timeout=0):
+    def read_block_raw(self, word_list, bit_list, timeout=0):
+        """ブロックで読み出し、応答データを分割せずにそのまま返す
+
+        ASCIIの場合もバイナリと同じ並び(ワード毎にリトルエンディアン)に変換する
+
+        :param word_list: ワード単位でアクセスするデバイスブロックのリスト
+            (デバイスコード, アドレス, 点数)、
+            :py:data:`pyslmpclient.address.COUNT_DTYPE` の構造化配列も可
+        :type word_list: List[(const.DeviceCode, int, int)]
+        :param bit_list: ビット単位でアクセスするデバイスブロックのリスト
+            (デバイスコード, アドレス, 点数)、
+            :py:data:`pyslmpclient.address.COUNT_DTYPE` の構造化配列も可
+        :type bit_list: List[(const.DeviceCode, int, int)]
+        :param int timeout: タイムアウト、250msec単位
+        :return: ワードアクセス分、ビットアクセス分の順に並んだデータ
+        :rtype: bytes
+        """
+        buf = self.__read_block(word_list, bit_list, timeout)
+        if isinstance(buf, str):  # ASCII
+            return util.hex2words(buf)
+        return bytes(buf)
+
+    def write_block(self, word_list, bit_list, timeout=0, wait=False):
         """ブロックでの書き込み
 
+        ワードアクセスの書き込みデータには :py:class:`numpy.ndarray` など
+        バッファプロトコルに対応したものも使え、
+        バイナリ形式ではフレームの作成時に一度だけコピーする。
+
         :param word_list: ワードアクセスするデバイスと書き込むデータのリスト
             (デバイス種別, 先頭アドレス, デバイス点数, 書き込みデータ)
         :type word_list: List[(const.DeviceCode, int, int, List[int])]
@@ -742,59 +1316,227 @@ class SLMPClient(object):
             (デバイス種別, 先頭アドレス, デバイス点数, 書き込みデータ)
         :type bit_list: List[(const.DeviceCode, int, int, List[bool])]
         :param int timeout: タイムアウト、250msec単位
+        :param bool wait: 応答を待つかどうか、
+            Trueの場合は異常応答で :class:`util.SLMPCommunicationError` を送出する
         :return: None
         """
         cmd = const.SLMPCommand.Device_WriteBlock
-        sub_cmd = 0x00
         if len(word_list) + len(bit_list) > 120:
             raise RuntimeError("書き込みブロック数超過")
+        extended = any(
+            util.is_extended_device(dc, addr, self.__protocol[0])
+            for dc, addr, _, _ in list(word_list) + list(bit_list)
+        )
+        sub_cmd = 0x02 if extended else 0x00
+        binary = self.__protocol[0]
+        if binary:
+            parts = [struct.pack("<BB", len(word_list), len(bit_list))]
+        else:  # ASCII
+            parts = [b"%02X%02X" % (len(word_list), len(bit_list))]
+        blocks = list()
+        for dc, addr, num, w_data in word_list:
+            view = util.word_buffer(w_data)
+            assert len(view) == num * 2, (len(view) // 2, num)
+            blocks.append((dc, addr, num, view))
+        for dc, addr, num, w_data in bit_list:
+            assert len(w_data) == num * 16, (len(w_data), num)
+            p_data = bytes(util.pack_bits(w_data))
+            assert len(p_data) == num * 2, (len(p_data), num)
+            blocks.append((dc, addr, num, p_data))
+        for dc, addr, num, view in blocks:
+            head = self.__encode_device(dc, addr, extended)
+            if binary:
+                parts.append(head + struct.pack("<H", num))
+                parts.append(view)
+            else:  # ASCII
+                parts.append(head + b"%04X" % num + util.words2hex(view))
+        self.__write_request(timeout, cmd, sub_cmd, tuple(parts), wait)
+
+    def __label_request(self, cmd, labels, extra):
+        """ラベルの読み出し要求の電文を作成する
+
+        ラベル名のエンコードは繰り返しの読み出しに備えてキャッシュする
+
+        :param cmd: コマンド
+        :type cmd: const.SLMPCommand
+        :param labels: ラベル名のリスト
+        :type labels: List[str]
+        :param extra: ラベル毎にラベル名の後に付加するデータ
+        :type extra: List[bytes]
+        :return: 要求電文
+        :rtype: bytes
+        """
+        key = (cmd, tuple(labels), tuple(extra), self.__protocol[0])
+        buf = self.__label_frames.get(key)
+        if buf is not None:
+            return buf
         if self.__protocol[0]:  # Binary
-            buf = struct.pack("<BB", len(word_list), len(bit_list))
-            for dc, addr, num, w_data in word_list:
-                buf += struct.pack("<I", addr)[:-1]
-                buf += struct.pack("<BH", dc.value, num)
-                assert len(w_data) == num, (len(w_data), num)
-                for v in w_data:
-                    buf += struct.pack("<H", v)
-            for dc, addr, num, w_data in bit_list:
-                buf += struct.pack("<I", addr)[:-1]
-                buf += struct.pack("<BH", dc.value, num)
-                assert len(w_data) == num * 16, (len(w_data), num)
-                p_data = util.pack_bits(w_data)
-                assert len(p_data) == num * 2, (len(p_data), num)
-                for v in p_data:
-                    buf += struct.pack("<B", v)
-        else:
-            buf = b"%02X%02X" % (len(word_list), len(bit_list))
-            for dc, addr, num, w_data in word_list:
-                buf += dc.name.encode("ascii")
-                if len(dc.name) == 1:
-                    buf += b"*"
-                if dc in const.D_ADDR_16:
-                    buf += b"%06X%04X" % (addr, num)
-                else:
-                    buf += b"%06d%04X" % (addr, num)
-                assert len(w_data) == num, (len(w_data), num)
-                for v in w_data:
-                    buf += b"%04X" % v
-            for dc, addr, num, w_data in bit_list:
-                buf += dc.name.encode("ascii")
-                if len(dc.name) == 1:
-                    buf += b"*"
-                if dc in const.D_ADDR_16:
-                    buf += b"%06X%04X" % (addr, num)
-                else:
-                    buf += b"%06d%04X" % (addr, num)
-                assert len(w_data) == num * 16, (len(w_data), num)
-                p_data = util.pack_bits(w_data)
-                tmp_buf = b""
-                for v in p_data:
-                    if not tmp_buf:
-                        tmp_buf = b"%02X" % v
-                    else:
-                        buf += b"%02X" % v + tmp_buf
-                        tmp_buf = b""
-        self.__cmd_format(timeout, cmd, sub_cmd, buf)
+            buf = struct.pack("<HH", len(labels), 0)
+        else:  # ASCII
+            buf = b"%04X%04X" % (len(labels), 0)
+        for name, ext in zip(labels, extra):
+            buf += util.encode_label_name(name, self.__protocol[0]) + ext
+        self.__label_frames.put(key, buf)
+        return buf
+
+    @staticmethod
+    def __label_type(code):
+        try:
+            return const.LabelDataType(code)
+        except ValueError:
+            return code
+
+    def __parse_label_response(self, key, buf, sizes):
+        """ラベルの読み出し結果を展開する
+
+        バイナリの場合、応答電文の書式をキャッシュしておき、
+        2回目以降は全体の長さとラベル毎のデータ長が一致すれば一度の展開で済ませる
+
+        :param key: 書式のキャッシュのキー
+        :param buf: 応答データ
+        :type buf: bytes or str
+        :param sizes: 応答データ中のデータ長からデータのバイト数を求める関数
+        :type sizes: List[Callable[[int], int]]
+        :return: ラベル毎の(データ型ID, 単位指定, データ)
+        :rtype: List[(const.LabelDataType, int, bytes)]
+        """
+        ret = list()
+        if isinstance(buf, str):  # ASCII
+            pos = 4
+            for size in sizes:
+                type_id = int(buf[pos : pos + 2], base=16)
+                unit = int(buf[pos + 2 : pos + 4], base=16)
+                length = size(int(buf[pos + 4 : pos + 8], base=16))
+                data = util.hex2words(buf[pos + 8 : pos + 8 + length * 2])
+                ret.append((self.__label_type(type_id), unit, data))
+                pos += 8 + length * 2
+            return ret
+        cached = self.__label_layouts.get(key)
+        if cached is not None:
+            layout, lengths = cached
+            if layout.size != len(buf) or any(
+                _LENGTH.unpack_from(buf, pos)[0] != length
+                for pos, length in lengths
+            ):
+                cached = None
+        if cached is None:
+            fmt = "<H"
+            pos = 2
+            lengths = list()
+            for size in sizes:
+                (length,) = _LENGTH.unpack_from(buf, pos + 2)
+                lengths.append((pos + 2, length))
+                length = size(length)
+                fmt += "BBH%ds" % length
+                pos += 4 + length
+            layout = struct.Struct(fmt)
+            self.__label_layouts.put(key, (layout, lengths))
+        values = layout.unpack(buf)
+        for i in range(len(sizes)):
+            type_id, unit, _, data = values[1 + i * 4 : 5 + i * 4]
+            ret.append((self.__label_type(type_id), unit, data))
+        return ret
+
+    def read_random_labels(self, labels, timeout=0):
+        """ラベルを指定して読み出す
+
+        :param labels: ラベル名のリスト
+        :type labels: List[str]
+        :param int timeout: タイムアウト、250msec単位
+        :return: ラベル毎の(データ型ID, データ)
+        :rtype: List[(const.LabelDataType, bytes)]
+        """
+        cmd = const.SLMPCommand.Label_LabelReadRandom
+        buf = self.__label_request(cmd, labels, [b""] * len(labels))
+        seq = self.__cmd_format(timeout, cmd, 0x0000, buf)
+        try:
+            data = self.__recv_loop(seq, timeout)
+        except TimeoutError as e:
+            raise TimeoutError(labels) from e
+        ret = self.__parse_label_response(
+            (cmd, tuple(labels)), data.data, [lambda x: x] * len(labels)
+        )
+        return [(type_id, v) for type_id, _, v in ret]
+
+    def read_array_labels(self, labels, timeout=0):
+        """配列型のラベルを指定して読み出す
+
+        :param labels: (ラベル名, 単位指定, 配列データ長)のリスト、
+            単位指定は0がビット(配列データ長はビット数)、1がバイト(配列データ長はバイト数)
+        :type labels: List[(str, int, int)]
+        :param int timeout: タイムアウト、250msec単位
+        :return: ラベル毎の(データ型ID, 単位指定, データ)
+        :rtype: List[(const.LabelDataType, int, bytes)]
+        """
+        cmd = const.SLMPCommand.Label_ArrayLabelRead
+        names = [v[0] for v in labels]
+        if self.__protocol[0]:  # Binary
+            extra = [struct.pack("<BBH", v[1], 0, v[2]) for v in labels]
+        else:  # ASCII
+            extra = [b"%02X%02X%04X" % (v[1], 0, v[2]) for v in labels]
+        buf = self.__label_request(cmd, names, extra)
+        seq = self.__cmd_format(timeout, cmd, 0x0000, buf)
+        try:
+            data = self.__recv_loop(seq, timeout)
+        except TimeoutError as e:
+            raise TimeoutError(labels) from e
+        sizes = [
+            (lambda x: x) if v[1] else (lambda x: -(-x // 16) * 2)
+            for v in labels
+        ]
+        return self.__parse_label_response(
+            (cmd, tuple(labels)), data.data, sizes
+        )
+
+    def __label_data(self, data):
+        if self.__protocol[0]:  # Binary
+            return bytes(data)
+        else:  # ASCII
+            return util.words2hex(data)
+
+    def write_random_labels(self, label_list, timeout=0):
+        """ラベルを指定して書き込む
+
+        :param label_list: (ラベル名, 書き込みデータ)のリスト
+        :type label_list: List[(str, bytes)]
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        cmd = const.SLMPCommand.Label_LabelWriteRandom
+        if self.__protocol[0]:  # Binary
+            buf = struct.pack("<HH", len(label_list), 0)
+        else:  # ASCII
+            buf = b"%04X%04X" % (len(label_list), 0)
+        for name, data in label_list:
+            buf += util.encode_label_name(name, self.__protocol[0])
+            if self.__protocol[0]:  # Binary
+                buf += struct.pack("<H", len(data))
+            else:  # ASCII
+                buf += b"%04X" % len(data)
+            buf += self.__label_data(data)
+        self.__cmd_format(timeout, cmd, 0x0000, buf, collect=False)
+
+    def write_array_labels(self, label_list, timeout=0):
+        """配列型のラベルを指定して書き込む
+
+        :param label_list: (ラベル名, 単位指定, 配列データ長, 書き込みデータ)のリスト
+        :type label_list: List[(str, int, int, bytes)]
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        cmd = const.SLMPCommand.Label_ArrayLabelWrite
+        if self.__protocol[0]:  # Binary
+            buf = struct.pack("<HH", len(label_list), 0)
+        else:  # ASCII
+            buf = b"%04X%04X" % (len(label_list), 0)
+        for name, unit, length, data in label_list:
+            buf += util.encode_label_name(name, self.__protocol[0])
+            if self.__protocol[0]:  # Binary
+                buf += struct.pack("<BBH", unit, 0, length)
+            else:  # ASCII
+                buf += b"%02X%02X%04X" % (unit, 0, length)
+            buf += self.__label_data(data)
+        self.__cmd_format(timeout, cmd, 0x0000, buf, collect=False)
 
     def read_type_name(self, timeout=0):
         """アクセス先のユニットの形名および形名コードを読み出す
@@ -810,13 +1552,289 @@ class SLMPClient(object):
             data = self.__recv_loop(seq, timeout)
         except TimeoutError as e:
             raise TimeoutError() from e
-        buf = data[5]
+        buf = data.data
         if isinstance(buf, str):
             return buf[:16].strip(), const.TypeCode(int(buf[16:], base=16))
         else:
             (code,) = struct.unpack("<H", buf[16:])
             return buf[:16].decode("ascii").strip(), const.TypeCode(code)
 
+    def __file_name(self, name, sub_cmd):
+        """ファイル名、パスワードを要求電文の形式(文字数と文字列)にする
+
+        :param str name: ファイル名またはパスワード
+        :param int sub_cmd: サブコマンド、0x0040の場合はUTF-16
+        :return: 要求電文の形式となった文字列
+        :rtype: bytes
+        """
+        if sub_cmd & 0x0040:
+            return util.encode_label_name(name, self.__protocol[0])
+        buf = name.encode("ascii")
+        if self.__protocol[0]:  # Binary
+            return struct.pack("<H", len(buf)) + buf
+        else:  # ASCII
+            return b"%04X" % len(buf) + buf
+
+    def open_file(
+        self, filename, drive=0, write=False, password="", timeout=0
+    ):
+        """ファイルを開く
+
+        :param str filename: ファイル名(パスを含む)、
+            ASCII以外を含む場合はUTF-16で指定する(サブコマンド0x0040)
+        :param int drive: ドライブ番号
+        :param bool write: 書き込み用に開くかどうか
+        :param str password: ファイルパスワード
+        :param int timeout: タイムアウト、250msec単位
+        :return: ファイルポインタ番号
+        :rtype: int
+        """
+        cmd = const.SLMPCommand.File_OpenFile
+        try:
+            filename.encode("ascii")
+            password.encode("ascii")
+            sub_cmd = 0x0000
+        except UnicodeEncodeError:
+            sub_cmd = 0x0040
+        mode = 0x0100 if write else 0x0000
+        if sub_cmd & 0x0040:
+            buf = self.__file_name(password, sub_cmd)
+        elif self.__protocol[0]:  # Binary
+            buf = password.encode("ascii").ljust(4, b"\x00")[:4]
+        else:  # ASCII
+            buf = password.encode("ascii").ljust(4, b" ")[:4]
+        if self.__protocol[0]:  # Binary
+            buf += struct.pack("<HH", mode, drive)
+        else:  # ASCII
+            buf += b"%04X%04X" % (mode, drive)
+        buf += self.__file_name(filename, sub_cmd)
+        seq = self.__cmd_format(timeout, cmd, sub_cmd, buf)
+        try:
+            data = self.__recv_loop(seq, timeout)
+        except TimeoutError as e:
+            raise TimeoutError(filename) from e
+        if isinstance(data.data, str):
+            return int(data.data[:4], base=16)
+        else:
+            (fp,) = struct.unpack("<H", data.data[:2])
+            return fp
+
+    def __file_read_request(self, fp, offset, length):
+        if self.__protocol[0]:  # Binary
+            buf = struct.pack("<HIH", fp, offset, length)
+        else:  # ASCII
+            buf = b"%04X%08X%04X" % (fp, offset, length)
+        return const.SLMPCommand.File_ReadFile, 0x0000, buf
+
+    def __file_write_request(self, fp, offset, data):
+        if self.__protocol[0]:  # Binary
+            buf = struct.pack("<HIH", fp, offset, len(data)) + bytes(data)
+        else:  # ASCII
+            buf = b"%04X%08X%04X" % (fp, offset, len(data))
+            buf += bytes(data).hex().upper().encode("ascii")
+        return const.SLMPCommand.File_WriteFile, 0x0000, buf
+
+    @staticmethod
+    def __file_read_response(buf):
+        if isinstance(buf, str):  # ASCII
+            length = int(buf[:4], base=16)
+            return bytes.fromhex(buf[4 : 4 + length * 2])
+        (length,) = struct.unpack("<H", buf[:2])
+        return buf[2 : 2 + length]
+
+    @staticmethod
+    def __file_write_response(buf):
+        if isinstance(buf, str):  # ASCII
+            return int(buf[:4], base=16)
+        (length,) = struct.unpack("<H", buf[:2])
+        return length
+
+    def read_file(self, fp, offset, length, timeout=0):
+        """開いたファイルから読み出す
+
+        :param int fp: ファイルポインタ番号
+        :param int offset: 読み出し開始位置
+        :param int length: 読み出すバイト数、最大1920
+        :param int timeout: タイムアウト、250msec単位
+        :return: 読みだしたデータ、ファイル末尾の場合は指定より短い
+        :rtype: bytes
+        """
+        assert 0 < length <= FILE_CHUNK_SIZE, length
+        req = self.__file_read_request(fp, offset, length)
+        for buf in self.__pipeline([req], 1, timeout):
+            return self.__file_read_response(buf)
+
+    def write_file(self, fp, offset, data, timeout=0):
+        """開いたファイルに書き込む
+
+        :param int fp: ファイルポインタ番号
+        :param int offset: 書き込み開始位置
+        :param bytes data: 書き込むデータ、最大1920バイト
+        :param int timeout: タイムアウト、250msec単位
+        :return: 書き込んだバイト数
+        :rtype: int
+        """
+        assert 0 < len(data) <= FILE_CHUNK_SIZE, len(data)
+        req = self.__file_write_request(fp, offset, data)
+        for buf in self.__pipeline([req], 1, timeout):
+            return self.__file_write_response(buf)
+
+    def close_file(self, fp, timeout=0):
+        """ファイルを閉じる
+
+        :param int fp: ファイルポインタ番号
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        cmd = const.SLMPCommand.File_CloseFile
+        if self.__protocol[0]:  # Binary
+            buf = struct.pack("<HH", fp, 0)
+        else:  # ASCII
+            buf = b"%04X%04X" % (fp, 0)
+        seq = self.__cmd_format(timeout, cmd, 0x0000, buf)
+        try:
+            self.__recv_loop(seq, timeout)
+        except TimeoutError as e:
+            raise TimeoutError(fp) from e
+
+    def __abort_file(self, fp, timeout):
+        """中断した転送のファイルを閉じる
+
+        閉じられなくても中断した位置を呼び出し元へ伝えられるよう、例外は記録のみとする。
+
+        :param int fp: ファイルポインタ番号
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        try:
+            self.close_file(fp, timeout)
+        except (TimeoutError, util.SLMPError, OSError) as e:
+            self.logger.warning("close_file %d: %r", fp, e)
+
+    def download_file(
+        self,
+        filename,
+        out,
+        drive=0,
+        offset=0,
+        size=None,
+        window=4,
+        password="",
+        timeout=0,
+    ):
+        """ファイルを最大長のチャンクに分けて読み出し、ファイルオブジェクトへ書き込む
+
+        4Eフレームの場合、最大 window 個の読み出し要求を応答を待たずに送信する。
+        ただし size がNoneの場合はファイルの末尾を越えて要求しないよう、
+        短いチャンクを受信するまで1個ずつ要求する。
+        途中で失敗した場合は :class:`util.SLMPTransferInterrupted` の
+        :attr:`offset` から再開できる。
+
+        :param str filename: ファイル名(パスを含む)
+        :param out: 書き込み先、 :py:class:`mmap.mmap` などwriteを持つもの
+        :param int drive: ドライブ番号
+        :param int offset: 読み出し開始位置
+        :param int size: ファイルサイズ、Noneの場合は末尾まで読み出す
+        :param int window: 同時に応答待ちとする要求の最大数
+        :param str password: ファイルパスワード
+        :param int timeout: タイムアウト、250msec単位
+        :return: 読み出したバイト数
+        :rtype: int
+        """
+        if size is None:
+            window = 1
+        fp = self.open_file(filename, drive, False, password, timeout)
+        done = offset
+
+        def requests():
+            pos = offset
+            while size is None or pos < size:
+                length = FILE_CHUNK_SIZE
+                if size is not None:
+                    length = min(length, size - pos)
+                yield self.__file_read_request(fp, pos, length)
+                pos += length
+
+        try:
+            for buf in self.__pipeline(requests(), window, timeout):
+                data = self.__file_read_response(buf)
+                out.write(data)
+                done += len(data)
+                if len(data) < FILE_CHUNK_SIZE and (
+                    size is None or done >= size
+                ):
+                    break
+        except (TimeoutError, util.SLMPError, OSError) as e:
+            self.__abort_file(fp, timeout)
+            raise util.SLMPTransferInterrupted(done) from e
+        except BaseException:
+            self.__abort_file(fp, timeout)
+            raise
+        self.close_file(fp, timeout)
+        return done - offset
+
+    def upload_file(
+        self,
+        filename,
+        src,
+        drive=0,
+        offset=0,
+        window=4,
+        password="",
+        timeout=0,
+    ):
+        """ファイルオブジェクトの内容を最大長のチャンクに分けてファイルへ書き込む
+
+        4Eフレームの場合、最大 window 個の書き込み要求を応答を待たずに送信する。
+        途中で失敗した場合は :class:`util.SLMPTransferInterrupted` の
+        :attr:`offset` から再開できる。
+
+        :param str filename: ファイル名(パスを含む)
+        :param src: 書き込むデータ、readを持つもの、またはバッファプロトコルに対応したもの
+        :param int drive: ドライブ番号
+        :param int offset: 書き込み開始位置、srcもこの位置から読み出す
+        :param int window: 同時に応答待ちとする要求の最大数
+        :param str password: ファイルパスワード
+        :param int timeout: タイムアウト、250msec単位
+        :return: 書き込んだバイト数
+        :rtype: int
+        """
+        if hasattr(src, "read"):
+            if offset:
+                src.seek(offset)
+            read = src.read
+        else:
+            view = memoryview(src).cast("B")[offset:]
+
+            def read(n):
+                nonlocal view
+                chunk, view = view[:n], view[n:]
+                return chunk
+
+        fp = self.open_file(filename, drive, True, password, timeout)
+        done = offset
+
+        def requests():
+            pos = offset
+            while True:
+                chunk = read(FILE_CHUNK_SIZE)
+                if not len(chunk):
+                    return
+                yield self.__file_write_request(fp, pos, chunk)
+                pos += len(chunk)
+
+        try:
+            for buf in self.__pipeline(requests(), window, timeout):
+                done += self.__file_write_response(buf)
+        except (TimeoutError, util.SLMPError, OSError) as e:
+            self.__abort_file(fp, timeout)
+            raise util.SLMPTransferInterrupted(done) from e
+        except BaseException:
+            self.__abort_file(fp, timeout)
+            raise
+        self.close_file(fp, timeout)
+        return done - offset
+
     def self_test(self, data=None, timeout=0):
         """通信が正常に行えているかテストする
 
@@ -841,7 +1859,7 @@ class SLMPClient(object):
             ret = self.__recv_loop(seq, timeout)
         except TimeoutError as e:
             raise TimeoutError() from e
-        buf = ret[5]
+        buf = ret.data
         if isinstance(buf, str):
             return int(buf[:4], base=16) == len(data) and buf[4:] == data
         else:
@@ -855,7 +1873,90 @@ class SLMPClient(object):
         :param int timeout: タイムアウト、250msec単位
         :return: None
         """
-        self.__cmd_format(timeout, const.SLMPCommand.ClearError, 0x00, b"")
+        self.__cmd_format(
+            timeout, const.SLMPCommand.ClearError, 0x00, b"", collect=False
+        )
+
+    def __password(self, password):
+        """パスワードを要求電文の形式(文字数と文字列)にする
+
+        :param str password: パスワード
+        :rtype: bytes
+        """
+        buf = password.encode("ascii")
+        if self.__protocol[0]:  # Binary
+            return struct.pack("<H", len(buf)) + buf
+        else:  # ASCII
+            return b"%04X" % len(buf) + buf
+
+    def remote_password_unlock(self, password, timeout=0):
+        """リモートパスワードのロックを解除する
+
+        :param str password: リモートパスワード
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        self.__request(
+            const.SLMPCommand.RemotePassword_Unlock,
+            0x0000,
+            self.__password(password),
+            timeout,
+        )
+
+    def remote_password_lock(self, password, timeout=0):
+        """リモートパスワードをロックする
+
+        :param str password: リモートパスワード
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        self.__request(
+            const.SLMPCommand.RemotePassword_Lock,
+            0x0000,
+            self.__password(password),
+            timeout,
+        )
+
+    def __push_on_demand(self, term_code, data):
+        """受信したオンデマンド送信データを専用のキューとコールバックに渡す
+
+        キューが一杯の場合は最も古いデータを捨てる
+
+        :param int term_code: 終了コード
+        :param data: コマンド部分を含むオンデマンドデータ
+        :type data: bytes or str
+        :return: None
+        """
+        if isinstance(data, str):  # ASCII
+            data = data[8:].encode("ascii")
+        else:
+            data = data[4:]
+        while True:
+            try:
+                self.__on_demand_queue.put_nowait((term_code, data))
+                break
+            except queue.Full:
+                try:
+                    self.__on_demand_queue.get_nowait()
+                    self.on_demand_dropped += 1
+                except queue.Empty:
+                    pass
+        callback = self.on_demand_callback
+        if callback is not None:
+            if term_code != util.EndCode.Success.value:
+                self.logger.error(util.EndCode(term_code))
+                return
+            try:
+                callback(data)
+            except Exception as e:
+                self.logger.exception(e)
+
+    @staticmethod
+    def __on_demand_result(item):
+        term_code, data = item
+        if term_code != util.EndCode.Success.value:
+            raise util.SLMPCommunicationError(util.EndCode(term_code))
+        return data
 
     def check_on_demand_data(self):
         """オンデマンド送信データを受け取っていないか確認する
@@ -863,26 +1964,144 @@ class SLMPClient(object):
         :return: 受信していた場合そのデータ、受信していない場合はNone
         :rtype: Optional[bytes]
         """
-        if not self.__recv_queue:
+        try:
+            item = self.__on_demand_queue.get_nowait()
+        except queue.Empty:
+            return None
+        return self.__on_demand_result(item)
+
+    def wait_on_demand_data(self, timeout=None):
+        """オンデマンド送信データを受け取るまで待つ
+
+        :param float timeout: 待ち時間[sec]、Noneの場合は受け取るまで待つ
+        :return: 受信したデータ、時間内に受信しなかった場合はNone
+        :rtype: Optional[bytes]
+        """
+        try:
+            item = self.__on_demand_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return self.__on_demand_result(item)
+
+    def iter_on_demand_data(self, timeout=None):
+        """オンデマンド送信データを受け取る度に返すイテレータ
+
+        :param float timeout: 次のデータを待つ時間[sec]、
+            この時間内に受信しなかった場合は終了する。Noneの場合は終了しない
+        :return: 受信したデータのイテレータ
+        :rtype: Iterator[bytes]
+        """
+        while True:
+            data = self.wait_on_demand_data(timeout)
+            if data is None:
+                return
+            yield data
+
+    def __push_distribute(self, term_code, data):
+        """受信したリアルタイムデータ収集の配信データをコールバックに渡す
+
+        :param int term_code: 終了コード
+        :param data: コマンド部分を含む配信データ
+        :type data: bytes or str
+        :return: None
+        """
+        if term_code != util.EndCode.Success.value:
+            self.logger.error(util.EndCode(term_code))
             return
-        for k in self.__recv_queue.keys():
-            buf = self.__recv_queue[k][5]
-            if isinstance(buf, str):  # ASCII
-                if buf[:8] == "21010000":
-                    end_code = util.EndCode(self.__recv_queue[k][4])
-                    with self.__lock:
-                        del self.__recv_queue[k]
-                    if end_code != util.EndCode.Success:
-                        raise util.SLMPCommunicationError(end_code)
-                    return b"%s" % buf[8:]
-            else:
-                if buf[:4] == b"\x01\x21\x00\x00":
-                    end_code = util.EndCode(self.__recv_queue[k][4])
-                    with self.__lock:
-                        del self.__recv_queue[k]
-                    if end_code != util.EndCode.Success:
-                        raise util.SLMPCommunicationError(end_code)
-                    return buf[4:]
+        if isinstance(data, str):  # ASCII
+            data = bytes.fromhex(data[8:])
+        else:
+            data = data[4:]
+        callback = self.distribute_callback
+        if callback is None:
+            return
+        try:
+            callback(data)
+        except Exception as e:
+            self.logger.exception(e)
+
+    def __request(self, cmd, sub_cmd, data, timeout):
+        """要求を送信して応答データを受け取る
+
+        :return: 応答データ、ASCIIの場合は16進表現の文字列
+        :rtype: bytes or str
+        """
+        seq = self.__cmd_format(timeout, cmd, sub_cmd, data)
+        try:
+            return self.__recv_loop(seq, timeout).data
+        except TimeoutError as e:
+            raise TimeoutError(cmd) from e
+
+    def data_collection_auth(self, password, timeout=0):
+        """リアルタイムデータ収集の認証を行う
+
+        :param str password: パスワード
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        self.__request(
+            const.SLMPCommand.DataCollection_Auth,
+            0x0000,
+            self.__password(password),
+            timeout,
+        )
+
+    def data_collection_keep_alive(self, timeout=0):
+        """リアルタイムデータ収集の接続を維持する
+
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        self.__request(
+            const.SLMPCommand.DataCollection_KeepAlive, 0x0000, b"", timeout
+        )
+
+    def data_collection_get_data(self, data=b"", timeout=0):
+        """リアルタイムデータ収集のデータを要求する
+
+        :param bytes data: 要求データ(収集条件)、バイナリ表現
+        :param int timeout: タイムアウト、250msec単位
+        :return: 応答データ、バイナリ表現
+        :rtype: bytes
+        """
+        if not self.__protocol[0]:  # ASCII
+            data = bytes(data).hex().upper().encode("ascii")
+        buf = self.__request(
+            const.SLMPCommand.DataCollection_GetData, 0x0000, data, timeout
+        )
+        if isinstance(buf, str):  # ASCII
+            return bytes.fromhex(buf)
+        return buf
+
+    def __memory_read_request(self, addr, length):
+        if self.__protocol[0]:  # Binary
+            buf = struct.pack("<IH", addr, length)
+        else:
+            buf = b"%08X%04X" % (addr, length)
+        return const.SLMPCommand.Memory_Read, 0x00, buf
+
+    def __memory_write_request(self, addr, data):
+        """メモリ書き込みの要求を作成する
+
+        :param int addr: 先頭アドレス
+        :param data: ワード毎にリトルエンディアンとした書き込みデータ、
+            バイト単位のバッファ
+        :type data: bytes or memoryview
+        :return: (コマンド, サブコマンド, データ)
+        """
+        if self.__protocol[0]:  # Binary
+            buf = (struct.pack("<IH", addr, len(data) // 2), data)
+        else:
+            buf = b"%08X%04X" % (addr, len(data) // 2)
+            buf += util.words2hex(data)
+        return const.SLMPCommand.Memory_Write, 0x00, buf
+
+    @staticmethod
+    def __words_response(buf):
+        """ワード単位の応答データをバイナリと同じ並びのバイト列にする"""
+        if isinstance(buf, str):  # ASCII
+            return util.hex2words(buf)
+        return buf
 
     def memory_read(self, addr, length, timeout=0):
         """自局のメモリを読み取る
@@ -893,62 +2112,220 @@ class SLMPClient(object):
         :return: 読みだしたデータ
         :rtype: List[bytes]
         """
-        cmd = const.SLMPCommand.Memory_Read
-        sub_cmd = 0x00
-        assert 0 < length <= 480, length
+        assert 0 < length <= MEMORY_CHUNK_WORDS, length
         assert self.target.network == 0, self.target
         assert self.target.node == 0xFF, self.target
-        if self.__protocol[0]:  # Binary
-            buf = struct.pack("<IH", addr, length)
-        else:
-            buf = b"%08X%04X" % (addr, length)
+        cmd, sub_cmd, buf = self.__memory_read_request(addr, length)
         seq = self.__cmd_format(timeout, cmd, sub_cmd, buf)
         try:
             ret = self.__recv_loop(seq, timeout)
         except TimeoutError as e:
             raise TimeoutError() from e
-        buf = ret[5]
-        ret = list()
-        if isinstance(buf, str):
-            buf = list(buf)
-            buf.reverse()
-            while buf:
-                d1 = buf.pop()
-                d2 = buf.pop()
-                d3 = buf.pop()
-                d4 = buf.pop()
-                ret.append(
-                    bytes([int(d3 + d4, base=16), int(d1 + d2, base=16)])
-                )
-        else:
-            buf = list(buf)
-            buf.reverse()
-            while buf:
-                d1 = buf.pop()
-                d2 = buf.pop()
-                ret.append(bytes([d1, d2]))
-        return ret
+        buf = self.__words_response(ret.data)
+        return [bytes(buf[i : i + 2]) for i in range(0, len(buf), 2)]
 
     def memory_write(self, addr, data, timeout=0):
         """自局のメモリに書き込む
 
         :param int addr: 先頭アドレス
-        :param data: 書き込みデータ
-        :type data: List[bytes]
+        :param data: 書き込みデータ、ワード毎のバイト列のリストまたは
+            :py:func:`util.word_buffer` で扱えるもの
+        :type data: List[bytes] or bytes or numpy.ndarray
         :param int timeout: タイムアウト、250msec単位
         :return: None
         """
-        cmd = const.SLMPCommand.Memory_Write
-        sub_cmd = 0x00
-        assert 0 < len(data) <= 480, len(data)
+        if isinstance(data, list):
+            data = b"".join(data)
+        view = util.word_buffer(data)
+        assert 0 < len(view) // 2 <= MEMORY_CHUNK_WORDS, len(view) // 2
         assert self.target.network == 0, self.target
         assert self.target.node == 0xFF, self.target
+        cmd, sub_cmd, buf = self.__memory_write_request(addr, view)
+        self.__cmd_format(timeout, cmd, sub_cmd, buf, collect=False)
+
+    def __read_into(self, requests, size, out, window, timeout):
+        """分割した読み出し要求をパイプラインで送信し、応答をひとつのバッファに書き込む
+
+        :param requests: (コマンド, サブコマンド, データ)のイテラブル
+        :param int size: 読み出す合計バイト数
+        :param out: 書き込み先のバッファ、Noneの場合は新たに確保する
+        :param int window: 同時に応答待ちとする要求の最大数
+        :param int timeout: タイムアウト、250msec単位
+        :return: 読みだしたデータ
+        :rtype: memoryview
+        """
+        if out is None:
+            out = bytearray(size)
+        view = memoryview(out).cast("B")
+        assert len(view) >= size, (len(view), size)
+        pos = 0
+        try:
+            for buf in self.__pipeline(requests, window, timeout):
+                buf = self.__words_response(buf)
+                if len(buf) > size - pos:
+                    break
+                view[pos : pos + len(buf)] = buf
+                pos += len(buf)
+        except (OSError, util.SLMPError) as e:
+            raise util.SLMPTransferInterrupted(pos) from e
+        if pos != size:
+            # 応答データの長さが要求と異なる
+            raise util.SLMPTransferInterrupted(pos)
+        return view[:size]
+
+    def memory_read_bulk(self, addr, length, out=None, window=4, timeout=0):
+        """自局のメモリを480ワード毎に分割して読み取る
+
+        4Eフレームの場合、最大 window 個の読み出し要求を応答を待たずに送信し、
+        応答データは事前に確保したひとつのバッファに直接書き込む。
+
+        :param int addr: 先頭アドレス
+        :param int length: ワード長
+        :param out: 書き込み先のバッファ、 :py:class:`bytearray` や
+            :py:class:`numpy.ndarray` などバッファプロトコルに対応した書き込み可能なもの、
+            Noneの場合は新たに確保する
+        :param int window: 同時に応答待ちとする要求の最大数
+        :param int timeout: タイムアウト、250msec単位
+        :return: 読みだしたデータ(ワード毎にリトルエンディアン)
+        :rtype: memoryview
+        """
+        assert 0 < length, length
+        assert self.target.network == 0, self.target
+        assert self.target.node == 0xFF, self.target
+        requests = (
+            self.__memory_read_request(
+                addr + i, min(MEMORY_CHUNK_WORDS, length - i)
+            )
+            for i in range(0, length, MEMORY_CHUNK_WORDS)
+        )
+        return self.__read_into(requests, length * 2, out, window, timeout)
+
+    def memory_write_bulk(self, addr, data, window=4, timeout=0):
+        """自局のメモリに480ワード毎に分割して書き込む
+
+        4Eフレームの場合、最大 window 個の書き込み要求を応答を待たずに送信する。
+
+        :param int addr: 先頭アドレス
+        :param data: 書き込みデータ、 :py:func:`util.word_buffer` で扱えるもの
+        :param int window: 同時に応答待ちとする要求の最大数
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        assert self.target.network == 0, self.target
+        assert self.target.node == 0xFF, self.target
+        view = util.word_buffer(data)
+        step = MEMORY_CHUNK_WORDS * 2
+        requests = (
+            self.__memory_write_request(addr + i // 2, view[i : i + step])
+            for i in range(0, len(view), step)
+        )
+        for _ in self.__pipeline(requests, window, timeout):
+            pass
+
+    def __extend_unit_request(self, module, addr, length):
         if self.__protocol[0]:  # Binary
-            buf = struct.pack("<IH", addr, len(data))
-            for v in data:
-                buf += v
-        else:
-            buf = b"%08X%04X" % (addr, len(data))
-            for v in data:
-                buf += b"%02X%02X" % (v[1], v[0])
-        self.__cmd_format(timeout, cmd, sub_cmd, buf)
+            return struct.pack("<IHH", addr, length, module)
+        else:  # ASCII
+            return b"%08X%04X%04X" % (addr, length, module)
+
+    def __extend_unit_read_request(self, module, addr, length):
+        cmd = const.SLMPCommand.ExtendUnit_Read
+        buf = self.__extend_unit_request(module, addr, length)
+        return cmd, 0x0000, buf
+
+    def __extend_unit_write_request(self, module, addr, data):
+        cmd = const.SLMPCommand.ExtendUnit_Write
+        buf = self.__extend_unit_request(module, addr, len(data))
+        if self.__protocol[0]:  # Binary
+            buf = (buf, data)
+        else:  # ASCII
+            buf += util.words2hex(data)
+        return cmd, 0x0000, buf
+
+    def extend_unit_read(self, module, addr, length, timeout=0):
+        """インテリジェント機能ユニットのバッファメモリを読み出す
+
+        :param int module: ユニット番号(先頭入出力番号を16で割った値)
+        :param int addr: 先頭アドレス(バイト単位、バッファメモリアドレスの2倍)
+        :param int length: バイト数、最大1920
+        :param int timeout: タイムアウト、250msec単位
+        :return: 読みだしたデータ(ワード毎にリトルエンディアン)
+        :rtype: bytes
+        """
+        assert 0 < length <= EXTEND_UNIT_CHUNK_SIZE, length
+        assert length % 2 == 0, length
+        req = self.__extend_unit_read_request(module, addr, length)
+        try:
+            for buf in self.__pipeline([req], 1, timeout):
+                return bytes(self.__words_response(buf))
+        except TimeoutError as e:
+            raise TimeoutError(module, addr, length) from e
+
+    def extend_unit_write(self, module, addr, data, timeout=0):
+        """インテリジェント機能ユニットのバッファメモリに書き込む
+
+        :param int module: ユニット番号(先頭入出力番号を16で割った値)
+        :param int addr: 先頭アドレス(バイト単位、バッファメモリアドレスの2倍)
+        :param data: 書き込みデータ(ワード毎にリトルエンディアン)、最大1920バイト、
+            :py:func:`util.word_buffer` で扱えるもの
+        :type data: bytes or numpy.ndarray
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        view = util.word_buffer(data)
+        assert 0 < len(view) <= EXTEND_UNIT_CHUNK_SIZE, len(view)
+        cmd, sub_cmd, buf = self.__extend_unit_write_request(
+            module, addr, view
+        )
+        self.__cmd_format(timeout, cmd, sub_cmd, buf, collect=False)
+
+    def extend_unit_read_bulk(
+        self, module, addr, length, out=None, window=4, timeout=0
+    ):
+        """インテリジェント機能ユニットのバッファメモリを1920バイト毎に分割して読み出す
+
+        4Eフレームの場合、最大 window 個の読み出し要求を応答を待たずに送信し、
+        応答データは事前に確保したひとつのバッファに直接書き込む。
+
+        :param int module: ユニット番号(先頭入出力番号を16で割った値)
+        :param int addr: 先頭アドレス(バイト単位、バッファメモリアドレスの2倍)
+        :param int length: バイト数
+        :param out: 書き込み先のバッファ、バッファプロトコルに対応した書き込み可能なもの、
+            Noneの場合は新たに確保する
+        :param int window: 同時に応答待ちとする要求の最大数
+        :param int timeout: タイムアウト、250msec単位
+        :return: 読みだしたデータ(ワード毎にリトルエンディアン)
+        :rtype: memoryview
+        """
+        assert 0 < length, length
+        assert length % 2 == 0, length
+        requests = (
+            self.__extend_unit_read_request(
+                module, addr + i, min(EXTEND_UNIT_CHUNK_SIZE, length - i)
+            )
+            for i in range(0, length, EXTEND_UNIT_CHUNK_SIZE)
+        )
+        return self.__read_into(requests, length, out, window, timeout)
+
+    def extend_unit_write_bulk(self, module, addr, data, window=4, timeout=0):
+        """インテリジェント機能ユニットのバッファメモリに1920バイト毎に分割して書き込む
+
+        4Eフレームの場合、最大 window 個の書き込み要求を応答を待たずに送信する。
+
+        :param int module: ユニット番号(先頭入出力番号を16で割った値)
+        :param int addr: 先頭アドレス(バイト単位、バッファメモリアドレスの2倍)
+        :param data: 書き込みデータ、 :py:func:`util.word_buffer` で扱えるもの
+        :param int window: 同時に応答待ちとする要求の最大数
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        view = util.word_buffer(data)
+        step = EXTEND_UNIT_CHUNK_SIZE
+        requests = (
+            self.__extend_unit_write_request(
+                module, addr + i, view[i : i + step]
+            )
+            for i in range(0, len(view), step)
+        )
+        for _ in self.__pipeline(requests, window, timeout):
+            pass
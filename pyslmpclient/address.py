@@ -0,0 +1,332 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import functools
+from typing import Optional  # noqa
+
+import numpy as np
+
+from pyslmpclient import const
+from pyslmpclient import util
+
+# 長い名前から照合するためのデバイス名の一覧(LTNをLより先に調べるなど)
+_DEVICE_NAMES = sorted(
+    const.DeviceCode.__members__, key=lambda x: (-len(x), x)
+)
+
+
+class DeviceSpec(object):
+    __slots__ = (
+        "device_code",
+        "address",
+        "bit",
+        "extended",
+        "extended_ascii",
+        "binary",
+        "binary_extended",
+        "ascii",
+        "ascii_extended",
+    )
+
+    def __init__(self, device_code, address, bit=None):
+        """デバイス表記を要求電文の形式ごとに作成済みとしたデバイスの指定
+
+        :py:func:`device_spec` または :py:func:`parse_address` で作成すると、
+        同じデバイスの指定は同じオブジェクトになる。
+
+        :param device_code: デバイス種別
+        :type device_code: const.DeviceCode
+        :param int address: アドレス
+        :param int bit: ワードデバイスのビット位置(0から15)、Noneの場合はワード全体
+        """
+        if not isinstance(device_code, const.DeviceCode):
+            raise ValueError(device_code)
+        if bit is not None and not 0 <= bit <= 15:
+            raise ValueError(bit)
+        if bit is not None and device_code in const.D_BIT:
+            raise ValueError(device_code, bit)
+        self.device_code = device_code
+        self.address = address
+        self.bit = bit
+        self.extended = util.is_extended_device(device_code, address)
+        """バイナリ形式で4バイトアドレスの表記が必要かどうか"""
+        self.extended_ascii = util.is_extended_device(
+            device_code, address, False
+        )
+        """ASCII形式で4バイトアドレスの表記が必要かどうか"""
+        self.binary = None
+        self.ascii = None
+        if not self.extended:
+            self.binary = util.device2binary(device_code, address)
+        if not self.extended_ascii:
+            self.ascii = util.device2ascii(device_code, address)
+        self.binary_extended = util.device2binary(device_code, address, True)
+        try:
+            self.ascii_extended = util.device2ascii(device_code, address, True)
+        except ValueError:  # 10進数8桁に収まらない
+            self.ascii_extended = None
+
+    def needs_extended(self, binary):
+        """4バイトアドレスの表記が必要かどうか
+
+        :param bool binary: バイナリ形式かどうか
+        :rtype: bool
+        """
+        return self.extended if binary else self.extended_ascii
+
+    def encode(self, binary, extended):
+        """要求電文の形式となったデバイス表記
+
+        :param bool binary: バイナリ形式かどうか
+        :param bool extended: 4バイトアドレスの表記とするかどうか
+        :return: デバイス表記、4バイトアドレスでしか表せないデバイスで
+            extended がFalseの場合はNone
+        :rtype: bytes
+        """
+        if binary:
+            return self.binary_extended if extended else self.binary
+        elif extended:
+            if self.ascii_extended is None:  # 10進数8桁に収まらない
+                raise ValueError(self)
+            return self.ascii_extended
+        else:
+            return self.ascii
+
+    def __iter__(self):
+        """(デバイス種別, アドレス)として展開できるようにする"""
+        yield self.device_code
+        yield self.address
+
+    def __repr__(self):
+        if self.device_code in const.D_ADDR_16:
+            ret = "%s%X" % (self.device_code.name, self.address)
+        else:
+            ret = "%s%d" % (self.device_code.name, self.address)
+        if self.bit is not None:
+            ret += ".%X" % self.bit
+        return ret
+
+
+def device_spec(device_code, address, bit=None):
+    """デバイスの指定を作成する、同じ引数に対しては同じオブジェクトを返す
+
+    :param device_code: デバイス種別
+    :type device_code: const.DeviceCode
+    :param int address: アドレス
+    :param int bit: ワードデバイスのビット位置、Noneの場合はワード全体
+    :rtype: DeviceSpec
+    """
+    return _intern(device_code, address, bit)
+
+
+# 引数の渡し方によらず同じキーとなるよう、常に3つの位置引数で呼ぶ
+_intern = functools.lru_cache(maxsize=65536)(DeviceSpec)
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_address(text):
+    """デバイスの文字列表記を解析する
+
+    アドレスは :py:data:`pyslmpclient.const.D_ADDR_16` のデバイスは16進数、
+    それ以外は10進数とする。
+    ``.`` に続けて16進数1桁でワードデバイスのビット位置を指定できる。
+    ビットデバイスにビット位置を指定した場合("M100.3"など)はエラーとする。
+
+    "D100" --> D100, "X1F" --> X0x1F, "ZR1000.3" --> ZR0x1000のビット3
+
+    :param str text: デバイスの文字列表記
+    :rtype: DeviceSpec
+    """
+    buf = text.strip().upper()
+    word, sep, bit = buf.partition(".")
+    if sep:
+        if len(bit) != 1 or bit.strip("0123456789ABCDEF"):
+            raise ValueError(text)
+        bit = int(bit, base=16)
+    else:
+        bit = None
+    for name in _DEVICE_NAMES:
+        if not word.startswith(name) or len(word) == len(name):
+            continue
+        device_code = const.DeviceCode[name]
+        digits = word[len(name) :]
+        if device_code in const.D_ADDR_16:
+            if digits.strip("0123456789ABCDEF"):
+                continue
+            address = int(digits, base=16)
+        else:
+            if digits.strip("0123456789"):
+                continue
+            address = int(digits)
+        if bit is not None and device_code in const.D_BIT:
+            raise ValueError(text)
+        return device_spec(device_code, address, bit)
+    raise ValueError(text)
+
+
+def to_spec(device):
+    """デバイスの指定を :py:class:`DeviceSpec` に揃える
+
+    :param device: デバイスの指定、
+        (デバイス種別, アドレス), 文字列表記または :py:class:`DeviceSpec`
+    :type device: (const.DeviceCode, int) or str or DeviceSpec
+    :rtype: DeviceSpec
+    """
+    if isinstance(device, DeviceSpec):
+        return device
+    if isinstance(device, str):
+        return parse_address(device)
+    return device_spec(*device)
+
+
+DEVICE_DTYPE = np.dtype([("code", "u1"), ("address", "<u4")])
+"""デバイスリストの構造化配列の型"""
+COUNT_DTYPE = np.dtype([("code", "u1"), ("address", "<u4"), ("count", "<u2")])
+"""点数付きのデバイスリスト(ブロック読み出し)の構造化配列の型"""
+WORD_VALUE_DTYPE = np.dtype(
+    [("code", "u1"), ("address", "<u4"), ("value", "<u2")]
+)
+"""ワードの値付きのデバイスリスト(ランダム書き込み)の構造化配列の型"""
+DWORD_VALUE_DTYPE = np.dtype(
+    [("code", "u1"), ("address", "<u4"), ("value", "<u4")]
+)
+"""ダブルワードの値付きのデバイスリスト(ランダム書き込み)の構造化配列の型"""
+
+
+def _device_tables():
+    """デバイスコードを添字とした、ASCII形式のデバイス名とアドレスの表現の表
+
+    :return: デバイス名(2文字), 4バイトアドレス時のデバイス名(4文字),
+        アドレスが16進数かどうか, 4バイトアドレスでしかアクセスできないかどうか
+    :rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray)
+    """
+    names = np.zeros((256, 2), "u1")
+    names_extended = np.zeros((256, 4), "u1")
+    addr_16 = np.zeros(256, bool)
+    addr_4byte = np.zeros(256, bool)
+    for dc in const.DeviceCode:
+        spec = DeviceSpec(dc, 0)
+        if spec.ascii is not None:
+            names[dc.value] = np.frombuffer(spec.ascii[:2], "u1")
+        names_extended[dc.value] = np.frombuffer(spec.ascii_extended[:4], "u1")
+        addr_16[dc.value] = dc in const.D_ADDR_16
+        addr_4byte[dc.value] = dc in const.D_ADDR_4BYTE
+    return names, names_extended, addr_16, addr_4byte
+
+
+_NAMES, _NAMES_EXTENDED, _ADDR_16, _ADDR_4BYTE = _device_tables()
+_HEX_DIGITS = np.frombuffer(b"0123456789ABCDEF", "u1")
+
+
+def _digits(values, width, base):
+    """数値の配列を固定桁数の文字の並びにする
+
+    :param numpy.ndarray values: 数値
+    :param int width: 桁数
+    :param int base: 基数 10 or 16
+    :return: 1行1数値の文字コードの2次元配列
+    :rtype: numpy.ndarray
+    """
+    values = np.asarray(values, np.uint64)
+    powers = np.uint64(base) ** np.arange(width - 1, -1, -1, dtype=np.uint64)
+    return _HEX_DIGITS[(values[:, None] // powers) % np.uint64(base)]
+
+
+def device_array(devices, dtype=DEVICE_DTYPE):
+    """デバイスリストを構造化配列にする
+
+    :param devices: デバイスリスト、構造化配列の場合はそのまま返す、
+        デバイスの指定には文字列表記や :py:class:`DeviceSpec` も使える
+    :type devices: List[(const.DeviceCode, int, ...)] or numpy.ndarray
+    :param numpy.dtype dtype: 構造化配列の型
+    :rtype: numpy.ndarray
+    """
+    if isinstance(devices, np.ndarray):
+        return devices
+    rows = list()
+    for device in devices:
+        if isinstance(device, (str, DeviceSpec)):
+            device = tuple(to_spec(device))
+        elif isinstance(device[0], (str, DeviceSpec)):
+            # ("D100", 値) のように先頭を文字列表記とした指定
+            device = tuple(to_spec(device[0])) + tuple(device[1:])
+        rest = tuple(
+            int.from_bytes(x, "little") if isinstance(x, bytes) else x
+            for x in device[2:]
+        )
+        rows.append((device[0].value, device[1]) + rest)
+    return np.array(rows, dtype)
+
+
+def needs_extended(devices, binary=True):
+    """4バイトアドレスの表記が必要なデバイスを含むかどうか
+
+    ASCII形式では10進数のアドレスが6桁に収まらないデバイスも含める。
+
+    :param numpy.ndarray devices: デバイスリストの構造化配列
+    :param bool binary: バイナリ形式かどうか
+    :rtype: bool
+    """
+    code = devices["code"]
+    address = devices["address"]
+    if _ADDR_4BYTE[code].any() or (address > 0xFFFFFF).any():
+        return True
+    return not binary and bool((~_ADDR_16[code] & (address > 999999)).any())
+
+
+def encode_devices(devices, binary, extended, field=None):
+    """デバイスリストの構造化配列を要求電文の形式にまとめて変換する
+
+    バイナリ形式は1回の tobytes 、ASCII形式は文字コードの2次元配列の
+    tobytes で作成し、デバイス毎にPythonのオブジェクトを作らない。
+
+    :param numpy.ndarray devices: デバイスリストの構造化配列、
+        code(デバイスコードの値)と address のフィールドを持つもの
+    :param bool binary: バイナリ形式かどうか
+    :param bool extended: 4バイトアドレスの表記とするかどうか
+    :param str field: デバイス表記に続けて書き込むフィールド(点数や値)、
+        Noneの場合はデバイス表記のみ
+    :return: デバイス表記(と値)を並べたもの
+    :rtype: bytes
+    """
+    code = devices["code"].astype("<u4")
+    address = devices["address"].astype("<u4")
+    if not extended:
+        assert (address <= 0xFFFFFF).all(), address.max()
+    if field is not None:
+        extra = devices[field]
+        extra_size = extra.dtype.itemsize
+    if binary:
+        if extended:
+            fields = [("address", "<u4"), ("code", "<u2")]
+        else:  # アドレス3バイトとデバイスコード1バイトを1つの4バイト整数にする
+            fields = [("device", "<u4")]
+        if field is not None:
+            fields.append(("extra", "<u%d" % extra_size))
+        out = np.empty(len(devices), fields)
+        if extended:
+            out["address"] = address
+            out["code"] = code
+        else:
+            out["device"] = address | code << 24
+        if field is not None:
+            out["extra"] = extra
+        return out.tobytes()
+    if extended:
+        names = _NAMES_EXTENDED[code]
+        width = 8
+    else:
+        names = _NAMES[code]
+        width = 6
+    # 桁数に収まらない10進数のアドレスを切り詰めない
+    overflow = ~_ADDR_16[code] & (address >= 10**width)
+    if overflow.any():
+        raise ValueError(address[overflow][0])
+    digits = np.where(
+        _ADDR_16[code][:, None],
+        _digits(address, width, 16),
+        _digits(address, width, 10),
+    )
+    parts = [names, digits]
+    if field is not None:
+        parts.append(_digits(extra, extra_size * 2, 16))
+    return np.hstack(parts).tobytes()
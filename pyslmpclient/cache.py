@@ -0,0 +1,262 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict  # noqa
+from typing import List  # noqa
+
+from pyslmpclient import const
+from pyslmpclient.tag import dump_tags
+from pyslmpclient.tag import ReadPlan
+
+CACHE_VERSION = 1
+"""キャッシュファイルの形式のバージョン、異なる場合は読み込まない"""
+
+
+def config_hash(tags, max_gap=3):
+    """読み出し計画の元になるタグの定義のハッシュ
+
+    :param tags: 読み出すタグ
+    :type tags: List[pyslmpclient.tag.Tag]
+    :param int max_gap: 同じブロックにまとめる際に許容するタグ間の隙間のワード数
+    :return: SHA-256の16進表現
+    :rtype: str
+    """
+    buf = dump_tags(tags, max_gap)
+    return hashlib.sha256(buf.encode("utf-8")).hexdigest()
+
+
+class Capability(object):
+    __slots__ = ("type_name", "type_code", "binary", "ver", "window")
+
+    def __init__(self, type_name, type_code, binary=True, ver=4, window=4):
+        """接続先の能力
+
+        :param str type_name: 形名
+        :param type_code: 形名コード
+        :type type_code: const.TypeCode
+        :param bool binary: バイナリの交信コードで交信できるかどうか
+        :param int ver: 交信できるフレームのバージョン 4 or 3
+        :param int window: 同時に応答待ちとする要求の最大数
+        """
+        self.type_name = type_name
+        self.type_code = type_code
+        self.binary = binary
+        self.ver = ver
+        self.window = window
+
+    def __repr__(self):
+        return "Capability(%r, %s, %r, %d, %d)" % (
+            self.type_name,
+            self.type_code.name,
+            self.binary,
+            self.ver,
+            self.window,
+        )
+
+
+class PlanCache(object):
+    def __init__(self, path=None):
+        """読み出し計画と接続先の能力のキャッシュ
+
+        タグの定義から作った読み出し計画のブロックの配置と、
+        形名の読み出しで確かめた接続先の能力をJSONのファイルに保存しておき、
+        再起動後はタグの定義のハッシュが一致すれば計画を作り直さず、
+        接続先への問い合わせもせずに読み出しを始められるようにする。
+
+        :param str path: キャッシュファイルのパス、Noneの場合は保存しない
+        """
+        self.path = path
+        self.hits = 0
+        """キャッシュから返した回数
+
+        :type: int"""
+        self.misses = 0
+        """作り直したか問い合わせた回数
+
+        :type: int"""
+        self.logger = logging.getLogger(__name__).getChild(
+            self.__class__.__name__
+        )
+        self.__lock = threading.Lock()
+        """キャッシュの内容を保護する"""
+        self.__plans = dict()  # type: Dict[str, (str, int, tuple)]
+        """名前毎の(タグの定義のハッシュ, max_gap, 配置)"""
+        self.__capabilities = dict()  # type: Dict[str, Capability]
+        self.__dirty = False
+        if path is not None:
+            self.load()
+
+    @property
+    def dirty(self):
+        """読み込み後か保存後に変更されたかどうか
+
+        :rtype: bool
+        """
+        return self.__dirty
+
+    def load(self):
+        """キャッシュファイルを読み込む
+
+        ファイルがない場合や、形式が異なるか壊れている場合は空のキャッシュとする。
+
+        :return: None
+        """
+        plans = dict()
+        capabilities = dict()
+        try:
+            with open(self.path, encoding="utf-8") as fp:
+                d = json.load(fp)
+            if d["version"] != CACHE_VERSION:
+                raise ValueError(d["version"])
+            for key, p in d["plans"].items():
+                frames = [
+                    [
+                        (const.DeviceCode[dc], start, num)
+                        for dc, start, num in b
+                    ]
+                    for b in p["frames"]
+                ]
+                plans[key] = (p["hash"], p["max_gap"], (frames, p["offsets"]))
+            for key, c in d["capabilities"].items():
+                capabilities[key] = Capability(
+                    c["type_name"],
+                    const.TypeCode(c["type_code"]),
+                    c["binary"],
+                    c["ver"],
+                    c["window"],
+                )
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.logger.warning("%s: %r", self.path, e)
+            plans, capabilities = dict(), dict()
+        with self.__lock:
+            self.__plans = plans
+            self.__capabilities = capabilities
+            self.__dirty = False
+
+    def save(self):
+        """キャッシュファイルに保存する
+
+        書きかけのファイルを読み込まないよう、一時ファイルに書いてから置き換える。
+        パスを指定していない場合は何もしない。
+
+        :return: None
+        """
+        if self.path is None:
+            return
+        with self.__lock:
+            d = {
+                "version": CACHE_VERSION,
+                "plans": {
+                    key: {
+                        "hash": digest,
+                        "max_gap": max_gap,
+                        "frames": [
+                            [[dc.name, start, num] for dc, start, num in b]
+                            for b in frames
+                        ],
+                        "offsets": offsets,
+                    }
+                    for key, (digest, max_gap, (frames, offsets)) in (
+                        self.__plans.items()
+                    )
+                },
+                "capabilities": {
+                    key: {
+                        "type_name": c.type_name,
+                        "type_code": c.type_code.value,
+                        "binary": c.binary,
+                        "ver": c.ver,
+                        "window": c.window,
+                    }
+                    for key, c in self.__capabilities.items()
+                },
+            }
+            self.__dirty = False
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(d, fp, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def plan(self, key, tags, max_gap=3):
+        """読み出し計画を返す
+
+        キャッシュしたタグの定義のハッシュが一致すれば保存した配置から作り、
+        一致しなければ作り直してキャッシュする。
+
+        :param str key: 計画の名前(接続先の名前など)
+        :param tags: 読み出すタグ
+        :type tags: List[pyslmpclient.tag.Tag]
+        :param int max_gap: 同じブロックにまとめる際に許容するタグ間の隙間のワード数
+        :rtype: ReadPlan
+        """
+        digest = config_hash(tags, max_gap)
+        with self.__lock:
+            entry = self.__plans.get(key)
+        if entry is not None and entry[0] == digest:
+            try:
+                plan = ReadPlan(tags, max_gap, entry[2])
+            except ValueError as e:
+                self.logger.warning("%s: %r", key, e)
+            else:
+                with self.__lock:
+                    self.hits += 1
+                return plan
+        plan = ReadPlan(tags, max_gap)
+        with self.__lock:
+            self.__plans[key] = (digest, max_gap, plan.layout)
+            self.__dirty = True
+            self.misses += 1
+        return plan
+
+    def capability(self, key, client, timeout=0, window=None):
+        """接続先の能力を返す
+
+        キャッシュしていないか、クライアントの交信コードやフレームが
+        キャッシュしたものと異なる場合は、形名を読み出して確かめる。
+
+        :param str key: 接続先の名前
+        :param client: 接続先のクライアント、開始しているもの
+        :type client: pyslmpclient.SLMPClient
+        :param int timeout: 形名の読み出しのタイムアウト、250msec単位
+        :param int window: 同時に応答待ちとする要求の最大数、
+            Noneの場合は4Eフレームで4、3Eフレームで1
+        :rtype: Capability
+        """
+        binary, ver, _ = client.protocol
+        with self.__lock:
+            cap = self.__capabilities.get(key)
+        if cap is not None and (cap.binary, cap.ver) == (binary, ver):
+            if window is None or cap.window == window:
+                with self.__lock:
+                    self.hits += 1
+                return cap
+        type_name, type_code = client.read_type_name(timeout)
+        if window is None:
+            window = 4 if ver == 4 else 1
+        cap = Capability(type_name, type_code, binary, ver, window)
+        with self.__lock:
+            self.__capabilities[key] = cap
+            self.__dirty = True
+            self.misses += 1
+        return cap
+
+    def invalidate(self, key=None):
+        """キャッシュを破棄する
+
+        :param str key: 破棄する計画と接続先の名前、Noneの場合は全て
+        :return: None
+        """
+        with self.__lock:
+            if key is None:
+                self.__plans.clear()
+                self.__capabilities.clear()
+            else:
+                self.__plans.pop(key, None)
+                self.__capabilities.pop(key, None)
+            self.__dirty = True
@@ -0,0 +1,356 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+from concurrent.futures import Future
+import struct
+import threading
+from typing import Dict  # noqa
+from typing import List  # noqa
+from typing import Optional  # noqa
+
+from pyslmpclient import const
+from pyslmpclient.const import MAX_BLOCK_POINTS
+from pyslmpclient.const import MAX_BLOCKS
+from pyslmpclient.const import MAX_RANDOM_BITS
+from pyslmpclient.const import MAX_RANDOM_WORDS
+
+_WORD = "word"
+_BIT = "bit"
+_DWORD = "dword"
+
+
+def _runs(addresses):
+    """アドレスの集合を連続した範囲に分割する
+
+    :param addresses: アドレスの集合
+    :return: (先頭アドレス, 点数)のリスト
+    :rtype: List[(int, int)]
+    """
+    runs = list()
+    for addr in sorted(addresses):
+        if runs and runs[-1][0] + runs[-1][1] == addr:
+            runs[-1][1] += 1
+        else:
+            runs.append([addr, 1])
+    return [(start, num) for start, num in runs]
+
+
+class WriteCoalescer(object):
+    def __init__(self, client, window=0.01, timeout=0):
+        """書き込み要求を一定時間ためて、まとめて送信するライトビハインドバッファ
+
+        隣接・重複するアドレスへの書き込みを併合し、
+        一括書き込み(ブロック)とランダム書き込みの最小限のフレームで送信する。
+        同じアドレスへの書き込みは後から書き込んだ値が優先される。
+
+        :param client: 書き込みに使用するクライアント
+        :type client: pyslmpclient.SLMPClient
+        :param float window: 最初の書き込みから送信までの待ち時間[sec]
+        :param int timeout: 送信時の監視時間、250msec単位
+        """
+        self.client = client
+        self.window = window
+        self.timeout = timeout
+        self.__lock = threading.Lock()
+        self.__flush_lock = threading.Lock()
+        self.__timer = None  # type: Optional[threading.Timer]
+        self.__words = dict()  # type: Dict[const.DeviceCode, Dict[int, int]]
+        """ワードアクセスで書き込む値 デバイス種別 -> {アドレス: 値}"""
+        self.__bits = dict()  # type: Dict[const.DeviceCode, Dict[int, bool]]
+        """ビットアクセスで書き込む値 デバイス種別 -> {アドレス: 値}"""
+        self.__dwords = dict()  # type: Dict[const.DeviceCode, Dict[int, int]]
+        """ダブルワードアクセスで書き込む値 デバイス種別 -> {アドレス: 値}"""
+        self.__writers = (
+            dict()
+        )  # type: Dict[(str, const.DeviceCode, int), List[Future]]
+        """(アクセス単位, デバイス種別, アドレス)毎の書き込み要求元"""
+
+    def __enter__(self):
+        """コンテキスト構文用
+
+        :return: 自身
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """コンテキスト構文用、抜ける際に溜まっている書き込みを送信する"""
+        self.close()
+        return False
+
+    def __conflict(self, kind, dc, addresses):
+        """溜まっている書き込みと、アクセス単位の違いで順序を保証できないかどうか
+
+        ロックを取得して呼び出す。
+
+        :param str kind: アクセス単位
+        :param dc: デバイス種別
+        :type dc: const.DeviceCode
+        :param addresses: 書き込むアドレス
+        :type addresses: List[int]
+        :rtype: bool
+        """
+        if kind == _BIT:
+            return dc in self.__words or dc in self.__dwords
+        if dc in self.__bits:
+            return True
+        words = self.__words.get(dc, ())
+        dwords = self.__dwords.get(dc, ())
+        if kind == _WORD:
+            return any(a in dwords or a - 1 in dwords for a in addresses)
+        # 先頭アドレスの異なるダブルワード同士が重なる場合も含める
+        return any(
+            a in words or a + 1 in words or a - 1 in dwords or a + 1 in dwords
+            for a in addresses
+        )
+
+    def __put(self, kind, dc, values):
+        """書き込み要求をバッファに追加する
+
+        :param str kind: アクセス単位
+        :param dc: デバイス種別
+        :type dc: const.DeviceCode
+        :param values: アドレスと値の組
+        :type values: List[(int, int)]
+        :return: 書き込み結果を受け取るFuture
+        :rtype: Future
+        """
+        if not isinstance(dc, const.DeviceCode):
+            raise ValueError(dc)
+        future = Future()
+        with self.__lock:
+            conflict = self.__conflict(kind, dc, [a for a, _ in values])
+        if conflict:
+            # 同じデバイスへのアクセス単位の異なる書き込みは順序を保証できないため、
+            # 先に溜まっている分を送信する
+            self.flush()
+        with self.__lock:
+            pending = {
+                _WORD: self.__words,
+                _BIT: self.__bits,
+                _DWORD: self.__dwords,
+            }[kind]
+            dev = pending.setdefault(dc, dict())
+            for addr, value in values:
+                dev[addr] = value
+                self.__writers.setdefault((kind, dc, addr), list()).append(
+                    future
+                )
+            if self.__timer is None:
+                self.__timer = threading.Timer(self.window, self.flush)
+                self.__timer.daemon = True
+                self.__timer.start()
+        return future
+
+    def write_word_devices(self, dc, start_num, data):
+        """ワードデバイスへの連続書き込みを予約する
+
+        :param dc: デバイス種別
+        :type dc: const.DeviceCode
+        :param int start_num: 開始アドレス
+        :param data: 書き込むデータ
+        :type data: List[int]
+        :return: 書き込み結果を受け取るFuture
+        :rtype: Future
+        """
+        return self.__put(
+            _WORD, dc, [(start_num + i, v) for i, v in enumerate(data)]
+        )
+
+    def write_bit_devices(self, dc, start_num, data):
+        """ビットデバイスへの連続書き込みを予約する
+
+        :param dc: デバイス種別
+        :type dc: const.DeviceCode
+        :param int start_num: 開始アドレス
+        :param data: 書き込むデータ
+        :type data: List[int]
+        :return: 書き込み結果を受け取るFuture
+        :rtype: Future
+        """
+        return self.__put(
+            _BIT, dc, [(start_num + i, bool(v)) for i, v in enumerate(data)]
+        )
+
+    def write_random_word_devices(self, word_list, dword_list):
+        """連続していないワードデバイスへの書き込みを予約する
+
+        ダブルワードはダブルワードのままランダム書き込みで送信し、
+        ワードの書き込みと併合しない。
+
+        :param word_list: ワード単位でアクセスするデバイス
+        :type word_list: List[(const.DeviceCode, int, bytes)]
+        :param dword_list: ダブルワード単位でアクセスするデバイス
+        :type dword_list: List[(const.DeviceCode, int, bytes)]
+        :return: 書き込み結果を受け取るFuture
+        :rtype: Future
+        """
+        values = dict()  # type: Dict[(str, const.DeviceCode), List]
+        for dc, addr, v in word_list:
+            (w,) = struct.unpack("<H", bytes(v[:2]).ljust(2, b"\x00"))
+            values.setdefault((_WORD, dc), list()).append((addr, w))
+        for dc, addr, v in dword_list:
+            (d,) = struct.unpack("<I", bytes(v[:4]).ljust(4, b"\x00"))
+            values.setdefault((_DWORD, dc), list()).append((addr, d))
+        return self.__put_many(values)
+
+    def write_random_bit_devices(self, device_list):
+        """連続していないビットデバイスへの書き込みを予約する
+
+        :param device_list: 書き込むデバイスと値のリスト(デバイス種別、アドレス、値)
+        :type device_list: List[(const.DeviceCode, int, bool)]
+        :return: 書き込み結果を受け取るFuture
+        :rtype: Future
+        """
+        values = dict()  # type: Dict[(str, const.DeviceCode), List]
+        for dc, addr, v in device_list:
+            values.setdefault((_BIT, dc), list()).append((addr, bool(v)))
+        return self.__put_many(values)
+
+    def __put_many(self, values):
+        """複数デバイス種別にまたがる書き込み要求をひとつのFutureにまとめる"""
+        futures = [self.__put(kind, dc, v) for (kind, dc), v in values.items()]
+        future = Future()
+        if not futures:
+            future.set_result(None)
+            return future
+        rest = [len(futures)]
+        lock = threading.Lock()
+
+        def done(f):
+            with lock:
+                rest[0] -= 1
+                last = rest[0] == 0
+            if f.exception() is not None:
+                if not future.done():
+                    future.set_exception(f.exception())
+            elif last and not future.done():
+                future.set_result(None)
+
+        for f in futures:
+            f.add_done_callback(done)
+        return future
+
+    def __plan(self, words, bits, dwords):
+        """溜まっている書き込みを送信するフレームに分割する
+
+        連続2点以上のワードと、連続16点以上のビットは一括書き込み(ブロック)、
+        それ以外とダブルワードはランダム書き込みで送信する。
+
+        :return: (コマンド, 引数, 含まれるアドレス)のリスト
+        :rtype: List[(str, tuple, List[(str, const.DeviceCode, int)])]
+        """
+        w_blocks = list()
+        b_blocks = list()
+        r_words = list()
+        r_bits = list()
+        for dc, dev in words.items():
+            for start, num in _runs(dev.keys()):
+                if num == 1:
+                    r_words.append((dc, start, dev[start]))
+                    continue
+                for s in range(start, start + num, MAX_BLOCK_POINTS):
+                    n = min(MAX_BLOCK_POINTS, start + num - s)
+                    if n == 1:
+                        r_words.append((dc, s, dev[s]))
+                    else:
+                        data = [dev[a] for a in range(s, s + n)]
+                        w_blocks.append((dc, s, n, data))
+        for dc, dev in bits.items():
+            for start, num in _runs(dev.keys()):
+                n_word = num // 16
+                for s in range(start, start + n_word * 16, 16 * 60):
+                    n = min(60, (start + n_word * 16 - s) // 16)
+                    data = [dev[a] for a in range(s, s + n * 16)]
+                    b_blocks.append((dc, s, n, data))
+                for a in range(start + n_word * 16, start + num):
+                    r_bits.append((dc, a, dev[a]))
+
+        frames = list()
+        blocks = [(False, b) for b in w_blocks] + [(True, b) for b in b_blocks]
+        while blocks:
+            w_list = list()
+            b_list = list()
+            points = 0
+            while blocks and len(w_list) + len(b_list) < MAX_BLOCKS:
+                bit, block = blocks[0]
+                if points + block[2] > MAX_BLOCK_POINTS:
+                    break
+                blocks.pop(0)
+                points += block[2]
+                (b_list if bit else w_list).append(block)
+            addresses = [
+                (_WORD, dc, a)
+                for dc, s, n, _ in w_list
+                for a in range(s, s + n)
+            ] + [
+                (_BIT, dc, a)
+                for dc, s, n, _ in b_list
+                for a in range(s, s + n * 16)
+            ]
+            frames.append(("write_block", (w_list, b_list), addresses))
+        # ワードとダブルワードの合計で点数の上限とする
+        r_points = [
+            (_WORD, dc, a, struct.pack("<H", v)) for dc, a, v in r_words
+        ]
+        for dc, dev in dwords.items():
+            for a in sorted(dev):
+                r_points.append((_DWORD, dc, a, struct.pack("<I", dev[a])))
+        for i in range(0, len(r_points), MAX_RANDOM_WORDS):
+            chunk = r_points[i:][:MAX_RANDOM_WORDS]
+            args = (
+                [(dc, a, v) for kind, dc, a, v in chunk if kind == _WORD],
+                [(dc, a, v) for kind, dc, a, v in chunk if kind == _DWORD],
+            )
+            addresses = [(kind, dc, a) for kind, dc, a, _ in chunk]
+            frames.append(("write_random_word_devices", args, addresses))
+        for i in range(0, len(r_bits), MAX_RANDOM_BITS):
+            chunk = r_bits[i:][:MAX_RANDOM_BITS]
+            addresses = [(_BIT, dc, a) for dc, a, _ in chunk]
+            frames.append(("write_random_bit_devices", (chunk,), addresses))
+        return frames
+
+    def flush(self):
+        """溜まっている書き込みを送信する
+
+        フレーム毎に応答を待ち、各書き込み要求のFutureには、
+        その要求を含むフレームの結果が設定される。
+        異常応答の場合は :class:`pyslmpclient.util.SLMPCommunicationError` 、
+        応答がない場合は :py:class:`TimeoutError` となる。
+
+        :return: None
+        """
+        with self.__flush_lock:
+            with self.__lock:
+                if self.__timer is not None:
+                    self.__timer.cancel()
+                    self.__timer = None
+                words, self.__words = self.__words, dict()
+                bits, self.__bits = self.__bits, dict()
+                dwords, self.__dwords = self.__dwords, dict()
+                writers, self.__writers = self.__writers, dict()
+            failed = dict()  # type: Dict[Future, Exception]
+            for method, args, addresses in self.__plan(words, bits, dwords):
+                try:
+                    getattr(self.client, method)(
+                        *args, timeout=self.timeout, wait=True
+                    )
+                except Exception as e:
+                    for key in addresses:
+                        for f in writers[key]:
+                            failed.setdefault(f, e)
+            done = set()
+            for futures in writers.values():
+                for f in futures:
+                    if f in done:
+                        continue
+                    done.add(f)
+                    if f in failed:
+                        f.set_exception(failed[f])
+                    else:
+                        f.set_result(None)
+
+    def close(self):
+        """溜まっている書き込みを送信してタイマを止める
+
+        :return: None
+        """
+        self.flush()
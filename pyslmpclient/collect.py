@@ -0,0 +1,183 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from typing import Dict  # noqa
+from typing import Optional  # noqa
+
+import numpy as np
+
+
+class DataCollectionSubscriber(object):
+    def __init__(
+        self,
+        client,
+        dtype,
+        callback,
+        password=None,
+        request=b"",
+        keep_alive=10.0,
+        batch_size=1024,
+        header_size=0,
+    ):
+        """リアルタイムデータ収集の配信データを受け取り、列毎のNumPy配列にまとめる
+
+        配信データはヘッダの後にサンプルのレコードが並んでいるものとし、
+        レコードの構造は dtype で指定する。
+        サンプル毎にPythonのオブジェクトは作らず、
+        batch_size 個たまる毎にフィールド名と配列の辞書を callback に渡す。
+
+        :param client: 使用するクライアント
+        :type client: pyslmpclient.SLMPClient
+        :param dtype: 1サンプルのレコードの構造
+        :type dtype: numpy.dtype
+        :param callback: 列毎の配列を受け取る関数
+        :type callback: Callable[[Dict[str, numpy.ndarray]], None]
+        :param str password: 認証に使用するパスワード、Noneの場合は認証しない
+        :param bytes request: 配信開始時に送る要求データ(収集条件)
+        :param float keep_alive: 接続維持の要求を送る間隔[sec]、0の場合は送らない
+        :param int batch_size: callbackに渡す1回あたりのサンプル数
+        :param int header_size: 配信データの先頭の読み飛ばすバイト数
+        """
+        self.client = client
+        self.dtype = np.dtype(dtype)
+        self.callback = callback
+        self.password = password
+        self.request = request
+        self.keep_alive = keep_alive
+        self.batch_size = batch_size
+        self.header_size = header_size
+        self.received = 0
+        """受信したサンプル数
+
+        :type: int"""
+        self.logger = logging.getLogger(__name__).getChild(
+            self.__class__.__name__
+        )
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None  # type: Optional[threading.Thread]
+        self.__columns = self.__allocate()
+        self.__pos = 0
+
+    def __allocate(self):
+        """列毎の配列を確保する
+
+        :rtype: Dict[str, numpy.ndarray]
+        """
+        return {
+            name: np.empty(self.batch_size, self.dtype.fields[name][0])
+            for name in self.dtype.names
+        }
+
+    def __enter__(self):
+        """コンテキスト構文用
+
+        :return: 自身
+        """
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """コンテキスト構文用"""
+        self.stop()
+        return False
+
+    def start(self, timeout=0):
+        """認証を行い、配信を開始する
+
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        if self.__thread is not None:
+            raise RuntimeError("配信は開始済み")
+        if self.password is not None:
+            self.client.data_collection_auth(self.password, timeout)
+        # 開始の応答の直後に届く配信データも受け取れるよう、先に設定しておく
+        previous = self.client.distribute_callback
+        self.client.distribute_callback = self.on_data
+        try:
+            self.client.data_collection_get_data(self.request, timeout)
+        except Exception:
+            self.client.distribute_callback = previous
+            raise
+        self.__stop.clear()
+        if self.keep_alive > 0:
+            self.__thread = threading.Thread(
+                target=self.__keep_alive_worker, daemon=True
+            )
+            self.__thread.start()
+
+    def stop(self):
+        """配信の受け取りをやめ、残っているサンプルを callback に渡す
+
+        :return: None
+        """
+        self.__stop.set()
+        if self.client.distribute_callback == self.on_data:
+            self.client.distribute_callback = None
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        self.flush()
+
+    def __keep_alive_worker(self):
+        while not self.__stop.wait(self.keep_alive):
+            try:
+                self.client.data_collection_keep_alive()
+            except Exception as e:
+                self.logger.error(e)
+
+    def on_data(self, payload):
+        """配信データを列毎の配列に追加する
+
+        通常はクライアントの受信スレッドから呼ばれる
+
+        :param bytes payload: コマンド部分を除いた配信データ
+        :return: None
+        """
+        records = np.frombuffer(
+            payload,
+            self.dtype,
+            count=(len(payload) - self.header_size) // self.dtype.itemsize,
+            offset=self.header_size,
+        )
+        with self.__lock:
+            self.received += len(records)
+            i = 0
+            while i < len(records):
+                n = min(len(records) - i, self.batch_size - self.__pos)
+                dst = slice(self.__pos, self.__pos + n)
+                src = slice(i, i + n)
+                for name, column in self.__columns.items():
+                    column[dst] = records[name][src]
+                self.__pos += n
+                i += n
+                if self.__pos == self.batch_size:
+                    self.__emit()
+
+    def __emit(self):
+        """たまっているサンプルを callback に渡す
+
+        渡した配列はそのまま callback 側で保持できるよう、次の分は新たに確保する
+        """
+        if self.__pos == 0:
+            return
+        columns = {
+            name: column[: self.__pos]
+            for name, column in self.__columns.items()
+        }
+        self.__columns = self.__allocate()
+        self.__pos = 0
+        try:
+            self.callback(columns)
+        except Exception as e:
+            self.logger.exception(e)
+
+    def flush(self):
+        """たまっているサンプルを batch_size に満たなくても callback に渡す
+
+        :return: None
+        """
+        with self.__lock:
+            self.__emit()
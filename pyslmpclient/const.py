@@ -185,8 +185,71 @@ D_ADDR_4BYTE = (
     DeviceCode.LZ,
     DeviceCode.RD,
 )
+# ビットデバイスの一覧(それ以外はワードデバイス)
+D_BIT = (
+    DeviceCode.SM,
+    DeviceCode.X,
+    DeviceCode.Y,
+    DeviceCode.M,
+    DeviceCode.L,
+    DeviceCode.F,
+    DeviceCode.V,
+    DeviceCode.B,
+    DeviceCode.TS,
+    DeviceCode.TC,
+    DeviceCode.LTS,
+    DeviceCode.LTC,
+    DeviceCode.SS,
+    DeviceCode.SC,
+    DeviceCode.LSTS,
+    DeviceCode.LSTC,
+    DeviceCode.CS,
+    DeviceCode.CC,
+    DeviceCode.SB,
+    DeviceCode.DX,
+    DeviceCode.DY,
+    DeviceCode.LCS,
+    DeviceCode.LCC,
+)
 # 4バイトアドレスと2バイトアドレスで名前の違うデバイス
 D_STRANGE_NAME = {DeviceCode.SS, DeviceCode.SC, DeviceCode.SN}
+# 再送しても結果の変わらない(読み出しのみの)コマンド
+IDEMPOTENT_COMMANDS = frozenset(
+    {
+        SLMPCommand.Device_Read,
+        SLMPCommand.Device_ReadRandom,
+        SLMPCommand.Device_ExecuteMonitor,
+        SLMPCommand.Device_ReadBlock,
+        SLMPCommand.Label_ArrayLabelRead,
+        SLMPCommand.Label_LabelReadRandom,
+        SLMPCommand.Memory_Read,
+        SLMPCommand.ExtendUnit_Read,
+        SLMPCommand.RemoteControl_ReadTypeName,
+        SLMPCommand.File_ReadFile,
+        SLMPCommand.SelfTest,
+    }
+)
+# 一括書き込み(ブロック)1回あたりのブロック数の上限
+MAX_BLOCKS = 120
+# 一括読み出し・書き込み(ブロック)1回あたりのワード点数の上限
+MAX_BLOCK_POINTS = 960
+# ランダム書き込み(ワード)1回あたりの点数の上限
+MAX_RANDOM_WORDS = 80
+# ランダム書き込み(ビット)1回あたりの点数の上限
+MAX_RANDOM_BITS = 188
+
+
+class LabelDataType(enum.Enum):
+    Bit = 1
+    Word = 2
+    DoubleWord = 3
+    Int = 4
+    DoubleInt = 5
+    Real = 6
+    LongReal = 7
+    Time = 8
+    String = 9
+    UnicodeString = 10
 
 
 class TypeCode(enum.Enum):
@@ -0,0 +1,239 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+from typing import Callable  # noqa
+from typing import Dict  # noqa
+from typing import Iterator  # noqa
+from typing import Optional  # noqa
+
+from pyslmpclient import timer
+from pyslmpclient import util
+
+SELF_TEST = "self_test"
+"""折り返しテストで到達を確認する"""
+TYPE_NAME = "type_name"
+"""形名の読み出しで到達を確認する"""
+
+
+class Fleet(object):
+    def __init__(
+        self,
+        clients,
+        workers=32,
+        connect_timeout=1.0,
+        probe=SELF_TEST,
+        probe_timeout=4,
+        retry_interval=10.0,
+        on_ready=None,
+    ):
+        """多数の接続先への接続を並行して開始する
+
+        接続と到達の確認をスレッドプールで並行して行い、
+        確認できた接続先から順に :meth:`as_ready` や on_ready で知らせる。
+        接続できない接続先は retry_interval 毎にバックグラウンドで再試行するので、
+        停止している接続先が起動を遅らせることはない。
+
+        :param clients: 接続先の名前と、まだ開始していないクライアント
+        :type clients: Dict[str, pyslmpclient.SLMPClient]
+        :param int workers: 同時に接続を試みる数
+        :param float connect_timeout: 接続のタイムアウト[sec]
+        :param str probe: 到達の確認方法 :py:data:`SELF_TEST`, :py:data:`TYPE_NAME`
+            または None (確認しない、UDPでは常に接続できたことになる)
+        :param int probe_timeout: 到達の確認のタイムアウト、250msec単位
+        :param float retry_interval: 接続できなかった接続先を再試行する間隔[sec]
+        :param on_ready: 接続先の準備ができた際に、プールのスレッドから呼ばれる関数
+        :type on_ready: Callable[[str, pyslmpclient.SLMPClient], None]
+        """
+        assert probe in (SELF_TEST, TYPE_NAME, None), probe
+        assert 0 < probe_timeout, probe_timeout
+        self.clients = dict(clients)
+        self.workers = max(1, min(workers, len(self.clients)))
+        self.connect_timeout = connect_timeout
+        self.probe = probe
+        self.probe_timeout = probe_timeout
+        self.retry_interval = retry_interval
+        self.on_ready = on_ready
+        self.logger = logging.getLogger(__name__).getChild(
+            self.__class__.__name__
+        )
+        self.__cond = threading.Condition(threading.Lock())
+        """準備のできた接続先、接続できない接続先、再試行の期限を保護する"""
+        self.__ready = dict()  # type: Dict[str, object]
+        self.__dead = dict()  # type: Dict[str, Exception]
+        self.__retries = timer.TimerWheel(time.monotonic())
+        self.__ready_queue = queue.Queue()
+        self.__executor = (
+            None
+        )  # type: Optional[concurrent.futures.ThreadPoolExecutor]
+        self.__retry_thread = None  # type: Optional[threading.Thread]
+        self.__stopped = True
+
+    def start(self):
+        """全ての接続先への接続を並行して開始する
+
+        接続の完了は待たない。
+
+        :return: None
+        """
+        self.__stopped = False
+        self.__executor = concurrent.futures.ThreadPoolExecutor(self.workers)
+        self.__retry_thread = threading.Thread(
+            target=self.__retry_worker, daemon=True
+        )
+        self.__retry_thread.start()
+        for name in self.clients:
+            self.__executor.submit(self.__bring_up, name)
+
+    def stop(self):
+        """再試行を止め、開始した接続を全て終了する
+
+        :return: None
+        """
+        with self.__cond:
+            self.__stopped = True
+            self.__cond.notify_all()
+        if self.__retry_thread is not None:
+            self.__retry_thread.join()
+            self.__retry_thread = None
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
+        with self.__cond:
+            ready, self.__ready = self.__ready, dict()
+        for client in ready.values():
+            client.close()
+
+    def __enter__(self):
+        """コンテキスト構文用
+
+        :return: 自身
+        """
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """コンテキスト構文用"""
+        self.stop()
+        return False
+
+    def __getitem__(self, name):
+        """準備のできた接続先のクライアント
+
+        :param str name: 接続先の名前
+        :rtype: pyslmpclient.SLMPClient
+        """
+        with self.__cond:
+            return self.__ready[name]
+
+    @property
+    def ready(self):
+        """準備のできた接続先の名前とクライアント
+
+        :rtype: Dict[str, pyslmpclient.SLMPClient]
+        """
+        with self.__cond:
+            return dict(self.__ready)
+
+    @property
+    def dead(self):
+        """接続できていない接続先の名前と最後の失敗の理由
+
+        :rtype: Dict[str, Exception]
+        """
+        with self.__cond:
+            return dict(self.__dead)
+
+    def wait(self, count=None, timeout=None):
+        """指定した数の接続先の準備ができるまで待つ
+
+        :param int count: 待つ接続先の数、Noneの場合は全て
+        :param float timeout: 待つ時間[sec]、Noneの場合は無制限
+        :return: 準備ができた場合はTrue
+        :rtype: bool
+        """
+        if count is None:
+            count = len(self.clients)
+        with self.__cond:
+            return (
+                self.__cond.wait_for(
+                    lambda: len(self.__ready) >= count or self.__stopped,
+                    timeout,
+                )
+                and len(self.__ready) >= count
+            )
+
+    def as_ready(self, timeout=None):
+        """準備のできた接続先の名前を準備のできた順に返す
+
+        全ての接続先の準備ができるか、
+        timeout の間に新たに準備のできた接続先がなければ終了する。
+
+        :param float timeout: 次の接続先を待つ時間[sec]、Noneの場合は無制限
+        :rtype: Iterator[str]
+        """
+        for _ in range(len(self.clients)):
+            try:
+                yield self.__ready_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+
+    def __bring_up(self, name):
+        """接続を開始し、到達を確認する(プールのスレッドで実行する)
+
+        :param str name: 接続先の名前
+        """
+        if self.__stopped:
+            return
+        client = self.clients[name]
+        try:
+            client.open(self.connect_timeout)
+        except OSError as e:
+            self.__failed(name, e)
+            return
+        try:
+            if self.probe == SELF_TEST:
+                if not client.self_test(timeout=self.probe_timeout):
+                    raise util.SLMPError("折り返しデータの不一致")
+            elif self.probe == TYPE_NAME:
+                client.read_type_name(timeout=self.probe_timeout)
+        except (TimeoutError, OSError, util.SLMPError) as e:
+            client.close()
+            self.__failed(name, e)
+            return
+        with self.__cond:
+            self.__ready[name] = client
+            self.__dead.pop(name, None)
+            self.__cond.notify_all()
+        self.__ready_queue.put(name)
+        if self.on_ready is not None:
+            self.on_ready(name, client)
+
+    def __failed(self, name, e):
+        """接続できなかった接続先を再試行の期限に登録する
+
+        :param str name: 接続先の名前
+        :param Exception e: 失敗の理由
+        """
+        self.logger.info("%s: %r", name, e)
+        with self.__cond:
+            self.__dead[name] = e
+            self.__retries.add(name, self.retry_interval, time.monotonic())
+            self.__cond.notify_all()
+
+    def __retry_worker(self):
+        while True:
+            with self.__cond:
+                while not self.__stopped and not len(self.__retries):
+                    self.__cond.wait()
+                if self.__stopped:
+                    return
+                self.__cond.wait(timer.TICK)
+                if self.__stopped:
+                    return
+                names = self.__retries.advance(time.monotonic())
+            for name in names:
+                self.__executor.submit(self.__bring_up, name)
@@ -0,0 +1,337 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import bisect
+import collections
+import itertools
+import threading
+import time
+from typing import Dict  # noqa
+from typing import List  # noqa
+
+from pyslmpclient import const
+from pyslmpclient import timer
+
+LATENCY_BOUNDS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+"""応答時間、送信時間のヒストグラムの区切り[sec]"""
+DEPTH_BOUNDS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+"""応答待ちの要求数のヒストグラムの区切り"""
+
+
+class Histogram(object):
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        """区切りを固定したヒストグラム
+
+        :param bounds: 各区間の上限(昇順)、最後に上限なしの区間を加える
+        :type bounds: Tuple[float]
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """値を追加する
+
+        :param float value: 値
+        :return: None
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """区間の上限と、その上限以下の値の数(Prometheusのbucket形式)
+
+        :rtype: List[(float, int)]
+        """
+        ret = list()
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            ret.append((bound, total))
+        return ret
+
+
+class ClientMetrics(object):
+    def __init__(
+        self, latency_bounds=LATENCY_BOUNDS, depth_bounds=DEPTH_BOUNDS
+    ):
+        """:py:class:`pyslmpclient.SLMPClient` の要求と応答の計測値
+
+        ``client.metrics`` に設定すると計測を始める。
+        設定しない(None)場合、クライアント側のコストは属性の参照1回のみ。
+        on_* メソッドを持つ別のオブジェクトを設定して、
+        StatsD等に直接送ることもできる。
+
+        計測値は (接続先, 通信対象, コマンド名) 毎に集計し、
+        :meth:`samples` で Prometheus 形式の名前とラベルの組として取り出せる。
+
+        :param latency_bounds: 応答時間、送信時間のヒストグラムの区切り[sec]
+        :param depth_bounds: 応答待ちの要求数のヒストグラムの区切り
+        """
+        self.latency_bounds = latency_bounds
+        self.depth_bounds = depth_bounds
+        self.__lock = threading.Lock()
+        self.__pending = dict()  # type: Dict[(str, int), collections.deque]
+        """(接続先, シリアル番号)と応答待ちの要求の番号(送信順)
+
+        複数のクライアントで共有しても、シリアル番号が重なる要求を区別できるようにする。
+        シリアル番号のない3Eフレームの要求は、応答が送信順に届くものとして扱う"""
+        self.__requests = dict()  # type: Dict[int, (str, int, float, tuple)]
+        """要求の番号と(接続先, シリアル番号, 送信時刻, (接続先, 通信対象, コマンド名))"""
+        self.__ids = itertools.count()
+        self.__deadlines = timer.TimerWheel(time.monotonic())
+        """応答のないまま残っている要求を計測から外す期限"""
+        self.counters = collections.defaultdict(
+            int
+        )  # type: Dict[(str, tuple), int]
+        """(計測値の名前, ラベル)とその値
+
+        :type: Dict[(str, tuple), int]"""
+        self.end_codes = collections.defaultdict(
+            int
+        )  # type: Dict[(tuple, int), int]
+        """((接続先, 通信対象, コマンド名), 終了コード)毎の異常応答の数
+
+        :type: Dict[(tuple, int), int]"""
+        self.latency = dict()  # type: Dict[tuple, Histogram]
+        """(接続先, 通信対象, コマンド名)毎の送信から応答受信までの時間[sec]"""
+        self.send_time = dict()  # type: Dict[tuple, Histogram]
+        """(接続先, 通信対象, コマンド名)毎の送信(送信の順番待ちを含む)にかかった時間[sec]"""
+        self.depth = Histogram(depth_bounds)
+        """送信時点の応答待ちの要求数"""
+
+    def __histogram(self, table, key, bounds):
+        h = table.get(key)
+        if h is None:
+            h = table[key] = Histogram(bounds)
+        return h
+
+    def __pop(self, endpoint, seq, last=False):
+        """応答待ちの要求を取り出す、ロックを取得して呼び出す
+
+        :param str endpoint: 接続先(IPアドレス:ポート番号)
+        :param int seq: シリアル番号
+        :param bool last: 最後に送信した要求を取り出すかどうか、
+            Falseの場合は最初に送信した要求
+        :return: (送信時刻, 集計のキー)、応答待ちでない場合はNone
+        :rtype: (float, tuple) or None
+        """
+        ids = self.__pending.get((endpoint, seq))
+        if not ids:
+            return None
+        i = ids.pop() if last else ids.popleft()
+        if not ids:
+            del self.__pending[endpoint, seq]
+        self.__deadlines.cancel(i)
+        _, _, start, key = self.__requests.pop(i)
+        return start, key
+
+    def __expire(self, now):
+        """期限までに応答のなかった要求をタイムアウトとして数える
+
+        応答を待たない要求(書き込み等)に応答がなかった場合も含む。
+        ロックを取得して呼び出す。
+
+        :param float now: 現在時刻(:py:func:`time.monotonic`)
+        """
+        for i in self.__deadlines.advance(now):
+            endpoint, seq, _, key = self.__requests.pop(i)
+            ids = self.__pending[endpoint, seq]
+            ids.remove(i)
+            if not ids:
+                del self.__pending[endpoint, seq]
+            self.counters["timeouts", key] += 1
+
+    def on_send(self, endpoint, seq, target, cmd, size, start, expire=100):
+        """要求を送信する(送信の直前に呼ばれる)
+
+        :param str endpoint: 接続先(IPアドレス:ポート番号)
+        :param int seq: シリアル番号
+        :param target: 通信対象
+        :type target: pyslmpclient.util.Target
+        :param cmd: コマンド
+        :type cmd: const.SLMPCommand
+        :param int size: フレームのバイト数
+        :param float start: 送信開始時刻(:py:func:`time.monotonic`)
+        :param float expire: 応答がない場合にタイムアウトとするまでの時間[sec]
+        :return: :meth:`on_sent` に渡す集計のキー
+        :rtype: tuple
+        """
+        key = (endpoint, str(target), cmd.name)
+        now = time.monotonic()
+        with self.__lock:
+            self.__expire(now)
+            i = next(self.__ids)
+            self.__requests[i] = (endpoint, seq, start, key)
+            self.__pending.setdefault(
+                (endpoint, seq), collections.deque()
+            ).append(i)
+            self.__deadlines.add(i, expire, now)
+            self.counters["requests", key] += 1
+            self.counters["bytes_sent", key] += size
+            self.depth.observe(len(self.__requests))
+        return key
+
+    def on_sent(self, key, elapsed):
+        """要求を送信した
+
+        :param tuple key: :meth:`on_send` が返した集計のキー
+        :param float elapsed: 送信(送信の順番待ちを含む)にかかった時間[sec]
+        :return: None
+        """
+        with self.__lock:
+            self.__histogram(self.send_time, key, self.latency_bounds).observe(
+                elapsed
+            )
+
+    def on_send_failed(self, endpoint, seq):
+        """要求を送信できなかった
+
+        :param str endpoint: 接続先(IPアドレス:ポート番号)
+        :param int seq: シリアル番号
+        :return: None
+        """
+        with self.__lock:
+            sent = self.__pop(endpoint, seq, last=True)
+            key = sent[1] if sent is not None else ()
+            self.counters["send_errors", key] += 1
+
+    def on_reply(self, endpoint, seq, term_code, size):
+        """応答を受信した
+
+        再送等で重複した応答では呼ばれない
+
+        :param str endpoint: 接続先(IPアドレス:ポート番号)
+        :param int seq: シリアル番号
+        :param int term_code: 終了コード
+        :param int size: フレームのバイト数
+        :return: None
+        """
+        now = time.monotonic()
+        with self.__lock:
+            self.__expire(now)
+            sent = self.__pop(endpoint, seq)
+            # 計測開始前の要求、または既にタイムアウトした要求
+            if sent is None:
+                self.counters["orphan_replies", ()] += 1
+                return
+            start, key = sent
+            self.counters["replies", key] += 1
+            self.counters["bytes_received", key] += size
+            self.__histogram(self.latency, key, self.latency_bounds).observe(
+                now - start
+            )
+            if term_code:
+                self.counters["errors", key] += 1
+                self.end_codes[key, term_code] += 1
+
+    def on_timeout(self, endpoint, seq):
+        """応答を待つ間にタイムアウトした
+
+        :param str endpoint: 接続先(IPアドレス:ポート番号)
+        :param int seq: シリアル番号
+        :return: None
+        """
+        with self.__lock:
+            sent = self.__pop(endpoint, seq)
+            key = sent[1] if sent is not None else ()
+            self.counters["timeouts", key] += 1
+
+    @property
+    def in_flight(self):
+        """現在の応答待ちの要求数
+
+        :rtype: int
+        """
+        with self.__lock:
+            self.__expire(time.monotonic())
+            return len(self.__requests)
+
+    def samples(self):
+        """Prometheus形式の計測値を列挙する
+
+        :return: (名前, ラベル, 値)
+        :rtype: List[(str, Dict[str, str], float)]
+        """
+        ret = list()
+        with self.__lock:
+            self.__expire(time.monotonic())
+            for (name, key), value in sorted(self.counters.items()):
+                ret.append(("slmp_%s_total" % name, _labels(key), value))
+            for (key, term_code), value in sorted(self.end_codes.items()):
+                labels = _labels(key)
+                try:
+                    labels["end_code"] = const.EndCode(term_code).name
+                except ValueError:
+                    labels["end_code"] = "0x%04X" % term_code
+                ret.append(("slmp_end_codes_total", labels, value))
+            for name, table in (
+                ("slmp_latency_seconds", self.latency),
+                ("slmp_send_seconds", self.send_time),
+            ):
+                for key, h in sorted(table.items()):
+                    ret.extend(_histogram_samples(name, _labels(key), h))
+            ret.extend(_histogram_samples("slmp_in_flight", {}, self.depth))
+        return ret
+
+    def to_prometheus(self):
+        """Prometheusのテキスト形式に変換する
+
+        :rtype: str
+        """
+        lines = list()
+        for name, labels, value in self.samples():
+            if labels:
+                label = ",".join(
+                    '%s="%s"' % (k, v) for k, v in sorted(labels.items())
+                )
+                lines.append("%s{%s} %s" % (name, label, value))
+            else:
+                lines.append("%s %s" % (name, value))
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key):
+    """(接続先, 通信対象, コマンド名)をラベルに変換する
+
+    :param tuple key: (接続先, 通信対象, コマンド名)、不明な場合は空
+    :rtype: Dict[str, str]
+    """
+    if not key:
+        return dict()
+    return {"endpoint": key[0], "target": key[1], "command": key[2]}
+
+
+def _histogram_samples(name, labels, h):
+    """ヒストグラムをPrometheus形式の計測値に変換する
+
+    :param str name: 計測値の名前
+    :param labels: ラベル
+    :type labels: Dict[str, str]
+    :param h: ヒストグラム
+    :type h: Histogram
+    :rtype: List[(str, Dict[str, str], float)]
+    """
+    ret = list()
+    for bound, count in h.cumulative():
+        bucket = dict(labels)
+        bucket["le"] = "+Inf" if bound == float("inf") else repr(bound)
+        ret.append((name + "_bucket", bucket, count))
+    ret.append((name + "_sum", labels, h.sum))
+    ret.append((name + "_count", labels, h.count))
+    return ret
@@ -0,0 +1,299 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import os
+import struct
+import time
+from typing import List  # noqa
+
+import numpy as np
+
+from pyslmpclient.tag import dump_tags
+from pyslmpclient.tag import load_tags
+from pyslmpclient.tag import ReadPlan
+
+MAGIC = b"SLMPREC1"
+# マジック, ヘッダのバイト数, レコードのバイト数, レコード数, タグ定義のバイト数,
+# 書き込み済みレコード数
+_HEADER = struct.Struct("<8sIIIIQ")
+_COUNT_OFFSET = 24
+_PAGE_SIZE = 4096
+
+
+def _plan2json(plan):
+    """読み出し計画をヘッダに格納する形式に変換する
+
+    :param plan: 読み出し計画
+    :type plan: ReadPlan
+    :rtype: bytes
+    """
+    return dump_tags(plan.tags, plan.max_gap).encode("utf-8")
+
+
+def _json2plan(buf):
+    """ヘッダに格納した読み出し計画を復元する
+
+    :param bytes buf: 読み出し計画
+    :rtype: ReadPlan
+    """
+    return ReadPlan(*load_tags(buf.decode("utf-8")))
+
+
+def record_dtype(plan):
+    """読み出し計画に対応するレコードの構造化型
+
+    先頭に時刻(UNIX時間, float64)、その後に連結した応答データを置き、
+    8バイト境界に揃える。
+
+    :param plan: 読み出し計画
+    :type plan: ReadPlan
+    :rtype: numpy.dtype
+    """
+    if "timestamp" in plan.offsets:
+        raise ValueError("timestamp")
+    return np.dtype(
+        {
+            "names": ["timestamp"] + [t.name for t in plan.tags],
+            "formats": ["<f8"] + [t.dtype for t in plan.tags],
+            "offsets": [0] + [8 + plan.offsets[t.name] for t in plan.tags],
+            "itemsize": 8 + -(-plan.size // 8) * 8,
+        }
+    )
+
+
+class _RingFile(object):
+    def _map(self, path, mode):
+        """ファイルをマップし、レコードの配列を作る
+
+        :param str path: ファイル名
+        :param str mode: :py:class:`numpy.memmap` のモード
+        """
+        head = np.memmap(path, np.uint8, "r", shape=(_HEADER.size,))
+        magic, header_size, record_size, capacity, length, _ = _HEADER.unpack(
+            head.tobytes()
+        )
+        del head
+        if magic != MAGIC:
+            raise ValueError(path)
+        self._mm = np.memmap(path, np.uint8, mode)
+        self._attach(
+            self._mm,
+            _COUNT_OFFSET,
+            header_size,
+            capacity,
+            _json2plan(
+                self._mm[_HEADER.size : _HEADER.size + length].tobytes()
+            ),
+        )
+        assert self.dtype.itemsize == record_size, record_size
+
+    def _attach(self, buffer, count_offset, offset, capacity, plan):
+        """バッファ上にレコード数とレコードの配列を作る
+
+        :param buffer: ファイルや共有メモリをマップしたバッファ
+        :param int count_offset: 書き込み済みレコード数(uint64)の位置
+        :param int offset: 先頭のレコードの位置
+        :param int capacity: リングのレコード数
+        :param plan: 記録する読み出し計画
+        :type plan: ReadPlan
+        """
+        self.capacity = capacity
+        """リングのレコード数
+
+        :type: int"""
+        self.plan = plan
+        """記録している読み出し計画
+
+        :type: ReadPlan"""
+        self.dtype = record_dtype(plan)
+        """レコードの構造化型、タグ名がそのまま列名になる
+
+        :type: numpy.dtype"""
+        self._count = np.ndarray(
+            (1,), "<u8", buffer=buffer, offset=count_offset
+        )
+        self._records = np.ndarray(
+            (capacity,), self.dtype, buffer=buffer, offset=offset
+        )
+        self._raw = np.ndarray(
+            (capacity, self.dtype.itemsize),
+            np.uint8,
+            buffer=buffer,
+            offset=offset,
+        )
+
+    def _write(self, raw, timestamp):
+        """連結した応答データを1レコードとして追記する
+
+        :param raw: 連結した応答データ
+        :type raw: bytes or bytearray or memoryview
+        :param float timestamp: 時刻(UNIX時間)
+        """
+        if len(raw) != self.plan.size:
+            raise ValueError(len(raw))
+        count = int(self._count[0])
+        i = count % self.capacity
+        self._raw[i, 8 : 8 + len(raw)] = np.frombuffer(raw, np.uint8)
+        self._records["timestamp"][i] = timestamp
+        # 読み出し側が途中のレコードを見ないよう、最後に件数を更新する
+        self._count[0] = count + 1
+
+    @property
+    def count(self):
+        """これまでに書き込んだレコード数(リングで上書きした分を含む)
+
+        :rtype: int
+        """
+        return int(self._count[0])
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def segments(self, last=None):
+        """古い順にレコードの配列を返す
+
+        リングの折り返しがある場合は2つに分かれる。
+        返す配列はファイルをマップしたビューで、コピーはしない。
+
+        :param int last: 新しいものから数えたレコード数、Noneの場合は全て
+        :return: レコードの配列
+        :rtype: List[numpy.ndarray]
+        """
+        count = self.count
+        n = min(count, self.capacity)
+        if last is not None:
+            n = min(n, last)
+        start = (count - n) % self.capacity
+        if start + n <= self.capacity:
+            return [self._records[start : start + n]]
+        return [
+            self._records[start:],
+            self._records[: start + n - self.capacity],
+        ]
+
+    def column(self, name, last=None):
+        """古い順にひとつの列の配列を返す
+
+        :param str name: タグ名または timestamp
+        :param int last: 新しいものから数えたレコード数、Noneの場合は全て
+        :return: 列の配列(ビュー)
+        :rtype: List[numpy.ndarray]
+        """
+        return [s[name] for s in self.segments(last)]
+
+    def close(self):
+        """ファイルのマップを解除する
+
+        :return: None
+        """
+        self._raw = None
+        self._records = None
+        self._count = None
+        self._mm = None
+
+    def __enter__(self):
+        """コンテキスト構文用
+
+        :return: 自身
+        """
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """コンテキスト構文用"""
+        self.close()
+        return False
+
+
+class Recorder(_RingFile):
+    def __init__(self, path, plan, capacity):
+        """読み出し計画の応答データをメモリマップしたリングファイルに記録する
+
+        レコードは固定長で、連結した応答データをそのままコピーするため、
+        タグ毎の値のオブジェクトは作らない。
+        既存のファイルがある場合は同じタグ定義、レコード数であれば続きから記録する。
+
+        :param str path: ファイル名
+        :param plan: 読み出し計画
+        :type plan: ReadPlan
+        :param int capacity: リングのレコード数
+        """
+        assert 0 < capacity, capacity
+        definition = _plan2json(plan)
+        dtype = record_dtype(plan)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                head = f.read(_HEADER.size)
+                magic, _, record_size, cap, length, _ = _HEADER.unpack(head)
+                if (
+                    magic != MAGIC
+                    or record_size != dtype.itemsize
+                    or cap != capacity
+                    or f.read(length) != definition
+                ):
+                    raise ValueError(path)
+        else:
+            header_size = (
+                -(-(_HEADER.size + len(definition)) // _PAGE_SIZE) * _PAGE_SIZE
+            )
+            with open(path, "wb") as f:
+                f.write(
+                    _HEADER.pack(
+                        MAGIC,
+                        header_size,
+                        dtype.itemsize,
+                        capacity,
+                        len(definition),
+                        0,
+                    )
+                )
+                f.write(definition)
+                f.truncate(header_size + dtype.itemsize * capacity)
+        self._map(path, "r+")
+        self.plan = plan
+
+    def append(self, raw, timestamp=None):
+        """連結した応答データを1レコードとして追記する
+
+        :param raw: 連結した応答データ
+        :type raw: bytes or bytearray or memoryview
+        :param float timestamp: 時刻(UNIX時間)、Noneの場合は現在時刻
+        :return: None
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        self._write(raw, timestamp)
+
+    def record(self, client, timeout=0):
+        """読み出し計画に従って読み出し、1レコードとして追記する
+
+        :param client: 読み出しに使用するクライアント
+        :type client: pyslmpclient.SLMPClient
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        timestamp = time.time()
+        self.append(self.plan.read_raw(client, timeout), timestamp)
+
+    def flush(self):
+        """変更をファイルに書き出す
+
+        :return: None
+        """
+        self._mm.flush()
+
+    def close(self):
+        """変更を書き出し、ファイルのマップを解除する
+
+        :return: None
+        """
+        if self._mm is not None:
+            self.flush()
+        super().close()
+
+
+class RecordReader(_RingFile):
+    def __init__(self, path):
+        """:py:class:`Recorder` が記録したファイルを読み出し専用で開く
+
+        :param str path: ファイル名
+        """
+        self._map(path, "r")
@@ -0,0 +1,282 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import logging
+import threading
+from typing import Callable  # noqa
+from typing import List  # noqa
+from typing import Optional  # noqa
+
+from pyslmpclient import _wait_seconds
+from pyslmpclient import util
+from pyslmpclient.session import RETRY_METHODS
+
+PROBE_DATA = "01"
+"""死活監視の折り返しテストで送る文字列"""
+
+
+class _Path(object):
+    __slots__ = ("name", "client", "opened", "healthy", "failures")
+
+    def __init__(self, name, client):
+        """冗長系の片側の経路
+
+        :param str name: 経路の名前
+        :param client: 経路のクライアント
+        :type client: pyslmpclient.SLMPClient
+        """
+        self.name = name
+        self.client = client
+        self.opened = False
+        self.healthy = False
+        self.failures = 0
+
+
+class RedundantClient(object):
+    def __init__(
+        self,
+        primary,
+        standby,
+        probe_interval=0.2,
+        probe_timeout=2,
+        max_failures=2,
+        connect_timeout=1.0,
+    ):
+        """二重化したCPUやネットワークの両系に接続を保つクライアント
+
+        両系の接続を常に開いておき、経路毎のスレッドで折り返しテストを送って
+        死活を監視する。クライアントのメソッドはこのオブジェクトから呼び出し、
+        稼働系の経路に送る。
+
+        稼働系で要求がタイムアウトするか接続が失われると、その時点で待機系に切り替え、
+        :py:data:`pyslmpclient.session.RETRY_METHODS` の要求は待機系に送り直す。
+        そのため切り替えにかかる時間は、実行中の要求は要求自身のタイムアウト以内、
+        以降の要求は :attr:`failover_bound` 以内となる。
+        切り替えた後は、待機系が故障するまで元の経路に戻さない。
+
+        通信対象(冗長系の制御系CPUの指定など)は各クライアントの target で指定する。
+
+        :param primary: 最初に稼働系とする経路のクライアント、開始していないもの
+        :type primary: pyslmpclient.SLMPClient
+        :param standby: 待機系とする経路のクライアント、開始していないもの
+        :type standby: pyslmpclient.SLMPClient
+        :param float probe_interval: 死活監視の間隔[sec]
+        :param int probe_timeout: 死活監視のタイムアウト、250msec単位
+        :param int max_failures: 異常と判断する死活監視の連続した失敗回数
+        :param float connect_timeout: 接続のタイムアウト[sec]
+        """
+        assert 0 < max_failures, max_failures
+        self.paths = [_Path("primary", primary), _Path("standby", standby)]
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.max_failures = max_failures
+        self.connect_timeout = connect_timeout
+        self.switchovers = 0
+        """稼働系を切り替えた回数
+
+        :type: int"""
+        self.on_switch = None  # type: Optional[Callable[[str], None]]
+        """稼働系を切り替えた際に、新しい稼働系の名前を引数に呼ばれる関数
+
+        :type: Callable[[str], None]"""
+        self.logger = logging.getLogger(__name__).getChild(
+            self.__class__.__name__
+        )
+        self.__cond = threading.Condition(threading.Lock())
+        """稼働系と経路の状態を保護する"""
+        self.__active = 0
+        self.__stopped = True
+        self.__threads = list()  # type: List[threading.Thread]
+
+    @property
+    def failover_bound(self):
+        """稼働系の故障から、以降の要求が待機系に送られるまでの最大の時間[sec]
+
+        :rtype: float
+        """
+        probe = self.probe_interval + _wait_seconds(self.probe_timeout)
+        return probe * self.max_failures
+
+    @property
+    def active(self):
+        """稼働系の経路の名前
+
+        :rtype: str
+        """
+        return self.paths[self.__active].name
+
+    @property
+    def client(self):
+        """稼働系の経路のクライアント
+
+        :rtype: pyslmpclient.SLMPClient
+        """
+        return self.paths[self.__active].client
+
+    def open(self):
+        """両系の接続を開始し、死活監視を始める
+
+        片方の経路のみ接続できた場合はそちらを稼働系とする。
+
+        :return: None
+        """
+        for path in self.paths:
+            path.client.on_connection_lost = self.__lost_handler(path)
+            self.__open_path(path)
+            path.healthy = path.opened
+        if not any(path.opened for path in self.paths):
+            raise ConnectionError("両系とも接続できない")
+        self.__stopped = False
+        self.__active = 0 if self.paths[0].opened else 1
+        self.__threads = [
+            threading.Thread(target=self.__prober, args=(path,), daemon=True)
+            for path in self.paths
+        ]
+        for thread in self.__threads:
+            thread.start()
+
+    def close(self):
+        """死活監視を止め、両系の接続を終了する
+
+        :return: None
+        """
+        with self.__cond:
+            self.__stopped = True
+            self.__cond.notify_all()
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = list()
+        for path in self.paths:
+            path.client.on_connection_lost = None
+            self.__close_path(path)
+
+    def __enter__(self):
+        """コンテキスト構文用
+
+        :return: 自身
+        """
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """コンテキスト構文用"""
+        self.close()
+        return False
+
+    def __getattr__(self, name):
+        """クライアントのメソッドを、稼働系に送る関数にする
+
+        :param str name: メソッド名
+        :rtype: Callable
+        """
+        method = getattr(self.paths[0].client, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            return self.__call(name, args, kwargs)
+
+        return call
+
+    def __call(self, name, args, kwargs):
+        """稼働系のクライアントのメソッドを呼び出し、失敗した場合は切り替える
+
+        :param str name: メソッド名
+        :param tuple args: 引数
+        :param dict kwargs: キーワード引数
+        """
+        path = self.paths[self.__active]
+        try:
+            return getattr(path.client, name)(*args, **kwargs)
+        except OSError as e:  # TimeoutErrorを含む
+            self.__mark_down(path, e)
+            retry = self.paths[self.__active]
+            if retry is path or name not in RETRY_METHODS:
+                raise
+        return getattr(retry.client, name)(*args, **kwargs)
+
+    def __open_path(self, path):
+        """経路の接続を開始する
+
+        :param _Path path: 経路
+        """
+        try:
+            path.client.open(self.connect_timeout)
+        except OSError as e:
+            self.logger.warning("%s: %r", path.name, e)
+            return
+        path.opened = True
+        path.failures = 0
+
+    def __close_path(self, path):
+        """経路の接続を終了する
+
+        :param _Path path: 経路
+        """
+        if not path.opened:
+            return
+        path.opened = False
+        try:
+            path.client.close()
+        except OSError as e:
+            self.logger.debug(e)
+
+    def __lost_handler(self, path):
+        """接続が失われた際に呼ばれる関数を作る
+
+        :param _Path path: 経路
+        :rtype: Callable[[OSError], None]
+        """
+
+        def on_connection_lost(e):
+            path.failures = self.max_failures
+            self.__mark_down(path, e)
+
+        return on_connection_lost
+
+    def __mark_down(self, path, e):
+        """経路を異常とし、稼働系であれば待機系に切り替える
+
+        :param _Path path: 経路
+        :param Exception e: 原因
+        :return: 待機系に切り替えた場合はTrue
+        :rtype: bool
+        """
+        with self.__cond:
+            path.healthy = False
+            i = self.paths.index(path)
+            other = self.paths[1 - i]
+            if self.__active != i or not other.healthy:
+                return False
+            self.__active = 1 - i
+            self.switchovers += 1
+        self.logger.warning("%s -> %s: %r", path.name, other.name, e)
+        if self.on_switch is not None:
+            self.on_switch(other.name)
+        return True
+
+    def __prober(self, path):
+        while True:
+            with self.__cond:
+                if self.__cond.wait_for(
+                    lambda: self.__stopped, self.probe_interval
+                ):
+                    return
+            if not path.opened or path.failures >= self.max_failures:
+                # 接続が失われたか、応答のない経路は接続し直す
+                self.__close_path(path)
+                self.__open_path(path)
+                if not path.opened:
+                    continue
+            try:
+                if not path.client.self_test(PROBE_DATA, self.probe_timeout):
+                    raise ConnectionError("折り返しデータの不一致")
+            except util.SLMPCommunicationError:
+                pass  # 応答があれば経路は生きている
+            except OSError as e:
+                path.failures += 1
+                if not path.opened or path.failures >= self.max_failures:
+                    self.__mark_down(path, e)
+                continue
+            with self.__cond:
+                path.failures = 0
+                path.healthy = True
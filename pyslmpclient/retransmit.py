@@ -0,0 +1,218 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import collections
+import logging
+import threading
+import time
+from typing import Callable  # noqa
+from typing import Dict  # noqa
+from typing import Optional  # noqa
+
+from pyslmpclient.timer import TimerWheel
+
+TICK = 0.005
+"""再送の期限を調べる間隔[sec]"""
+_RTO = "rto"
+_HEDGE = "hedge"
+
+
+class RttEstimator(object):
+    def __init__(self, initial=0.2, min_rto=0.02, max_rto=2.0, window=256):
+        """応答時間から再送タイムアウトを求める(RFC 6298と同じ方法)
+
+        :param float initial: 応答時間を測る前の再送タイムアウト[sec]
+        :param float min_rto: 再送タイムアウトの下限[sec]
+        :param float max_rto: 再送タイムアウトの上限[sec]
+        :param int window: 分位点を求めるために保持する応答時間の数
+        """
+        self.initial = initial
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.srtt = None  # type: Optional[float]
+        self.rttvar = 0.0
+        self.__samples = collections.deque(maxlen=window)
+        self.__sorted = None
+
+    def update(self, rtt):
+        """応答時間を追加する
+
+        :param float rtt: 応答時間[sec]
+        :return: None
+        """
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.__samples.append(rtt)
+        self.__sorted = None
+
+    @property
+    def rto(self):
+        """再送タイムアウト[sec]
+
+        :rtype: float
+        """
+        if self.srtt is None:
+            rto = self.initial
+        else:
+            rto = self.srtt + 4 * self.rttvar
+        return min(max(rto, self.min_rto), self.max_rto)
+
+    def quantile(self, q):
+        """応答時間の分位点
+
+        :param float q: 0から1
+        :return: 分位点[sec]、応答時間を測っていない場合はNone
+        :rtype: Optional[float]
+        """
+        if not self.__samples:
+            return None
+        if self.__sorted is None:
+            self.__sorted = sorted(self.__samples)
+        i = min(int(q * len(self.__sorted)), len(self.__sorted) - 1)
+        return self.__sorted[i]
+
+
+class Retransmitter(object):
+    def __init__(
+        self,
+        send,
+        max_retries=3,
+        min_rto=0.02,
+        max_rto=2.0,
+        hedge=False,
+        hedge_quantile=0.95,
+    ):
+        """UDPで応答のない読み出し要求を再送する
+
+        応答のない要求を再送タイムアウト毎に(倍々に延ばしつつ)再送し、
+        hedge を指定した場合は応答時間の分位点を過ぎた時点で複製を1回送る。
+        再送した要求の応答時間は推定に使わない(Karnのアルゴリズム)。
+
+        :param send: フレームを送信する関数
+        :type send: Callable[[bytes], None]
+        :param int max_retries: 最大の再送回数
+        :param float min_rto: 再送タイムアウトの下限[sec]
+        :param float max_rto: 再送タイムアウトの上限[sec]
+        :param bool hedge: 複製を送るかどうか
+        :param float hedge_quantile: 複製を送るまでの時間とする応答時間の分位点
+        """
+        self.send = send
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.estimator = RttEstimator(min_rto=min_rto, max_rto=max_rto)
+        self.retransmits = 0
+        """再送した数
+
+        :type: int"""
+        self.hedges = 0
+        """複製を送った数
+
+        :type: int"""
+        self.logger = logging.getLogger(__name__).getChild(
+            self.__class__.__name__
+        )
+        self.__cond = threading.Condition(threading.Lock())
+        self.__entries = dict()  # type: Dict[int, list]
+        """シリアル番号と[フレーム, 送信時刻, 再送回数, 複製を送ったか]"""
+        self.__wheel = TimerWheel(time.monotonic(), TICK, 1024)
+        self.__stopped = False
+        self.__thread = threading.Thread(target=self.__worker, daemon=True)
+        self.__thread.start()
+
+    def track(self, seq, frame):
+        """送信する要求を登録する(送信の直前に呼ぶ)
+
+        :param int seq: シリアル番号
+        :param bytes frame: フレーム
+        :return: None
+        """
+        now = time.monotonic()
+        with self.__cond:
+            self.__entries[seq] = [frame, now, 0, False]
+            self.__wheel.add((_RTO, seq), self.estimator.rto, now)
+            if self.hedge:
+                delay = self.estimator.quantile(self.hedge_quantile)
+                if delay is not None:
+                    self.__wheel.add((_HEDGE, seq), delay, now)
+            self.__cond.notify()
+
+    def done(self, seq):
+        """応答を受信した
+
+        :param int seq: シリアル番号
+        :return: 登録されていた場合はTrue
+        :rtype: bool
+        """
+        now = time.monotonic()
+        with self.__cond:
+            entry = self.__entries.pop(seq, None)
+            if entry is None:
+                return False
+            self.__wheel.cancel((_RTO, seq))
+            self.__wheel.cancel((_HEDGE, seq))
+            _, sent, retries, hedged = entry
+            if retries == 0 and not hedged:
+                self.estimator.update(now - sent)
+            return True
+
+    def cancel(self, seq):
+        """応答を待つのをやめた
+
+        :param int seq: シリアル番号
+        :return: None
+        """
+        with self.__cond:
+            if self.__entries.pop(seq, None) is not None:
+                self.__wheel.cancel((_RTO, seq))
+                self.__wheel.cancel((_HEDGE, seq))
+
+    def stop(self):
+        """再送を止める
+
+        :return: None
+        """
+        with self.__cond:
+            self.__stopped = True
+            self.__cond.notify()
+        self.__thread.join()
+
+    def __worker(self):
+        while True:
+            with self.__cond:
+                while not self.__stopped and not len(self.__wheel):
+                    self.__cond.wait()
+                if self.__stopped:
+                    return
+                self.__cond.wait(TICK)
+                resend = list()
+                now = time.monotonic()
+                for kind, seq in self.__wheel.advance(now):
+                    entry = self.__entries.get(seq)
+                    if entry is None:
+                        continue
+                    if kind == _HEDGE:
+                        entry[3] = True
+                        self.hedges += 1
+                    elif entry[2] < self.max_retries:
+                        entry[2] += 1
+                        self.retransmits += 1
+                        self.__wheel.add(
+                            (_RTO, seq),
+                            min(
+                                self.estimator.rto * 2 ** entry[2],
+                                self.estimator.max_rto,
+                            ),
+                            now,
+                        )
+                    else:  # 再送を諦め、呼び出し側のタイムアウトに任せる
+                        continue
+                    resend.append(entry[0])
+            for frame in resend:
+                try:
+                    self.send(frame)
+                except OSError as e:
+                    self.logger.error(e)
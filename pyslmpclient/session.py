@@ -0,0 +1,316 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from typing import Callable  # noqa
+from typing import List  # noqa
+from typing import Optional  # noqa
+
+from pyslmpclient import util
+
+RETRY_METHODS = frozenset(
+    (
+        "read_bit_devices",
+        "read_word_devices",
+        "read_random_devices",
+        "read_block",
+        "read_block_raw",
+        "read_random_labels",
+        "read_array_labels",
+        "read_type_name",
+        "execute_monitor",
+        "self_test",
+    )
+)
+"""接続断で失敗した場合に、再接続後に送り直すメソッド(読み出しのみ)"""
+
+
+class ResilientSession(object):
+    def __init__(
+        self,
+        client,
+        keep_alive=0.5,
+        keep_alive_timeout=2,
+        connect_timeout=1.0,
+        backoff=0.05,
+        max_backoff=2.0,
+        resume_timeout=10.0,
+    ):
+        """接続断を検出して自動的に再接続し、セッションの状態を復元する
+
+        接続断は、TCPの切断やソケットのエラーを受信スレッドが検出するか、
+        一定時間通信がない場合に送る折り返しテストの失敗で検出する。
+        再接続は backoff から倍々に max_backoff まで間隔を延ばして繰り返し、
+        接続できたら :meth:`remote_password_unlock` と
+        :meth:`entry_monitor_device` をやり直す
+        (通信対象 ``client.target`` はクライアントに残っているのでそのまま使う)。
+
+        クライアントのメソッドはこのオブジェクトから呼び出す。
+        再接続中の呼び出しは再接続を待ち、
+        接続断で失敗した :py:data:`RETRY_METHODS` の呼び出しは再接続後に送り直す。
+        それ以外の呼び出しは接続断の例外をそのまま送出する。
+
+        :param client: 使用するクライアント、開始していないもの
+        :type client: pyslmpclient.SLMPClient
+        :param float keep_alive: 通信がない場合に折り返しテストを送る間隔[sec]、
+            0の場合は送らない
+        :param int keep_alive_timeout: 折り返しテストのタイムアウト、250msec単位
+        :param float connect_timeout: 接続のタイムアウト[sec]
+        :param float backoff: 最初の再接続までの間隔[sec]
+        :param float max_backoff: 再接続の間隔の上限[sec]
+        :param float resume_timeout: 呼び出しが再接続を待つ時間[sec]
+        """
+        self.client = client
+        self.keep_alive = keep_alive
+        self.keep_alive_timeout = keep_alive_timeout
+        self.connect_timeout = connect_timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.resume_timeout = resume_timeout
+        self.reconnects = 0
+        """再接続した回数
+
+        :type: int"""
+        self.on_reconnect = None  # type: Optional[Callable[[], None]]
+        """再接続してセッションを復元した際に、監視スレッドから呼ばれる関数
+
+        :type: Callable[[], None]"""
+        self.logger = logging.getLogger(__name__).getChild(
+            self.__class__.__name__
+        )
+        self.__cond = threading.Condition(threading.Lock())
+        """接続状態とセッションの状態を保護する"""
+        self.__connected = False
+        self.__opened = False
+        """クライアントを開始しているかどうか(接続断の後も閉じるまではTrue)"""
+        self.__lost = None  # type: Optional[OSError]
+        self.__stopped = True
+        self.__last_activity = 0.0
+        self.__password = None  # type: Optional[str]
+        self.__monitor = None  # type: Optional[(List, List, int)]
+        self.__thread = None  # type: Optional[threading.Thread]
+
+    def open(self):
+        """接続を開始し、監視スレッドを起動する
+
+        :return: None
+        """
+        self.client.on_connection_lost = self.__on_connection_lost
+        self.client.open(self.connect_timeout)
+        self.__opened = True
+        with self.__cond:
+            self.__connected = True
+            self.__lost = None
+            self.__stopped = False
+            self.__last_activity = time.monotonic()
+        self.__thread = threading.Thread(target=self.__supervisor, daemon=True)
+        self.__thread.start()
+
+    def close(self):
+        """監視スレッドを停止し、接続を終了する
+
+        :return: None
+        """
+        with self.__cond:
+            self.__stopped = True
+            self.__connected = False
+            self.__cond.notify_all()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+        self.client.on_connection_lost = None
+        if self.__opened:
+            self.__opened = False
+            self.client.close()
+
+    def __enter__(self):
+        """コンテキスト構文用
+
+        :return: 自身
+        """
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """コンテキスト構文用"""
+        self.close()
+        return False
+
+    @property
+    def connected(self):
+        """接続中かどうか
+
+        :rtype: bool
+        """
+        return self.__connected
+
+    def remote_password_unlock(self, password, timeout=0):
+        """リモートパスワードのロックを解除し、再接続時にも解除する
+
+        :param str password: リモートパスワード
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        self.__call("remote_password_unlock", (password, timeout), {})
+        with self.__cond:
+            self.__password = password
+
+    def remote_password_lock(self, password, timeout=0):
+        """リモートパスワードをロックし、再接続時の解除をやめる
+
+        :param str password: リモートパスワード
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        with self.__cond:
+            self.__password = None
+        self.__call("remote_password_lock", (password, timeout), {})
+
+    def entry_monitor_device(self, word_list, dword_list, timeout=0):
+        """モニタするデバイスを登録し、再接続時にも登録する
+
+        :param word_list: ワード単位でアクセスするデバイスのリスト
+        :type word_list: List[(const.DeviceCode, int)]
+        :param dword_list: ダブルワード単位でアクセスするデバイスのリスト
+        :type dword_list: List[(const.DeviceCode, int)]
+        :param int timeout: タイムアウト、250msec単位
+        :return: None
+        """
+        self.__call(
+            "entry_monitor_device", (word_list, dword_list, timeout), {}
+        )
+        with self.__cond:
+            self.__monitor = (list(word_list), list(dword_list), timeout)
+
+    def __getattr__(self, name):
+        """クライアントのメソッドを、再接続を考慮して呼び出す関数にする
+
+        :param str name: メソッド名
+        :rtype: Callable
+        """
+        method = getattr(self.client, name)
+        if not callable(method):
+            return method
+
+        def call(*args, **kwargs):
+            return self.__call(name, args, kwargs)
+
+        return call
+
+    def __call(self, name, args, kwargs):
+        """クライアントのメソッドを呼び出す
+
+        :param str name: メソッド名
+        :param tuple args: 引数
+        :param dict kwargs: キーワード引数
+        """
+        retry = name in RETRY_METHODS
+        while True:
+            self.__wait_connected()
+            try:
+                ret = getattr(self.client, name)(*args, **kwargs)
+            except TimeoutError:
+                raise
+            except OSError as e:
+                self.__on_connection_lost(e)
+                if not retry:
+                    raise
+                retry = False
+                continue
+            self.__last_activity = time.monotonic()
+            return ret
+
+    def __wait_connected(self):
+        """接続されるまで待つ"""
+        with self.__cond:
+            if not self.__cond.wait_for(
+                lambda: self.__connected or self.__stopped,
+                self.resume_timeout,
+            ):
+                raise ConnectionError("再接続できない") from self.__lost
+            if not self.__connected:
+                raise ConnectionError("セッションは終了している")
+
+    def __on_connection_lost(self, e):
+        """接続断を監視スレッドに知らせる
+
+        :param OSError e: 原因
+        """
+        with self.__cond:
+            if self.__stopped or not self.__connected:
+                return
+            self.__connected = False
+            self.__lost = e
+            self.__cond.notify_all()
+
+    def __supervisor(self):
+        while True:
+            with self.__cond:
+                if self.__connected and self.keep_alive:
+                    due = self.__last_activity + self.keep_alive
+                    self.__cond.wait(max(0.0, due - time.monotonic()))
+                elif self.__connected:
+                    self.__cond.wait()
+                if self.__stopped:
+                    return
+                connected = self.__connected
+            if not connected:
+                self.__reconnect()
+            elif self.keep_alive and (
+                time.monotonic() - self.__last_activity >= self.keep_alive
+            ):
+                self.__probe()
+
+    def __probe(self):
+        """折り返しテストで接続を確認する"""
+        try:
+            if not self.client.self_test(timeout=self.keep_alive_timeout):
+                raise ConnectionError("折り返しデータの不一致")
+        except util.SLMPCommunicationError:
+            pass  # 応答があれば接続は生きている
+        except OSError as e:  # TimeoutErrorを含む
+            self.__on_connection_lost(e)
+            return
+        self.__last_activity = time.monotonic()
+
+    def __reconnect(self):
+        """接続し直してセッションの状態を復元する、停止するまで繰り返す"""
+        delay = self.backoff
+        while True:
+            with self.__cond:
+                if self.__stopped:
+                    return
+                password, monitor = self.__password, self.__monitor
+            if self.__opened:
+                self.__opened = False
+                try:
+                    self.client.close()
+                except OSError as e:
+                    self.logger.debug(e)
+            try:
+                self.client.open(self.connect_timeout)
+                self.__opened = True
+                if password is not None:
+                    self.client.remote_password_unlock(
+                        password, self.keep_alive_timeout
+                    )
+                if monitor is not None:
+                    self.client.entry_monitor_device(*monitor)
+            except (OSError, util.SLMPError) as e:
+                self.logger.warning("再接続失敗: %r", e)
+                with self.__cond:
+                    if self.__cond.wait_for(lambda: self.__stopped, delay):
+                        return
+                delay = min(delay * 2, self.max_backoff)
+                continue
+            break
+        with self.__cond:
+            self.__connected = True
+            self.__lost = None
+            self.__last_activity = time.monotonic()
+            self.reconnects += 1
+            self.__cond.notify_all()
+        self.logger.info("再接続")
+        if self.on_reconnect is not None:
+            self.on_reconnect()
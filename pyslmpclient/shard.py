@@ -0,0 +1,349 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import logging
+import multiprocessing
+import os
+import time
+from typing import Dict  # noqa
+from typing import List  # noqa
+from typing import Optional  # noqa
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python 3.8未満
+    shared_memory = None
+
+from pyslmpclient import SLMPClient
+from pyslmpclient.recorder import _RingFile
+from pyslmpclient.recorder import record_dtype
+from pyslmpclient.tag import ReadPlan
+
+# 共有メモリの先頭に置くヘッダの大きさと、書き込み済みレコード数, 読み出しに失敗した回数の位置
+_HEADER_SIZE = 64
+_COUNT_OFFSET = 0
+_ERRORS_OFFSET = 8
+
+
+class Endpoint(object):
+    def __init__(
+        self,
+        name,
+        addr,
+        tags,
+        port=5000,
+        binary=True,
+        ver=4,
+        tcp=False,
+        target=None,
+        interval=0.1,
+        timeout=0,
+        max_gap=3,
+        backoff=0.05,
+        max_backoff=2.0,
+    ):
+        """シャードで周期的に読み出す接続先とタグ
+
+        ワーカプロセスに渡すため、 :py:class:`pyslmpclient.tag.ReadPlan` ではなく
+        タグの一覧を持ち、読み出し計画はワーカ側で作る。
+
+        :param str name: 接続先の名前
+        :param str addr: 接続するPLCのIPアドレス
+        :param tags: 読み出すタグ
+        :type tags: List[pyslmpclient.tag.Tag]
+        :param int port: 接続先のポート番号
+        :param bool binary: 交信コードとしてバイナリを使用するかどうか
+        :param int ver: 使用するフレームのバージョン 4 or 3
+        :param bool tcp: TCPで通信するかどうか
+        :param target: 通信対象、Noneの場合は自局
+        :type target: pyslmpclient.util.Target
+        :param float interval: 読み出し周期[sec]
+        :param int timeout: タイムアウト、250msec単位
+        :param int max_gap: 読み出し計画で同じブロックにまとめる隙間のワード数
+        :param float backoff: 接続に失敗した場合の最初の再試行までの間隔[sec]
+        :param float max_backoff: 接続を再試行する間隔の上限[sec]
+        """
+        assert 0 < interval, interval
+        self.name = name
+        self.addr = addr
+        self.tags = list(tags)
+        self.port = port
+        self.binary = binary
+        self.ver = ver
+        self.tcp = tcp
+        self.target = target
+        self.interval = interval
+        self.timeout = timeout
+        self.max_gap = max_gap
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def plan(self):
+        """読み出し計画を作る
+
+        :rtype: ReadPlan
+        """
+        return ReadPlan(self.tags, self.max_gap)
+
+    def client(self):
+        """接続先のクライアントを作る
+
+        :rtype: SLMPClient
+        """
+        client = SLMPClient(
+            self.addr, self.port, self.binary, self.ver, self.tcp
+        )
+        if self.target is not None:
+            client.target = self.target
+        return client
+
+
+class _SharedRing(_RingFile):
+    def __init__(self, shm, plan, capacity):
+        """共有メモリ上のリング
+
+        :param shm: 共有メモリ
+        :type shm: multiprocessing.shared_memory.SharedMemory
+        :param plan: 読み出し計画
+        :type plan: ReadPlan
+        :param int capacity: リングのレコード数
+        """
+        self._mm = shm
+        self._attach(shm.buf, _COUNT_OFFSET, _HEADER_SIZE, capacity, plan)
+        self._errors = np.ndarray(
+            (1,), "<u8", buffer=shm.buf, offset=_ERRORS_OFFSET
+        )
+
+    @staticmethod
+    def size(plan, capacity):
+        """必要な共有メモリのバイト数
+
+        :param plan: 読み出し計画
+        :type plan: ReadPlan
+        :param int capacity: リングのレコード数
+        :rtype: int
+        """
+        return _HEADER_SIZE + record_dtype(plan).itemsize * capacity
+
+    @property
+    def errors(self):
+        """読み出しに失敗した回数
+
+        :rtype: int
+        """
+        return int(self._errors[0])
+
+    def close(self):
+        """共有メモリへのビューを解放する
+
+        :return: None
+        """
+        self._errors = None
+        super().close()
+
+
+def _shard_worker(endpoints, names, capacity, stop):
+    """ひとつのシャードの接続先を周期的に読み出し、共有メモリのリングに書き込む
+
+    接続先毎に接続し、接続できなかった接続先は読み出しに失敗したものとして数え、
+    backoff から倍々に max_backoff まで間隔を延ばして再試行する。
+    読み出し中に通信が途切れた接続先も、閉じてから同様に接続し直す。
+    その間も接続できた接続先の読み出しは続ける。
+
+    :param endpoints: 担当する接続先
+    :type endpoints: List[Endpoint]
+    :param names: 接続先毎の共有メモリの名前
+    :type names: List[str]
+    :param int capacity: リングのレコード数
+    :param stop: 停止の指示
+    :type stop: multiprocessing.Event
+    """
+    logger = logging.getLogger(__name__).getChild("shard%d" % os.getpid())
+    shms = [shared_memory.SharedMemory(name=name) for name in names]
+    plans = [ep.plan() for ep in endpoints]
+    rings = [
+        _SharedRing(shm, plan, capacity) for shm, plan in zip(shms, plans)
+    ]
+    clients = [ep.client() for ep in endpoints]
+    opened = [False] * len(endpoints)
+    delays = [ep.backoff for ep in endpoints]
+    try:
+        now = time.monotonic()
+        due = [now] * len(endpoints)
+        while not stop.is_set():
+            now = time.monotonic()
+            for i, ep in enumerate(endpoints):
+                if due[i] > now:
+                    continue
+                if not opened[i]:
+                    try:
+                        clients[i].open()
+                    except OSError as e:
+                        logger.error("%s: %r", ep.name, e)
+                        rings[i]._errors[0] += 1
+                        due[i] = now + delays[i]
+                        delays[i] = min(delays[i] * 2, ep.max_backoff)
+                        continue
+                    opened[i] = True
+                    delays[i] = ep.backoff
+                try:
+                    rings[i]._write(
+                        plans[i].read_raw(clients[i], ep.timeout), time.time()
+                    )
+                except OSError as e:
+                    # 接続が切れた場合は閉じて、待ってから接続し直す
+                    logger.error("%s: %r", ep.name, e)
+                    rings[i]._errors[0] += 1
+                    clients[i].close()
+                    opened[i] = False
+                    due[i] = now + delays[i]
+                    continue
+                except Exception as e:
+                    logger.error("%s: %r", ep.name, e)
+                    rings[i]._errors[0] += 1
+                # 周期に間に合わなかった場合は遅れを取り戻そうとせず次の周期にする
+                due[i] = max(due[i] + ep.interval, now)
+            stop.wait(max(0.0, min(due) - time.monotonic()))
+    finally:
+        for client, is_open in zip(clients, opened):
+            if is_open:
+                client.close()
+        for ring in rings:
+            ring.close()
+        for shm in shms:
+            shm.close()
+
+
+class ShardedCollector(object):
+    def __init__(self, endpoints, shards=None, capacity=1024):
+        """接続先を複数のプロセスに分けて周期的に読み出す
+
+        各シャード(ワーカプロセス)は担当する接続先のソケットと読み出し周期を持ち、
+        読み出した応答データを接続先毎の共有メモリのリングに書き込む。
+        親プロセスからはリングを :py:class:`numpy.ndarray` のビューとして参照する。
+
+        :param endpoints: 接続先
+        :type endpoints: List[Endpoint]
+        :param int shards: ワーカプロセスの数、Noneの場合はCPU数
+        :param int capacity: 接続先毎のリングのレコード数
+        """
+        if shared_memory is None:
+            raise RuntimeError("multiprocessing.shared_memory が必要")
+        names = [ep.name for ep in endpoints]
+        if len(set(names)) != len(names):
+            raise ValueError("接続先名の重複")
+        assert 0 < capacity, capacity
+        if shards is None:
+            shards = os.cpu_count() or 1
+        self.endpoints = list(endpoints)
+        self.shards = max(1, min(shards, len(self.endpoints)))
+        self.capacity = capacity
+        self.__shms = dict()  # type: Dict[str, shared_memory.SharedMemory]
+        self.__rings = dict()  # type: Dict[str, _SharedRing]
+        self.__processes = list()  # type: List[multiprocessing.Process]
+        self.__stop = multiprocessing.Event()
+
+    def start(self):
+        """共有メモリを確保し、ワーカプロセスを起動する
+
+        :return: None
+        """
+        for ep in self.endpoints:
+            plan = ep.plan()
+            shm = shared_memory.SharedMemory(
+                create=True, size=_SharedRing.size(plan, self.capacity)
+            )
+            shm.buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+            self.__shms[ep.name] = shm
+            self.__rings[ep.name] = _SharedRing(shm, plan, self.capacity)
+        self.__stop.clear()
+        for i in range(self.shards):
+            endpoints = self.endpoints[i :: self.shards]
+            process = multiprocessing.Process(
+                target=_shard_worker,
+                args=(
+                    endpoints,
+                    [self.__shms[ep.name].name for ep in endpoints],
+                    self.capacity,
+                    self.__stop,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.__processes.append(process)
+
+    def stop(self):
+        """ワーカプロセスを停止し、共有メモリを解放する
+
+        :return: None
+        """
+        self.__stop.set()
+        for process in self.__processes:
+            process.join()
+        self.__processes = list()
+        for ring in self.__rings.values():
+            ring.close()
+        self.__rings = dict()
+        for shm in self.__shms.values():
+            shm.close()
+            shm.unlink()
+        self.__shms = dict()
+
+    def __enter__(self):
+        """コンテキスト構文用
+
+        :return: 自身
+        """
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """コンテキスト構文用"""
+        self.stop()
+        return False
+
+    def ring(self, name):
+        """接続先のリング
+
+        :py:meth:`pyslmpclient.recorder.RecordReader.segments` などと同様に参照できる
+
+        :param str name: 接続先の名前
+        :rtype: _SharedRing
+        """
+        return self.__rings[name]
+
+    def read(self, name):
+        """接続先の最新の値をタグ毎に展開する
+
+        :py:meth:`pyslmpclient.tag.ReadPlan.read` と同じ形式で返す
+
+        :param str name: 接続先の名前
+        :return: タグ名と値、まだ読み出していない場合はNone
+        :rtype: Optional[Dict[str, object]]
+        """
+        ring = self.__rings[name]
+        segments = ring.segments(1)
+        if not len(segments[0]):
+            return None
+        raw = segments[0].tobytes()[8 : 8 + ring.plan.size]
+        return ring.plan.decode(raw)
+
+    def column(self, name, tag, last=None):
+        """接続先のひとつのタグの値を古い順に返す
+
+        :param str name: 接続先の名前
+        :param str tag: タグ名または timestamp
+        :param int last: 新しいものから数えたレコード数、Noneの場合は全て
+        :return: 列の配列(ビュー)
+        :rtype: List[numpy.ndarray]
+        """
+        return self.__rings[name].column(tag, last)
+
+    def errors(self, name):
+        """接続先の読み出しに失敗した回数
+
+        :param str name: 接続先の名前
+        :rtype: int
+        """
+        return self.__rings[name].errors
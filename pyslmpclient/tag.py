@@ -0,0 +1,452 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import enum
+import json
+import struct
+from typing import Dict  # noqa
+from typing import List  # noqa
+
+import numpy as np
+
+from pyslmpclient import const
+from pyslmpclient.const import MAX_BLOCK_POINTS
+from pyslmpclient.const import MAX_BLOCKS
+
+
+class DataType(enum.Enum):
+    INT = "h"
+    UINT = "H"
+    DINT = "i"
+    UDINT = "I"
+    REAL = "f"
+    LREAL = "d"
+    STRING = "s"
+    BCD = "bcd"
+
+
+# データ型毎の1要素あたりのワード数
+TYPE_WORDS = {
+    DataType.INT: 1,
+    DataType.UINT: 1,
+    DataType.DINT: 2,
+    DataType.UDINT: 2,
+    DataType.REAL: 2,
+    DataType.LREAL: 4,
+    DataType.BCD: 1,
+}
+# データ型毎のNumPyでの型
+TYPE_DTYPES = {
+    DataType.INT: "<i2",
+    DataType.UINT: "<u2",
+    DataType.DINT: "<i4",
+    DataType.UDINT: "<u4",
+    DataType.REAL: "<f4",
+    DataType.LREAL: "<f8",
+    DataType.BCD: "<u2",
+}
+
+
+def _decode_bcd(value):
+    return int("%X" % value)
+
+
+def _encode_bcd(value):
+    assert 0 <= value <= 9999, value
+    return int("%d" % value, base=16)
+
+
+class Tag(object):
+    def __init__(
+        self,
+        name,
+        device_code,
+        address,
+        data_type=DataType.INT,
+        count=1,
+        length=0,
+    ):
+        """デバイス、アドレスと型で定義するタグ
+
+        :param str name: タグ名
+        :param device_code: デバイス種別、ワードデバイスのみ
+        :type device_code: const.DeviceCode
+        :param int address: 先頭アドレス
+        :param data_type: データ型
+        :type data_type: DataType
+        :param int count: 要素数、1の場合はスカラ、2以上の場合は配列
+        :param int length: 文字列の場合のバイト数
+        """
+        if not isinstance(device_code, const.DeviceCode):
+            raise ValueError(device_code)
+        if device_code in const.D_BIT:
+            # アドレスをワード単位として扱うため、ビットデバイスは扱えない
+            raise ValueError(device_code)
+        if not isinstance(data_type, DataType):
+            raise ValueError(data_type)
+        assert 0 <= address, address
+        assert 0 < count, count
+        if data_type == DataType.STRING:
+            assert 0 < length, length
+        self.name = name
+        self.device_code = device_code
+        self.address = address
+        self.data_type = data_type
+        self.count = count
+        self.length = length
+
+    @property
+    def element_words(self):
+        """1要素あたりのワード数
+
+        :rtype: int
+        """
+        if self.data_type == DataType.STRING:
+            return -(-self.length // 2)
+        return TYPE_WORDS[self.data_type]
+
+    @property
+    def words(self):
+        """タグ全体のワード数
+
+        :rtype: int
+        """
+        return self.element_words * self.count
+
+    @property
+    def format(self):
+        """:py:mod:`struct` の書式(バイトオーダ指定なし)
+
+        :rtype: str
+        """
+        if self.data_type == DataType.STRING:
+            pad = self.element_words * 2 - self.length
+            return ("%ds%s" % (self.length, "x" * pad)) * self.count
+        if self.data_type == DataType.BCD:
+            return "%dH" % self.count
+        return "%d%s" % (self.count, self.data_type.value)
+
+    @property
+    def dtype(self):
+        """NumPyでの型
+
+        :rtype: numpy.dtype
+        """
+        if self.data_type == DataType.STRING:
+            base = np.dtype("S%d" % (self.element_words * 2))
+        else:
+            base = np.dtype(TYPE_DTYPES[self.data_type])
+        if self.count == 1:
+            return base
+        return np.dtype((base, (self.count,)))
+
+    def convert(self, values):
+        """:py:mod:`struct` で展開した値をタグの値に変換する
+
+        :param values: 展開した値
+        :type values: tuple
+        :return: スカラの場合は値、配列の場合はタプル
+        """
+        if self.data_type == DataType.STRING:
+            values = tuple(
+                v.split(b"\x00", 1)[0].decode("ascii") for v in values
+            )
+        elif self.data_type == DataType.BCD:
+            values = tuple(_decode_bcd(v) for v in values)
+        if self.count == 1:
+            return values[0]
+        return tuple(values)
+
+    def encode(self, value):
+        """書き込み用のバイト列に変換する
+
+        :param value: スカラの場合は値、配列の場合は値のシーケンス
+        :return: ワード毎にリトルエンディアンとしたバイト列
+        :rtype: bytes
+        """
+        values = [value] if self.count == 1 else list(value)
+        assert len(values) == self.count, (len(values), self.count)
+        if self.data_type == DataType.STRING:
+            size = self.element_words * 2
+            return b"".join(
+                v.encode("ascii")[: self.length].ljust(size, b"\x00")
+                for v in values
+            )
+        if self.data_type == DataType.BCD:
+            values = [_encode_bcd(v) for v in values]
+        return struct.pack("<" + self.format, *values)
+
+    def encode_words(self, value):
+        """書き込み用のワード列に変換する
+
+        :param value: スカラの場合は値、配列の場合は値のシーケンス
+        :return: ワード毎の値
+        :rtype: List[int]
+        """
+        buf = self.encode(value)
+        return list(struct.unpack("<%dH" % (len(buf) // 2), buf))
+
+    def __repr__(self):
+        return "Tag(%r, %s, %d, %s, %d)" % (
+            self.name,
+            self.device_code.name,
+            self.address,
+            self.data_type.name,
+            self.count,
+        )
+
+
+def dump_tags(tags, max_gap):
+    """読み出し計画の元になるタグの定義をJSONに変換する
+
+    同じ定義からは常に同じ文字列になる
+
+    :param tags: 読み出すタグ
+    :type tags: List[Tag]
+    :param int max_gap: 同じブロックにまとめる際に許容するタグ間の隙間のワード数
+    :rtype: str
+    """
+    return json.dumps(
+        {
+            "max_gap": max_gap,
+            "tags": [
+                [
+                    t.name,
+                    t.device_code.name,
+                    t.address,
+                    t.data_type.name,
+                    t.count,
+                    t.length,
+                ]
+                for t in tags
+            ],
+        },
+        sort_keys=True,
+    )
+
+
+def load_tags(buf):
+    """:func:`dump_tags` で変換したタグの定義を復元する
+
+    :param str buf: タグの定義
+    :return: (タグ, 同じブロックにまとめる際に許容するタグ間の隙間のワード数)
+    :rtype: (List[Tag], int)
+    """
+    d = json.loads(buf)
+    tags = [
+        Tag(name, const.DeviceCode[dc], addr, DataType[dt], count, length)
+        for name, dc, addr, dt, count, length in d["tags"]
+    ]
+    return tags, d["max_gap"]
+
+
+class ReadPlan(object):
+    def __init__(self, tags, max_gap=3, layout=None):
+        """タグの一覧を読み出すための一括読み出し(ブロック)の計画
+
+        デバイス種別毎にアドレスの近いタグをひとつのブロックにまとめ、
+        応答データを連結したものを :py:class:`struct.Struct` で一度に展開する。
+
+        :param tags: 読み出すタグ
+        :type tags: List[Tag]
+        :param int max_gap: 同じブロックにまとめる際に許容するタグ間の隙間のワード数
+        :param layout: 作成済みの :attr:`layout` 、Noneの場合はタグから作る
+        :type layout: (List[List[(const.DeviceCode, int, int)]],
+            Dict[str, int])
+        """
+        names = [t.name for t in tags]
+        if len(set(names)) != len(names):
+            raise ValueError("タグ名の重複")
+        self.tags = list(tags)
+        self.max_gap = max_gap
+        if layout is None:
+            layout = self.__layout(self.tags, max_gap)
+        frames, offsets = layout
+        if set(offsets) != set(names):
+            raise ValueError("タグと配置の不一致")
+        for blocks in frames:
+            for dc, _, _ in blocks:
+                if dc in const.D_BIT:
+                    raise ValueError("ビットデバイスのブロック: %s" % dc.name)
+        self.frames = [list(blocks) for blocks in frames]
+        """フレーム毎のブロックのリスト(デバイス種別, 先頭アドレス, 点数)"""
+        self.size = sum(num for blocks in frames for _, _, num in blocks) * 2
+        """連結した応答データのバイト数
+
+        :type: int"""
+        for tag in self.tags:
+            offset = offsets[tag.name]
+            if offset < 0 or offset + tag.words * 2 > self.size:
+                raise ValueError("配置の範囲外: %s" % tag.name)
+        self.offsets = dict(offsets)
+        """タグ名と連結した応答データ中の位置
+
+        :type: Dict[str, int]"""
+
+        # 重ならないタグはひとつのStructで、重なるタグは個別のStructで展開する
+        fmt = "<"
+        pos = 0
+        self.__fields = list()  # type: List[Tag]
+        self.__extras = list()  # type: List[(Tag, struct.Struct)]
+        for tag in sorted(self.tags, key=lambda t: offsets[t.name]):
+            offset = offsets[tag.name]
+            if offset < pos:
+                self.__extras.append((tag, struct.Struct("<" + tag.format)))
+                continue
+            fmt += "%dx" % (offset - pos) if offset > pos else ""
+            fmt += tag.format
+            pos = offset + tag.words * 2
+            self.__fields.append(tag)
+        fmt += "%dx" % (self.size - pos) if self.size > pos else ""
+        self.struct = struct.Struct(fmt)
+        """連結した応答データを展開する書式
+
+        :type: struct.Struct"""
+        self.dtype = np.dtype(
+            {
+                "names": [t.name for t in self.tags],
+                "formats": [t.dtype for t in self.tags],
+                "offsets": [offsets[t.name] for t in self.tags],
+                "itemsize": self.size,
+            }
+        )
+        """連結した応答データに対応するNumPyの構造化型
+
+        :type: numpy.dtype"""
+
+    @property
+    def layout(self):
+        """タグの配置、同じタグで :py:class:`ReadPlan` を作り直す際に渡せる
+
+        :return: (:attr:`frames`, :attr:`offsets`)
+        :rtype: (List[List[(const.DeviceCode, int, int)]], Dict[str, int])
+        """
+        return self.frames, self.offsets
+
+    @staticmethod
+    def __layout(tags, max_gap):
+        """タグをブロックにまとめ、フレームに分割する
+
+        :param tags: 読み出すタグ
+        :type tags: List[Tag]
+        :param int max_gap: 同じブロックにまとめる際に許容するタグ間の隙間のワード数
+        :return: (フレーム毎のブロックのリスト, タグ名と連結した応答データ中の位置)
+        :rtype: (List[List[(const.DeviceCode, int, int)]], Dict[str, int])
+        """
+        ranges = list()  # type: List[list]
+        offsets = dict()  # type: Dict[str, int]
+        placed = list()
+        for tag in sorted(
+            tags, key=lambda t: (t.device_code.value, t.address)
+        ):
+            if tag.words > MAX_BLOCK_POINTS:
+                raise ValueError(tag)
+            end = tag.address + tag.words
+            if (
+                ranges
+                and ranges[-1][0] == tag.device_code
+                and tag.address <= ranges[-1][2] + max_gap
+            ):
+                ranges[-1][2] = max(ranges[-1][2], end)
+            else:
+                ranges.append([tag.device_code, tag.address, end])
+            placed.append((tag, len(ranges) - 1))
+        base = list()
+        pos = 0
+        for dc, start, end in ranges:
+            base.append(pos)
+            pos += (end - start) * 2
+        for tag, i in placed:
+            offsets[tag.name] = base[i] + (tag.address - ranges[i][1]) * 2
+
+        frames = list()
+        blocks = list()
+        points = 0
+        for dc, start, end in ranges:
+            while start < end:
+                if len(blocks) == MAX_BLOCKS or points == MAX_BLOCK_POINTS:
+                    frames.append(blocks)
+                    blocks = list()
+                    points = 0
+                num = min(end - start, MAX_BLOCK_POINTS - points)
+                blocks.append((dc, start, num))
+                points += num
+                start += num
+        if blocks:
+            frames.append(blocks)
+        return frames, offsets
+
+    def read_raw(self, client, timeout=0):
+        """計画に従って読み出し、応答データを連結して返す
+
+        :param client: 読み出しに使用するクライアント
+        :type client: pyslmpclient.SLMPClient
+        :param int timeout: タイムアウト、250msec単位
+        :return: 連結した応答データ
+        :rtype: bytes
+        """
+        return b"".join(
+            client.read_block_raw(blocks, [], timeout)
+            for blocks in self.frames
+        )
+
+    def decode(self, raw):
+        """連結した応答データをタグ毎の値に展開する
+
+        :param bytes raw: 連結した応答データ
+        :return: タグ名と値
+        :rtype: Dict[str, object]
+        """
+        values = self.struct.unpack(raw)
+        ret = dict()
+        i = 0
+        for tag in self.__fields:
+            ret[tag.name] = tag.convert(values[i : i + tag.count])
+            i += tag.count
+        for tag, st in self.__extras:
+            ret[tag.name] = tag.convert(
+                st.unpack_from(raw, self.offsets[tag.name])
+            )
+        return ret
+
+    def read(self, client, timeout=0):
+        """計画に従って読み出し、タグ毎の値に展開する
+
+        :param client: 読み出しに使用するクライアント
+        :type client: pyslmpclient.SLMPClient
+        :param int timeout: タイムアウト、250msec単位
+        :return: タグ名と値
+        :rtype: Dict[str, object]
+        """
+        return self.decode(self.read_raw(client, timeout))
+
+
+def write_tags(client, values, timeout=0):
+    """タグの値を一括書き込み(ブロック)で書き込む
+
+    :param client: 書き込みに使用するクライアント
+    :type client: pyslmpclient.SLMPClient
+    :param values: タグと書き込む値の組
+    :type values: List[(Tag, object)]
+    :param int timeout: タイムアウト、250msec単位
+    :return: None
+    """
+    blocks = list()
+    points = 0
+    for tag, value in values:
+        if tag.words > MAX_BLOCK_POINTS:
+            raise ValueError(tag)
+        if len(blocks) == MAX_BLOCKS or points + tag.words > MAX_BLOCK_POINTS:
+            client.write_block(blocks, [], timeout)
+            blocks = list()
+            points = 0
+        blocks.append(
+            (
+                tag.device_code,
+                tag.address,
+                tag.words,
+                tag.encode_words(value),
+            )
+        )
+        points += tag.words
+    if blocks:
+        client.write_block(blocks, [], timeout)
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+from typing import Dict  # noqa
+from typing import Hashable  # noqa
+from typing import List  # noqa
+
+TICK = 0.25
+"""タイマの分解能[sec]、監視タイマの単位と同じ"""
+SIZE = 512
+"""スロット数、分解能と掛けた時間(128秒)より短い期限はスロットを一巡する前に切れる"""
+
+
+class TimerWheel(object):
+    def __init__(self, now, tick=TICK, size=SIZE):
+        """期限をスロットに振り分けて管理するタイマ
+
+        登録と取消は O(1) 、期限切れの取り出しは経過したスロットの分だけ調べる。
+        スレッドセーフではないので呼び出し側で排他する。
+
+        :param float now: 現在時刻(:py:func:`time.monotonic`)
+        :param float tick: 分解能[sec]
+        :param int size: スロット数
+        """
+        assert 0 < tick, tick
+        assert 0 < size, size
+        self.tick = tick
+        self.size = size
+        self.__slots = [
+            dict() for _ in range(size)
+        ]  # type: List[Dict[Hashable, int]]
+        self.__index = dict()  # type: Dict[Hashable, int]
+        """キーと期限(tick単位)"""
+        self.__current = int(now / tick)
+
+    def __len__(self):
+        return len(self.__index)
+
+    def __contains__(self, key):
+        return key in self.__index
+
+    def __iter__(self):
+        return iter(list(self.__index))
+
+    def add(self, key, delay, now):
+        """期限を登録する、既に登録済みのキーの場合は期限を置き換える
+
+        :param Hashable key: キー
+        :param float delay: 期限までの時間[sec]
+        :param float now: 現在時刻(:py:func:`time.monotonic`)
+        :return: None
+        """
+        self.cancel(key)
+        # 早く切れることがないよう切り上げる
+        due = max(int((now + delay) / self.tick) + 1, self.__current + 1)
+        self.__slots[due % self.size][key] = due
+        self.__index[key] = due
+
+    def cancel(self, key):
+        """期限を取り消す
+
+        :param Hashable key: キー
+        :return: 登録されていた場合はTrue
+        :rtype: bool
+        """
+        due = self.__index.pop(key, None)
+        if due is None:
+            return False
+        del self.__slots[due % self.size][key]
+        return True
+
+    def advance(self, now):
+        """時刻を進め、期限の切れたキーを取り出す
+
+        :param float now: 現在時刻(:py:func:`time.monotonic`)
+        :return: 期限の切れたキー
+        :rtype: List[Hashable]
+        """
+        target = int(now / self.tick)
+        if target <= self.__current:
+            return []
+        expired = list()
+        start = max(self.__current + 1, target - self.size + 1)
+        for t in range(start, target + 1):
+            slot = self.__slots[t % self.size]
+            if not slot:
+                continue
+            for key, due in list(slot.items()):
+                if due <= target:
+                    del slot[key]
+                    del self.__index[key]
+                    expired.append(key)
+        self.__current = target
+        return expired
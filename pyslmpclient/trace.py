@@ -0,0 +1,185 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+import collections
+import json
+import socket
+import struct
+import threading
+import time
+from typing import List  # noqa
+
+SEND = "tx"
+"""送信したフレーム"""
+RECV = "rx"
+"""受信したフレーム"""
+
+_PCAP_HEADER = struct.Struct("<IHHiIII")
+_PCAP_RECORD = struct.Struct("<IIII")
+_IPV4 = struct.Struct("!BBHHHBBH4s4s")
+_UDP = struct.Struct("!HHHH")
+_LINKTYPE_RAW = 101
+
+
+class FrameTracer(object):
+    def __init__(self, capacity=4096, every=1, max_rate=0):
+        """送受信したフレームをそのまま時刻と共に記録する
+
+        ``client.tracer`` に設定すると記録を始める。
+        設定しない(None)場合、クライアント側のコストは属性の参照と時刻の取得のみ。
+        記録は最大 capacity 個で、古いものから捨てる。
+
+        :param int capacity: 記録する最大のフレーム数
+        :param int every: 何フレーム毎に1つ記録するか
+        :param int max_rate: 1秒あたりに記録する最大のフレーム数、0の場合は制限しない
+        """
+        assert 0 < capacity, capacity
+        assert 0 < every, every
+        self.every = every
+        self.max_rate = max_rate
+        self.records = collections.deque(
+            maxlen=capacity
+        )  # type: collections.deque
+        """(時刻(:py:func:`time.monotonic`), 方向, フレーム)
+
+        :type: collections.deque"""
+        self.seen = 0
+        """記録の対象となったフレームの数
+
+        :type: int"""
+        self.skipped = 0
+        """間引きや記録数の制限で記録しなかったフレームの数
+
+        :type: int"""
+        self.__lock = threading.Lock()
+        self.__window = 0  # type: int
+        self.__window_count = 0
+        # monotonic から UNIX時間 への換算
+        self.__offset = time.time() - time.monotonic()
+
+    def record(self, direction, frame, now=None):
+        """フレームを記録する
+
+        :param str direction: :py:data:`SEND` または :py:data:`RECV`
+        :param frame: フレーム
+        :type frame: bytes or bytearray or memoryview
+        :param float now: 送受信した時刻(:py:func:`time.monotonic`)、
+            Noneの場合は現在時刻
+        :return: None
+        """
+        if now is None:
+            now = time.monotonic()
+        with self.__lock:
+            self.seen += 1
+            if self.seen % self.every:
+                self.skipped += 1
+                return
+            if self.max_rate:
+                window = int(now)
+                if window != self.__window:
+                    self.__window = window
+                    self.__window_count = 0
+                if self.__window_count >= self.max_rate:
+                    self.skipped += 1
+                    return
+                self.__window_count += 1
+        self.records.append((now, direction, bytes(frame)))
+
+    def clear(self):
+        """記録を消去する
+
+        :return: None
+        """
+        self.records.clear()
+
+    def snapshot(self):
+        """記録の複製を古い順に返す
+
+        送信の記録は送信後に追加するため、追加の順ではなく時刻の順に並べる
+
+        :rtype: List[(float, str, bytes)]
+        """
+        return sorted(self.records, key=lambda r: r[0])
+
+    def to_jsonl(self, fp):
+        """記録をJSON Lines形式で書き出す
+
+        :param fp: テキストモードで開いたファイル
+        :return: 書き出したフレームの数
+        :rtype: int
+        """
+        records = self.snapshot()
+        for t, direction, frame in records:
+            fp.write(
+                json.dumps(
+                    {
+                        "monotonic": t,
+                        "time": t + self.__offset,
+                        "dir": direction,
+                        "len": len(frame),
+                        "data": frame.hex(),
+                    }
+                )
+                + "\n"
+            )
+        return len(records)
+
+    def to_pcap(self, fp, remote, local=("0.0.0.0", 0)):
+        """記録をpcap形式で書き出す
+
+        フレームは LINKTYPE_RAW のIPv4/UDPパケットとして書き出す
+        (TCPで通信していた場合もUDPとする)。
+
+        :param fp: バイナリモードで開いたファイル
+        :param remote: 接続先のIPアドレス, ポート番号
+        :type remote: (str, int)
+        :param local: 自局のIPアドレス, ポート番号
+        :type local: (str, int)
+        :return: 書き出したフレームの数
+        :rtype: int
+        """
+        records = self.snapshot()
+        fp.write(
+            _PCAP_HEADER.pack(0xA1B2C3D4, 2, 4, 0, 0, 65535, _LINKTYPE_RAW)
+        )
+        remote_addr = socket.inet_aton(remote[0])
+        local_addr = socket.inet_aton(local[0])
+        for i, (t, direction, frame) in enumerate(records):
+            if direction == SEND:
+                src, dst = (local_addr, local[1]), (remote_addr, remote[1])
+            else:
+                src, dst = (remote_addr, remote[1]), (local_addr, local[1])
+            packet = _ipv4_udp(i & 0xFFFF, src, dst, frame)
+            wall = t + self.__offset
+            sec = int(wall)
+            fp.write(
+                _PCAP_RECORD.pack(
+                    sec,
+                    int((wall - sec) * 1000000),
+                    len(packet),
+                    len(packet),
+                )
+            )
+            fp.write(packet)
+        return len(records)
+
+
+def _ipv4_udp(ident, src, dst, payload):
+    """IPv4/UDPパケットを作る
+
+    :param int ident: IPヘッダの識別子
+    :param src: 送信元(IPアドレス(4バイト), ポート番号)
+    :param dst: 宛先(IPアドレス(4バイト), ポート番号)
+    :param bytes payload: ペイロード
+    :rtype: bytes
+    """
+    length = _IPV4.size + _UDP.size + len(payload)
+    header = _IPV4.pack(
+        0x45, 0, length, ident, 0, 64, socket.IPPROTO_UDP, 0, src[0], dst[0]
+    )
+    words = struct.unpack("!10H", header)
+    checksum = sum(words)
+    checksum = (checksum & 0xFFFF) + (checksum >> 16)
+    checksum = (checksum & 0xFFFF) + (checksum >> 16)
+    header = header[:10] + struct.pack("!H", ~checksum & 0xFFFF) + header[12:]
+    udp = _UDP.pack(src[1], dst[1], _UDP.size + len(payload), 0)
+    return header + udp + payload
@@ -1,14 +1,24 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
+import collections
+import functools
 import struct
+import threading
+from array import array
 from typing import List  # noqa
 
 import numpy as np
 
 from pyslmpclient.const import D_ADDR_16
+from pyslmpclient.const import D_ADDR_4BYTE
+from pyslmpclient.const import D_STRANGE_NAME
 from pyslmpclient.const import SLMPCommand
 from pyslmpclient.const import EndCode
 
+_TARGET_BINARY = struct.Struct("<BBHB")
+_COMMAND_BINARY = struct.Struct("<HHHH")
+_SUBHEADER_4E = struct.Struct("<HHH")
+
 
 def encode_bcd(data):
     """Encode 4bit BCD array
@@ -110,26 +120,145 @@ def pack_bits(data):
     return list(np.packbits(byte_array2d_bin[:, ::-1]))
 
 
-def device2ascii(device_type, address):
+def unpack_word_bits(data):
+    """ワード単位で読み出したビットデバイスの値を1点毎に展開する
+
+    b"\\x01\\x80" --> [True, False, ... , False, True]
+
+    :param bytes data: ワード毎にリトルエンディアンとしたバイト列
+    :return: 先頭のワードのビット0から順に並べた配列
+    :rtype: numpy.ndarray
+    """
+    byte_array2d = np.frombuffer(data, "u1").reshape((-1, 1))
+    byte_array2d_bin = np.unpackbits(byte_array2d, axis=1)
+    return byte_array2d_bin[:, ::-1].ravel().astype(bool)
+
+
+def is_extended_device(device_type, address, binary=True):
+    """4バイトアドレス(デバイス拡張指定)でアクセスする必要があるかどうか
+
+    ASCII形式ではアドレスが10進数6桁に収まらない場合も4バイトアドレスとする。
+
+    :param device_type: デバイス種別
+    :type device_type: DeviceCode
+    :param int address: アドレス
+    :param bool binary: バイナリ形式かどうか
+    :return: 4バイトアドレスでアクセスする必要があるかどうか
+    :rtype: bool
+    """
+    if device_type in D_ADDR_4BYTE or address > 0xFFFFFF:
+        return True
+    return not binary and device_type not in D_ADDR_16 and address > 999999
+
+
+def device2ascii(device_type, address, extended=False):
     """ASCII形式時のデバイス表記へ変換する
 
     :param device_type: デバイス種別
     :type device_type: DeviceCode2
     :param int address: アドレス
+    :param bool extended: 4バイトアドレス(サブコマンド0x0002/0x0003)の表記とするかどうか
     :return: ASCII形式時のデバイス表記
     :rtype: bytes
     """
+    if extended:
+        assert 0 <= address <= 0xFFFFFFFF, address
+        name = device_type.name
+        if device_type in D_STRANGE_NAME:
+            name = "ST" + name[1:]
+        buf = name.encode("ascii").ljust(4, b"*")
+        # デバイス名4文字とアドレス8桁
+        if device_type in D_ADDR_16:
+            buf += b"%08X" % address
+        else:
+            if address > 99999999:
+                raise ValueError(address)
+            buf += b"%08d" % address
+        return buf
+    assert 0 <= address <= 0xFFFFFF, address
     buf = device_type.name.encode("ascii")
     if len(device_type.name) == 1:
         buf += b"*"
     if device_type in D_ADDR_16:
         buf += b"%06X" % address
     else:
+        if address > 999999:
+            raise ValueError(address)
         buf += b"%06d" % address
     return buf
 
 
+def device2binary(device_type, address, extended=False):
+    """バイナリ形式時のデバイス表記へ変換する
+
+    :param device_type: デバイス種別
+    :type device_type: DeviceCode
+    :param int address: アドレス
+    :param bool extended: 4バイトアドレス(サブコマンド0x0002/0x0003)の表記とするかどうか
+    :return: バイナリ形式時のデバイス表記、
+        通常は3バイトのアドレスと1バイトのデバイスコード、
+        4バイトアドレスの場合は4バイトのアドレスと2バイトのデバイスコード
+    :rtype: bytes
+    """
+    if extended:
+        assert 0 <= address <= 0xFFFFFFFF, address
+        return struct.pack("<IH", address, device_type.value)
+    assert 0 <= address <= 0xFFFFFF, address
+    return struct.pack("<I", address)[:-1] + struct.pack(
+        "<B", device_type.value
+    )
+
+
+class LRUCache(object):
+    def __init__(self, maxsize):
+        """最近使われたものから maxsize 個を保持するキャッシュ、複数のスレッドから使える
+
+        :param int maxsize: 保持する最大数
+        """
+        assert 0 < maxsize, maxsize
+        self.maxsize = maxsize
+        self.__data = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """キャッシュした値を返す
+
+        :param key: キー
+        :return: 値、キャッシュしていない場合はNone
+        """
+        with self.__lock:
+            value = self.__data.get(key)
+            if value is not None:
+                self.__data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """値をキャッシュし、溢れた場合は最も使われていないものを捨てる
+
+        :param key: キー
+        :param value: 値
+        :return: None
+        """
+        with self.__lock:
+            self.__data[key] = value
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.maxsize:
+                self.__data.popitem(last=False)
+
+    def __len__(self):
+        return len(self.__data)
+
+
 class Target(object):
+    __slots__ = (
+        "__network",
+        "__node",
+        "__dst_proc",
+        "__m_drop",
+        "__binary_header",
+        "__ascii_header",
+    )
+
     def __init__(
         self, network_num=0, node_num=0, dst_proc_num=0, m_drop_num=0
     ):
@@ -148,6 +277,35 @@ class Target(object):
         self.__node = node_num
         self.__dst_proc = dst_proc_num
         self.__m_drop = m_drop_num
+        self.__update()
+
+    def __update(self):
+        """フレームに埋め込むヘッダ部分を作り直す"""
+        self.__binary_header = _TARGET_BINARY.pack(
+            self.__network, self.__node, self.__dst_proc, self.__m_drop
+        )
+        self.__ascii_header = b"%02X%02X%04X%02X" % (
+            self.__network,
+            self.__node,
+            self.__dst_proc,
+            self.__m_drop,
+        )
+
+    @property
+    def binary_header(self):
+        """バイナリモードのフレームに埋め込む接続先
+
+        :rtype: bytes
+        """
+        return self.__binary_header
+
+    @property
+    def ascii_header(self):
+        """ASCIIモードのフレームに埋め込む接続先
+
+        :rtype: bytes
+        """
+        return self.__ascii_header
 
     @property
     def network(self):
@@ -157,6 +315,7 @@ class Target(object):
     def network(self, value: int):
         if isinstance(value, int) and 0 <= value <= 0xFF:
             self.__network = value
+            self.__update()
         else:
             raise ValueError("0 <= value <= 0xFF")
 
@@ -168,6 +327,7 @@ class Target(object):
     def node(self, value: int):
         if isinstance(value, int) and 0 <= value <= 0xFF:
             self.__node = value
+            self.__update()
         else:
             raise ValueError("0 <= value <= 0xFF")
 
@@ -179,6 +339,7 @@ class Target(object):
     def dst_proc(self, value: int):
         if isinstance(value, int) and 0 <= value <= 0xFFFF:
             self.__dst_proc = value
+            self.__update()
         else:
             raise ValueError("0 <= value <= 0xFFFF")
 
@@ -190,6 +351,7 @@ class Target(object):
     def m_drop(self, value: int):
         if isinstance(value, int) and 0 <= value <= 0xFF:
             self.__m_drop = value
+            self.__update()
         else:
             raise ValueError("0 <= value <= 0xFF")
 
@@ -202,6 +364,50 @@ class Target(object):
         )
 
 
+class Response(object):
+    __slots__ = ("network", "pc", "io", "m_drop", "term_code", "data")
+
+    def __init__(self, network, pc, io, m_drop, term_code, data):
+        """受信した応答
+
+        :param int network: ネットワーク番号
+        :param int pc: 局番
+        :param int io: 要求先プロセッサ番号
+        :param int m_drop: マルチドロップ局番
+        :param int term_code: 終了コード
+        :param data: 応答データ、ASCIIモードの場合は文字列
+        :type data: bytes or str
+        """
+        self.network = network
+        self.pc = pc
+        self.io = io
+        self.m_drop = m_drop
+        self.term_code = term_code
+        self.data = data
+
+    def __repr__(self):
+        return "Response(%d,%d,%d,%d,0x%04X,%r)" % (
+            self.network,
+            self.pc,
+            self.io,
+            self.m_drop,
+            self.term_code,
+            self.data,
+        )
+
+
+def _fragments(data):
+    """要求データを断片のタプルとその合計バイト数にする
+
+    :param data: データ、またはバイト単位のバッファの断片のタプル
+    :type data: bytes or tuple
+    :rtype: (tuple, int)
+    """
+    if not isinstance(data, tuple):
+        data = (data,)
+    return data, sum(memoryview(x).nbytes for x in data)
+
+
 def make_binary_frame(seq, target, timeout, cmd, sub_cmd, data, ver):
     """バイナリモードの場合のコマンドフレームを作成する
 
@@ -212,35 +418,28 @@ def make_binary_frame(seq, target, timeout, cmd, sub_cmd, data, ver):
     :param cmd: コマンド
     :type cmd: SLMPCommand
     :param int sub_cmd: サブコマンド
-    :param bytes data: データ
+    :param data: データ、またはバイト単位のバッファの断片のタプル
+    :type data: bytes or tuple
     :param int ver: 生成するのは4Eなのか3E
     :return: コマンドフレーム
     :rtype: bytes
     """
-    assert 0 <= seq <= 0xFF, seq
+    assert 0 <= seq <= 0xFFFF, seq
     assert 0 <= timeout <= 0xFFFF, timeout
     assert 0 <= sub_cmd <= 0xFFFF, sub_cmd
 
     if not isinstance(cmd, SLMPCommand):
         cmd = SLMPCommand(cmd)
-    cmd_text = struct.pack(
-        "<BBHBHHHH",
-        target.network,
-        target.node,
-        target.dst_proc,
-        target.m_drop,
-        len(data) + 6,
-        timeout,
-        cmd.value,
-        sub_cmd,
+    data, size = _fragments(data)
+    cmd_text = target.binary_header + _COMMAND_BINARY.pack(
+        size + 6, timeout, cmd.value, sub_cmd
     )
     if ver == 4:
-        buf = struct.pack("<HHH", 0x54, seq, 0x00) + cmd_text
+        buf = b"".join((_SUBHEADER_4E.pack(0x54, seq, 0x00), cmd_text) + data)
     elif ver == 3:
-        buf = b"\x50\x00" + cmd_text
+        buf = b"".join((b"\x50\x00", cmd_text) + data)
     else:
         raise RuntimeError(ver)
-    buf += data
     assert len(buf) < 8194, len(buf)
     return buf
 
@@ -255,32 +454,29 @@ def make_ascii_frame(seq, target, timeout, cmd, sub_cmd, data, ver):
     :param cmd: コマンド
     :type cmd: SLMPCommand
     :param int sub_cmd: サブコマンド
-    :param bytes data: データ
+    :param data: データ、またはバイト単位のバッファの断片のタプル
+    :type data: bytes or tuple
     :param int ver: 生成するのは4Eなのか3E
     :return: コマンドフレーム
     :rtype: bytes
     """
-    assert 0 <= seq <= 0xFF, seq
+    assert 0 <= seq <= 0xFFFF, seq
     assert 0 <= timeout <= 0xFFFF, timeout
     assert 0 <= sub_cmd <= 0xFFFF, sub_cmd
 
     if not isinstance(cmd, SLMPCommand):
         cmd = SLMPCommand(cmd)
-
-    cmd_text = b"%02X%02X%04X%02X%04X%04X%04X%04X" % (
-        target.network,
-        target.node,
-        target.dst_proc,
-        target.m_drop,
-        len(data) + 12,
+    data, size = _fragments(data)
+    cmd_text = target.ascii_header + b"%04X%04X%04X%04X" % (
+        size + 12,
         timeout,
         cmd.value,  # noqa
         sub_cmd,
     )
     if ver == 4:
-        buf = b"5400%04X0000" % seq + cmd_text + data
+        buf = b"".join((b"5400%04X0000" % seq, cmd_text) + data)
     elif ver == 3:
-        buf = b"5000" + cmd_text + data
+        buf = b"".join((b"5000", cmd_text) + data)
     else:
         raise RuntimeError(ver)
     assert len(buf) < 8194, len(buf)
@@ -304,6 +500,84 @@ def str2bytes_buf(data):
     return bytearray(bytes_buf)
 
 
+def hex2words(data):
+    """ワード毎の16進表現が連続した文字列をバイナリと同じ並びのバイト列へ
+
+    "12340002" --> b"\\x34\\x12\\x02\\x00"
+
+    :param str data: 4桁の16進表現の連なった文字列
+    :return: ワード毎にリトルエンディアンとしたバイト列
+    :rtype: bytes
+    """
+    buf = bytes.fromhex(data)
+    ret = bytearray(len(buf))
+    ret[0::2] = buf[1::2]
+    ret[1::2] = buf[0::2]
+    return bytes(ret)
+
+
+def word_buffer(data):
+    """書き込みデータをワード毎にリトルエンディアンとした連続したバッファにする
+
+    :py:class:`numpy.ndarray` などワード単位のバッファはコピーせずに使い、
+    必要な場合のみリトルエンディアンの符号なし16bitに変換する。
+    :py:class:`bytes` などバイト単位のバッファは、
+    ワード毎にリトルエンディアンとしたバイト列とみなす。
+
+    :param data: 書き込みデータ、整数のリストまたはバッファプロトコルに対応したもの
+    :type data: List[int] or bytes or numpy.ndarray
+    :return: バイト単位のバッファ
+    :rtype: memoryview
+    """
+    try:
+        view = memoryview(data)
+    except TypeError:  # 整数のリスト
+        view = memoryview(array("H", data))
+    if view.itemsize != 1:
+        view = memoryview(np.ascontiguousarray(view, "<u2"))
+    elif not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    view = view.cast("B")
+    assert len(view) % 2 == 0, len(view)
+    return view
+
+
+def words2hex(data):
+    """バイナリと同じ並びのバイト列をワード毎の16進表現が連続した文字列へ
+
+    b"\\x34\\x12\\x02\\x00" --> b"12340002"
+
+    :param data: ワード毎にリトルエンディアンとしたバイト列、
+        バイト単位のバッファプロトコルに対応したもの
+    :type data: bytes or memoryview
+    :return: 4桁の16進表現の連なった文字列
+    :rtype: bytes
+    """
+    assert len(data) % 2 == 0, len(data)
+    buf = memoryview(data).cast("B")
+    ret = bytearray(len(buf))
+    ret[0::2] = buf[1::2]
+    ret[1::2] = buf[0::2]
+    return ret.hex().upper().encode("ascii")
+
+
+@functools.lru_cache(maxsize=4096)
+def encode_label_name(name, binary):
+    """ラベル名を要求電文の形式(文字数とUTF-16の文字列)にする
+
+    同じラベル名を繰り返し送る場合に備えて結果はキャッシュする
+
+    :param str name: ラベル名
+    :param bool binary: バイナリ形式かどうか
+    :return: 要求電文の形式となったラベル名
+    :rtype: bytes
+    """
+    buf = name.encode("utf-16-le")
+    if binary:
+        return struct.pack("<H", len(buf) // 2) + buf
+    return b"%04X" % (len(buf) // 2) + words2hex(buf)
+
+
 def extracts_word_dword_data(buf, split_pos):
     """2バイトデータ列と4バイトデータ列を切り分ける
 
@@ -342,3 +616,12 @@ class SLMPCommunicationError(SLMPError):
         :param EndCode cause: SLMPで通信先より報告されるエラー
         """
         self.cause = cause
+
+
+class SLMPTransferInterrupted(SLMPError):
+    def __init__(self, offset):
+        """分割して行う転送の中断
+
+        :param int offset: 転送が完了している位置、ここから再開できる
+        """
+        self.offset = offset
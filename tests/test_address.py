@@ -0,0 +1,230 @@
+import _socket
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pyslmpclient import SLMPClient
+from pyslmpclient.address import COUNT_DTYPE
+from pyslmpclient.address import WORD_VALUE_DTYPE
+from pyslmpclient.address import device_array
+from pyslmpclient.address import device_spec
+from pyslmpclient.address import encode_devices
+from pyslmpclient.address import needs_extended
+from pyslmpclient.address import parse_address
+from pyslmpclient.address import to_spec
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.util import device2ascii
+from pyslmpclient.util import device2binary
+
+
+class ParseAddressTestCase(unittest.TestCase):
+    def test_parse(self):
+        for text, device_code, address, bit in (
+            ("D100", DeviceCode.D, 100, None),
+            ("x1f", DeviceCode.X, 0x1F, None),
+            ("ZR1000.3", DeviceCode.ZR, 0x1000, 3),
+            ("D0.F", DeviceCode.D, 0, 15),
+            ("SD100", DeviceCode.SD, 100, None),
+            ("DX10", DeviceCode.DX, 0x10, None),
+            ("LTN5", DeviceCode.LTN, 5, None),
+            ("B1A", DeviceCode.B, 0x1A, None),
+        ):
+            with self.subTest(text=text):
+                a = parse_address(text)
+                self.assertIs(a.device_code, device_code)
+                self.assertEqual(a.address, address)
+                self.assertEqual(a.bit, bit)
+        self.assertEqual(repr(parse_address("x1f")), "X1F")
+        self.assertEqual(repr(parse_address("zr1000.3")), "ZR1000.3")
+
+    def test_invalid(self):
+        for text in ("Q1", "X1G", "D1A", "D", "D1.10", "D1.G", "D+1"):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    parse_address(text)
+        # ビット位置はワードデバイスのみ
+        for text in ("M100.3", "X1F.0", "B1A.F", "LTS0.1"):
+            with self.subTest(text=text):
+                with self.assertRaises(ValueError):
+                    parse_address(text)
+        with self.assertRaises(ValueError):
+            device_spec(DeviceCode.M, 100, 3)
+
+    def test_intern(self):
+        a = parse_address("D100")
+        self.assertIs(a, parse_address("D100"))
+        self.assertIs(a, device_spec(DeviceCode.D, 100))
+        self.assertIs(a, to_spec((DeviceCode.D, 100)))
+        self.assertIs(a, to_spec("d100"))
+        self.assertIs(a, to_spec(a))
+        self.assertTupleEqual(tuple(a), (DeviceCode.D, 100))
+
+    def test_encode(self):
+        for dc, addr in ((DeviceCode.D, 100), (DeviceCode.X, 0x1F)):
+            a = device_spec(dc, addr)
+            for extended in (False, True):
+                self.assertEqual(
+                    a.encode(True, extended),
+                    device2binary(dc, addr, extended),
+                )
+                self.assertEqual(
+                    a.encode(False, extended),
+                    device2ascii(dc, addr, extended),
+                )
+        a = device_spec(DeviceCode.LTN, 5)
+        self.assertTrue(a.extended)
+        self.assertIsNone(a.encode(True, False))
+
+    def test_client(self):
+        sent = list()
+        with mock.patch("socket.socket") as socket_mock:
+            for binary in (True, False):
+                for devices in (
+                    [(DeviceCode.D, 0), (DeviceCode.X, 0x20)],
+                    ["D0", "X20"],
+                ):
+                    socket_instance_mock = mock.NonCallableMagicMock(
+                        spec=_socket.socket
+                    )
+                    socket_instance_mock.recv_into.return_value = 0
+                    socket_mock.return_value = socket_instance_mock
+                    a = SLMPClient("192.168.0.1", binary=binary)
+                    with a:
+                        a.entry_monitor_device(devices, [])
+                    sent.append(socket_instance_mock.sendall.call_args)
+        self.assertEqual(sent[0], sent[1])
+        self.assertEqual(sent[2], sent[3])
+
+
+class EncodeDevicesTestCase(unittest.TestCase):
+    devices = [
+        (DeviceCode.D, 100),
+        (DeviceCode.X, 0x1F),
+        (DeviceCode.W, 0x1FFF),
+        (DeviceCode.M, 999999),
+        (DeviceCode.ZR, 0xABCDEF),
+    ]
+
+    def test_encode(self):
+        a = device_array(self.devices)
+        self.assertFalse(needs_extended(a))
+        for extended in (False, True):
+            with self.subTest(extended=extended):
+                self.assertEqual(
+                    encode_devices(a, True, extended),
+                    b"".join(
+                        device2binary(dc, addr, extended)
+                        for dc, addr in self.devices
+                    ),
+                )
+                self.assertEqual(
+                    encode_devices(a, False, extended),
+                    b"".join(
+                        device2ascii(dc, addr, extended)
+                        for dc, addr in self.devices
+                    ),
+                )
+        self.assertTrue(needs_extended(device_array([(DeviceCode.LTN, 5)])))
+
+    def test_decimal_boundary(self):
+        for addr, ascii_extended in (
+            (999999, False),
+            (1000000, True),
+            (99999999, True),
+        ):
+            devices = [(DeviceCode.D, addr), (DeviceCode.X, 0x1F)]
+            a = device_array(devices)
+            specs = [device_spec(dc, x) for dc, x in devices]
+            for binary in (True, False):
+                with self.subTest(addr=addr, binary=binary):
+                    extended = needs_extended(a, binary)
+                    self.assertEqual(
+                        extended,
+                        any(x.needs_extended(binary) for x in specs),
+                    )
+                    if not binary:
+                        self.assertEqual(extended, ascii_extended)
+                    self.assertEqual(
+                        encode_devices(a, binary, extended),
+                        b"".join(x.encode(binary, extended) for x in specs),
+                    )
+        # 桁数に収まらない10進数のアドレスは切り詰めずにエラーとする
+        a = device_array([(DeviceCode.D, 1000000)])
+        with self.assertRaises(ValueError):
+            encode_devices(a, False, False)
+        with self.assertRaises(ValueError):
+            device2ascii(DeviceCode.D, 1000000)
+        a = device_array([(DeviceCode.D, 100000000)])
+        self.assertTrue(needs_extended(a, False))
+        with self.assertRaises(ValueError):
+            encode_devices(a, False, True)
+        with self.assertRaises(ValueError):
+            device_spec(DeviceCode.D, 100000000).encode(False, True)
+
+    def test_client_decimal_boundary(self):
+        sent = list()
+        with mock.patch("socket.socket") as socket_mock:
+            for devices in (
+                [(DeviceCode.D, 1000000)],
+                device_array([(DeviceCode.D, 1000000)]),
+            ):
+                socket_instance_mock = mock.NonCallableMagicMock(
+                    spec=_socket.socket
+                )
+                socket_instance_mock.recv_into.return_value = 0
+                socket_mock.return_value = socket_instance_mock
+                a = SLMPClient("192.168.0.1", binary=False)
+                with a:
+                    with self.assertRaises(OSError):
+                        a.read_random_devices(devices, [], timeout=1)
+                sent.append(socket_instance_mock.sendall.call_args[0][0])
+        self.assertEqual(sent[0], sent[1])
+        self.assertTrue(sent[0].endswith(b"040300020100D***01000000"))
+
+    def test_field(self):
+        a = device_array(
+            [(DeviceCode.D, 0, b"\x50\x05"), ("X20", 0x583)],
+            WORD_VALUE_DTYPE,
+        )
+        self.assertEqual(
+            encode_devices(a, True, False, "value"),
+            b"\x00\x00\x00\xa8\x50\x05\x20\x00\x00\x9c\x83\x05",
+        )
+        self.assertEqual(
+            encode_devices(a, False, False, "value"),
+            b"D*0000000550X*0000200583",
+        )
+
+    def test_client(self):
+        words = [(DeviceCode.D, 0, 4), (DeviceCode.W, 0x100, 8)]
+        bits = [(DeviceCode.M, 0, 2), (DeviceCode.B, 0x100, 3)]
+        sent = list()
+        with mock.patch("socket.socket") as socket_mock:
+            for binary in (True, False):
+                for w, b in (
+                    (words, bits),
+                    (
+                        np.array(
+                            [(dc.value, addr, n) for dc, addr, n in words],
+                            COUNT_DTYPE,
+                        ),
+                        device_array(bits, COUNT_DTYPE),
+                    ),
+                ):
+                    socket_instance_mock = mock.NonCallableMagicMock(
+                        spec=_socket.socket
+                    )
+                    socket_instance_mock.recv_into.return_value = 0
+                    socket_mock.return_value = socket_instance_mock
+                    a = SLMPClient("192.168.0.1", binary=binary)
+                    with a:
+                        with self.assertRaises(OSError):
+                            a.read_block(w, b, timeout=1)
+                    sent.append(socket_instance_mock.sendall.call_args)
+        self.assertEqual(sent[0], sent[1])
+        self.assertEqual(sent[2], sent[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
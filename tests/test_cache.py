@@ -0,0 +1,99 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+from pyslmpclient.cache import PlanCache
+from pyslmpclient.cache import config_hash
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.const import TypeCode
+from pyslmpclient.tag import DataType
+from pyslmpclient.tag import ReadPlan
+from pyslmpclient.tag import Tag
+
+
+class PlanCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tags = [
+            Tag("real", DeviceCode.D, 102, DataType.REAL),
+            Tag("int", DeviceCode.D, 100, DataType.INT, count=2),
+            Tag("str", DeviceCode.W, 0x10, DataType.STRING, length=4),
+        ]
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "cache.json")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir)
+
+    def client(self, binary=True, ver=4):
+        client = mock.Mock()
+        client.protocol = (binary, ver, False)
+        client.read_type_name.return_value = ("R04CPU", TypeCode.R04CPU)
+        return client
+
+    def test_plan(self):
+        a = PlanCache(self.path)
+        p1 = a.plan("plc1", self.tags)
+        self.assertEqual((a.hits, a.misses), (0, 1))
+        self.assertTrue(a.dirty)
+        a.save()
+        self.assertFalse(a.dirty)
+
+        b = PlanCache(self.path)
+        with mock.patch.object(ReadPlan, "_ReadPlan__layout") as layout:
+            p2 = b.plan("plc1", self.tags)
+            layout.assert_not_called()
+        self.assertEqual((b.hits, b.misses), (1, 0))
+        self.assertEqual(p2.frames, p1.frames)
+        self.assertEqual(p2.offsets, p1.offsets)
+        self.assertEqual(p2.struct.format, p1.struct.format)
+        raw = struct.pack("<hhf", 1, 2, 1.5) + b"AB\x00\x00"
+        self.assertDictEqual(p2.decode(raw), p1.decode(raw))
+
+        # タグの定義が変わった場合は作り直す
+        tags = self.tags + [Tag("bcd", DeviceCode.D, 200, DataType.BCD)]
+        self.assertNotEqual(config_hash(tags), config_hash(self.tags))
+        self.assertNotEqual(config_hash(self.tags, 4), config_hash(self.tags))
+        p3 = b.plan("plc1", tags)
+        self.assertEqual((b.hits, b.misses), (1, 1))
+        self.assertEqual(len(p3.frames[0]), 3)
+
+    def test_capability(self):
+        a = PlanCache(self.path)
+        client = self.client()
+        c = a.capability("plc1", client, timeout=4)
+        client.read_type_name.assert_called_once_with(4)
+        self.assertEqual(c.type_code, TypeCode.R04CPU)
+        self.assertEqual((c.binary, c.ver, c.window), (True, 4, 4))
+        a.save()
+
+        b = PlanCache(self.path)
+        client = self.client()
+        c = b.capability("plc1", client)
+        client.read_type_name.assert_not_called()
+        self.assertEqual(c.type_name, "R04CPU")
+        # 交信コードやフレームが変わった場合は確かめ直す
+        client = self.client(ver=3)
+        c = b.capability("plc1", client)
+        client.read_type_name.assert_called_once_with(0)
+        self.assertEqual((c.ver, c.window), (3, 1))
+        b.invalidate("plc1")
+        client = self.client(ver=3)
+        b.capability("plc1", client)
+        client.read_type_name.assert_called_once_with(0)
+
+    def test_broken(self):
+        with open(self.path, "w") as fp:
+            fp.write('{"version": 1, "plans": {')
+        with self.assertLogs("pyslmpclient.cache", "WARNING"):
+            a = PlanCache(self.path)
+        a.plan("plc1", self.tags)
+        self.assertEqual(a.misses, 1)
+        a = PlanCache(os.path.join(self.dir, "none.json"))
+        self.assertFalse(a.dirty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+
+from pyslmpclient.coalesce import WriteCoalescer
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.util import EndCode
+from pyslmpclient.util import SLMPCommunicationError
+
+
+class WriteCoalescerTestCase(unittest.TestCase):
+    def test_merge_words(self):
+        client = mock.MagicMock()
+        a = WriteCoalescer(client, window=10)
+        f1 = a.write_word_devices(DeviceCode.D, 100, [1, 2])
+        f2 = a.write_word_devices(DeviceCode.D, 101, [3, 4])
+        f3 = a.write_random_word_devices([(DeviceCode.D, 200, b"\x05")], [])
+        a.flush()
+        client.write_block.assert_called_once_with(
+            [(DeviceCode.D, 100, 3, [1, 3, 4])], [], timeout=0, wait=True
+        )
+        client.write_random_word_devices.assert_called_once_with(
+            [(DeviceCode.D, 200, b"\x05\x00")], [], timeout=0, wait=True
+        )
+        client.write_random_bit_devices.assert_not_called()
+        for f in (f1, f2, f3):
+            self.assertIsNone(f.result(0))
+
+    def test_merge_bits(self):
+        client = mock.MagicMock()
+        with WriteCoalescer(client, window=10) as a:
+            a.write_bit_devices(DeviceCode.M, 0, [1] * 10)
+            a.write_random_bit_devices(
+                [(DeviceCode.M, 10, 0), (DeviceCode.M, 16, 1)]
+            )
+            a.write_bit_devices(DeviceCode.M, 11, [1] * 5)
+        client.write_block.assert_called_once_with(
+            [],
+            [(DeviceCode.M, 0, 1, [True] * 10 + [False] + [True] * 5)],
+            timeout=0,
+            wait=True,
+        )
+        client.write_random_bit_devices.assert_called_once_with(
+            [(DeviceCode.M, 16, True)], timeout=0, wait=True
+        )
+
+    def test_error(self):
+        client = mock.MagicMock()
+        client.write_random_word_devices.side_effect = TimeoutError()
+        a = WriteCoalescer(client, window=10)
+        f1 = a.write_word_devices(DeviceCode.D, 100, [1, 2])
+        f2 = a.write_word_devices(DeviceCode.D, 300, [1])
+        a.flush()
+        self.assertIsNone(f1.result(0))
+        self.assertIsInstance(f2.exception(0), TimeoutError)
+
+    def test_dword(self):
+        client = mock.MagicMock()
+        a = WriteCoalescer(client, window=10)
+        f1 = a.write_word_devices(DeviceCode.D, 99, [1])
+        f2 = a.write_random_word_devices(
+            [], [(DeviceCode.D, 100, b"\x01\x02\x03\x04")]
+        )
+        a.flush()
+        client.write_block.assert_not_called()
+        client.write_random_word_devices.assert_called_once_with(
+            [(DeviceCode.D, 99, b"\x01\x00")],
+            [(DeviceCode.D, 100, b"\x01\x02\x03\x04")],
+            timeout=0,
+            wait=True,
+        )
+        for f in (f1, f2):
+            self.assertIsNone(f.result(0))
+
+    def test_dword_overlap(self):
+        client = mock.MagicMock()
+        a = WriteCoalescer(client, window=10)
+        a.write_random_word_devices(
+            [], [(DeviceCode.D, 100, b"\x01\x02\x03\x04")]
+        )
+        # 上位ワードへの書き込みは、先に溜まっているダブルワードを送信してから行う
+        a.write_word_devices(DeviceCode.D, 101, [5])
+        client.write_random_word_devices.assert_called_once_with(
+            [],
+            [(DeviceCode.D, 100, b"\x01\x02\x03\x04")],
+            timeout=0,
+            wait=True,
+        )
+
+    def test_end_code(self):
+        client = mock.MagicMock()
+        client.write_block.side_effect = SLMPCommunicationError(
+            EndCode.WrongLength
+        )
+        a = WriteCoalescer(client, window=10)
+        f1 = a.write_word_devices(DeviceCode.D, 100, [1, 2])
+        f2 = a.write_word_devices(DeviceCode.D, 300, [1])
+        a.flush()
+        self.assertIsInstance(f1.exception(0), SLMPCommunicationError)
+        self.assertIsNone(f2.result(0))
+
+    def test_window(self):
+        client = mock.MagicMock()
+        a = WriteCoalescer(client, window=0.01)
+        f = a.write_word_devices(DeviceCode.D, 100, [1, 2])
+        self.assertIsNone(f.result(1))
+        client.write_block.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
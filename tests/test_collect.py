@@ -0,0 +1,71 @@
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pyslmpclient.collect import DataCollectionSubscriber
+
+
+class DataCollectionSubscriberTestCase(unittest.TestCase):
+    def test_batch(self):
+        client = mock.MagicMock()
+        callback = mock.Mock()
+        dtype = np.dtype([("t", "<u4"), ("v", "<i2")])
+        a = DataCollectionSubscriber(
+            client,
+            dtype,
+            callback,
+            password="pass",
+            keep_alive=0,
+            batch_size=3,
+            header_size=2,
+        )
+        a.start()
+        client.data_collection_auth.assert_called_once_with("pass", 0)
+        client.data_collection_get_data.assert_called_once_with(b"", 0)
+        self.assertEqual(client.distribute_callback, a.on_data)
+        records = np.array([(i, -i) for i in range(4)], dtype)
+        a.on_data(b"\x00\x00" + records.tobytes())
+        callback.assert_called_once()
+        columns = callback.call_args[0][0]
+        self.assertListEqual(list(columns["t"]), [0, 1, 2])
+        self.assertListEqual(list(columns["v"]), [0, -1, -2])
+        a.stop()
+        self.assertEqual(callback.call_count, 2)
+        columns = callback.call_args[0][0]
+        self.assertListEqual(list(columns["t"]), [3])
+        self.assertIsNone(client.distribute_callback)
+        self.assertEqual(a.received, 4)
+
+    def test_keep_alive(self):
+        client = mock.MagicMock()
+        a = DataCollectionSubscriber(
+            client, np.dtype([("v", "<u2")]), mock.Mock(), keep_alive=0.01
+        )
+        with a:
+            for _ in range(100):
+                if client.data_collection_keep_alive.called:
+                    break
+                time.sleep(0.01)
+        client.data_collection_keep_alive.assert_called()
+
+    def test_start(self):
+        client = mock.MagicMock()
+        client.distribute_callback = None
+        client.data_collection_get_data.side_effect = TimeoutError()
+        a = DataCollectionSubscriber(
+            client, np.dtype([("v", "<u2")]), mock.Mock(), keep_alive=10
+        )
+        with self.assertRaises(TimeoutError):
+            a.start()
+        self.assertIsNone(client.distribute_callback)
+        client.data_collection_get_data.side_effect = None
+        with a:
+            with self.assertRaises(RuntimeError):
+                a.start()
+        self.assertIsNone(client.distribute_callback)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import _socket
+import struct
+import unittest
+from unittest import mock
+
+from pyslmpclient import SLMPClient
+from pyslmpclient.fleet import Fleet
+
+
+class FleetTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.patcher1 = mock.patch("socket.socket")
+        self.socket_mock = self.patcher1.start()
+        self.socket_mock.side_effect = self.new_socket
+        self.refuse = {"192.168.0.3": 1}
+
+    def tearDown(self) -> None:
+        self.patcher1.stop()
+
+    def new_socket(self, *args):
+        """折り返しテストの要求をそのまま返すソケットのモック"""
+        sock = mock.NonCallableMagicMock(spec=_socket.socket)
+        frames = list()
+
+        def connect(addr):
+            if self.refuse.get(addr[0]):
+                self.refuse[addr[0]] -= 1
+                raise ConnectionRefusedError()
+
+        def recv_into(buf):
+            if not frames:
+                return 0
+            req = frames.pop(0)
+            body = req[19:]
+            reply = (
+                b"\xD4\x00"
+                + req[2:11]
+                + struct.pack("<HH", len(body) + 2, 0)
+                + body
+            )
+            buf[: len(reply)] = reply
+            return len(reply)
+
+        sock.connect.side_effect = connect
+        sock.sendall.side_effect = frames.append
+        sock.recv_into.side_effect = recv_into
+        return sock
+
+    def test_start(self):
+        clients = {
+            "plc%d" % i: SLMPClient("192.168.0.%d" % i) for i in range(1, 4)
+        }
+        notified = list()
+        with Fleet(
+            clients,
+            retry_interval=0.3,
+            on_ready=lambda name, client: notified.append(name),
+        ) as a:
+            names = list(a.as_ready(timeout=0.2))
+            self.assertSetEqual(set(names), {"plc1", "plc2"})
+            self.assertIs(a["plc1"], clients["plc1"])
+            self.assertIsInstance(a.dead["plc3"], ConnectionRefusedError)
+            # 停止していた接続先は再試行で接続される
+            self.assertTrue(a.wait(timeout=5))
+            self.assertDictEqual(a.dead, {})
+        self.assertSetEqual(set(notified), set(clients))
+        self.assertDictEqual(a.ready, {})
+        # 接続に失敗したソケットは閉じる
+        self.assertEqual(self.socket_mock.call_count, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,14 +1,20 @@
 import _socket
 from array import array
+import collections
 import io
 import struct
+import threading
+import time
 import unittest
 from unittest import mock
 
+import numpy as np
 
 from pyslmpclient.const import DeviceCode
+from pyslmpclient.const import LabelDataType
 from pyslmpclient.const import TypeCode
 from pyslmpclient import SLMPClient
+from pyslmpclient.util import SLMPTransferInterrupted
 from pyslmpclient.util import Target
 
 
@@ -28,7 +34,7 @@ class SLMPClientTestCase(unittest.TestCase):
     def tearDown(self) -> None:
         self.patcher1.stop()
 
-    def prepare(self, i, f_type, data_body, socket_instance_mock):
+    def prepare(self, i, f_type, data_body, socket_instance_mock, after=1):
         if f_type == "a":
             code = 0
         else:
@@ -44,20 +50,54 @@ class SLMPClientTestCase(unittest.TestCase):
             length_bytes = struct.pack(
                 "<H", len(self.term_code[code]) + len(data_body)
             )
-        socket_instance_mock.recv.side_effect = io.BytesIO(
-            header_r
-            + self.target_bytes[code]
-            + length_bytes
-            + self.term_code[code]
-            + data_body
-        ).read
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                header_r
+                + self.target_bytes[code]
+                + length_bytes
+                + self.term_code[code]
+                + data_body
+            ],
+            [after],
+        )
         self.socket_mock.return_value = socket_instance_mock
         return SLMPClient(
             addr="192.168.0.1", port=5000, binary=(f_type == "b"), ver=i
         )
 
+    @staticmethod
+    def reply_after_send(socket_instance_mock, frames, after=None):
+        """要求を送信した後に応答を返すよう受信をモックする
+
+        frames[i] は要求を after[i] 個(省略時は i + 1 個)送信した後に返す
+        """
+        if after is None:
+            after = range(1, len(frames) + 1)
+        pending = collections.deque(zip(after, frames))
+
+        def recv_into(buf):
+            if not pending:
+                return 0
+            if socket_instance_mock.sendall.call_count < pending[0][0]:
+                return 0
+            _, frame = pending.popleft()
+            buf[: len(frame)] = frame
+            return len(frame)
+
+        socket_instance_mock.recv_into.side_effect = recv_into
+
+    @staticmethod
+    def response_4e_b(seq, data):
+        return (
+            struct.pack("<HHH", 0xD4, seq, 0)
+            + b"\x01\x01\x01\x00\x01"
+            + struct.pack("<HH", len(data) + 2, 0)
+            + data
+        )
+
     def prepare_no_res(self, f_type, i, socket_instance_mock):
-        socket_instance_mock.recv.side_effect = io.BytesIO(b"").read
+        socket_instance_mock.recv_into.side_effect = io.BytesIO(b"").readinto
         self.socket_mock.return_value = socket_instance_mock
         a = SLMPClient(
             addr="192.168.0.1", port=5000, binary=(f_type == "b"), ver=i
@@ -105,6 +145,7 @@ class SLMPClientDeviceTestCase(SLMPClientTestCase):
                                 start_num=100,
                                 count=8,
                                 timeout=6,
+                                word_access=False,
                             )
                         self.assertTupleEqual(
                             b,
@@ -129,6 +170,116 @@ class SLMPClientDeviceTestCase(SLMPClientTestCase):
                             f_type, i, data_body, socket_instance_mock
                         )
 
+    def test_read_bit_devices_word(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"00C8"
+                        else:
+                            data_body = b"\xC8\x00"
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            # 応答が少なくなるためワードアクセスを選ぶ
+                            b = a.read_bit_devices(
+                                DeviceCode.M,
+                                start_num=100,
+                                count=8,
+                                timeout=6,
+                            )
+                        self.assertTupleEqual(
+                            b,
+                            (
+                                False,
+                                False,
+                                True,
+                                True,
+                                False,
+                                False,
+                                False,
+                                False,
+                            ),
+                        )
+                        if f_type == "a":
+                            data_body = b"04010000M*0000960001"
+                        else:
+                            data_body = (
+                                b"\x01\x04\x00\x00\x60\x00\x00\x90\x01\x00"
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_read_random_bit(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"80010004"
+                        else:
+                            data_body = b"\x01\x80\x04\x00"
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            b = a.read_random_bit_devices(
+                                [
+                                    (DeviceCode.M, 15),
+                                    (DeviceCode.X, 0x22),
+                                    (DeviceCode.M, 0),
+                                    (DeviceCode.M, 1),
+                                ],
+                                timeout=6,
+                            )
+                        self.assertTupleEqual(b, (True, True, True, False))
+                        if f_type == "a":
+                            data_body = b"04030000" b"0200" b"M*000000X*000020"
+                        else:
+                            data_body = (
+                                b"\x03\x04\x00\x00\x02\x00"
+                                b"\x00\x00\x00\x90\x20\x00\x00\x9C"
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_read_random_bit_extended(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0, b"\x01\x00" + bytes(190)),
+                self.response_4e_b(1, bytes(8) + b"\x01\x00"),
+            ],
+            [2, 2],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        a.target = self.target
+        devices = [(DeviceCode.M, i * 16) for i in range(100)]
+        devices.append((DeviceCode.LTS, 0))
+        with a:
+            b = a.read_random_bit_devices(devices, timeout=6, window=2)
+        self.assertTupleEqual(b, (True,) + (False,) * 99 + (True,))
+        sent = [c[0][0] for c in socket_instance_mock.sendall.call_args_list]
+        # サブコマンド0x0002は1回あたり96点まで
+        self.assertListEqual(
+            [(x[15:19], x[19]) for x in sent],
+            [(b"\x03\x04\x00\x00", 96), (b"\x03\x04\x02\x00", 5)],
+        )
+
     def test_read_word_devices(self):
         for f_type in ("a", "b"):
             with self.subTest(ftype=f_type):
@@ -201,6 +352,132 @@ class SLMPClientDeviceTestCase(SLMPClientTestCase):
                             f_type, i, data_body, socket_instance_mock
                         )
 
+    def test_read_word_devices_extended(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"0001000200030004"
+                        else:
+                            data_body = b"\x01\x00\x02\x00\x03\x00\x04\x00"
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            b = a.read_word_devices(
+                                DeviceCode.LTN,
+                                start_num=10,
+                                count=4,
+                                timeout=6,
+                            )
+                            self.assertSequenceEqual(
+                                b, array("H", [1, 2, 3, 4]), array
+                            )
+                        if f_type == "a":
+                            data_body = b"04010002LTN*000000100004"
+                        else:
+                            data_body = (
+                                b"\x01\x04\x02\x00\x0A\x00\x00\x00"
+                                b"\x52\x00\x04\x00"
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_extended_device_list(self):
+        # 4バイトアドレスのデバイスを含むランダム読み出し、ブロック読み出し、
+        # モニタ登録
+        words = [(DeviceCode.D, 0), (DeviceCode.LTN, 10)]
+        blocks = [(DeviceCode.D, 0, 1), (DeviceCode.LTN, 10, 1)]
+        d_ascii = b"D***00000000"
+        ltn_ascii = b"LTN*00000010"
+        d_binary = b"\x00\x00\x00\x00\xa8\x00"
+        ltn_binary = b"\x0a\x00\x00\x00\x52\x00"
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        reply = (
+                            b"00010002"
+                            if f_type == "a"
+                            else b"\x01\x00\x02\x00"
+                        )
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        a = self.prepare(
+                            i, f_type, reply, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            a.read_random_devices(words, [], timeout=6)
+                        if f_type == "a":
+                            data_body = b"040300020200" + d_ascii + ltn_ascii
+                        else:
+                            data_body = (
+                                b"\x03\x04\x02\x00\x02\x00"
+                                + d_binary
+                                + ltn_binary
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        a = self.prepare(
+                            i, f_type, reply, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            a.read_block_raw(blocks, [], timeout=6)
+                        if f_type == "a":
+                            data_body = (
+                                b"040600020200"
+                                + d_ascii
+                                + b"0001"
+                                + ltn_ascii
+                                + b"0001"
+                            )
+                        else:
+                            data_body = (
+                                b"\x06\x04\x02\x00\x02\x00"
+                                + d_binary
+                                + b"\x01\x00"
+                                + ltn_binary
+                                + b"\x01\x00"
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        a = self.prepare_no_res(
+                            f_type, i, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            a.entry_monitor_device(words, [], timeout=6)
+                        if f_type == "a":
+                            data_body = b"080100020200" + d_ascii + ltn_ascii
+                        else:
+                            data_body = (
+                                b"\x01\x08\x02\x00\x02\x00"
+                                + d_binary
+                                + ltn_binary
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
     def test_write_bit_devices(self):
         for f_type in ("a", "b"):
             with self.subTest(ftype=f_type):
@@ -261,6 +538,33 @@ class SLMPClientDeviceTestCase(SLMPClientTestCase):
                             f_type, i, data_body, socket_instance_mock
                         )
 
+    def test_write_word_devices_buffer(self):
+        for f_type in ("a", "b"):
+            for data in (
+                np.array([0x2347, 0xAB96], "u2"),
+                np.array([0x2347, 0xAB96], "i8"),
+                b"\x47\x23\x96\xab",
+                array("H", [0x2347, 0xAB96]),
+            ):
+                with self.subTest(ftype=f_type, data=data):
+                    socket_instance_mock = mock.NonCallableMagicMock(
+                        spec=_socket.socket
+                    )
+                    a = self.prepare_no_res(f_type, 4, socket_instance_mock)
+                    a.target = self.target
+                    with a:
+                        a.write_word_devices(DeviceCode.M, 100, data, 6)
+                    if f_type == "a":
+                        data_body = b"14010000M*00010000022347AB96"
+                    else:
+                        data_body = (
+                            b"\x01\x14\x00\x00\x64\x00\x00\x90"
+                            b"\x02\x00\x47\x23\x96\xAB"
+                        )
+                    self.check_send_data(
+                        f_type, 4, data_body, socket_instance_mock
+                    )
+
     def test_write_word_devices_2(self):
         for f_type in ("a", "b"):
             with self.subTest(ftype=f_type):
@@ -477,8 +781,10 @@ class SLMPClientDeviceTestCase(SLMPClientTestCase):
                                 b"\x4e\x4f\x54\x4c\xaf\xb9\xde\xc3"
                                 b"\xb7\xbc\xdd\xba"
                             )
+                        # 応答はモニタ登録(応答を待たない)の後、
+                        # モニタ要求を送信してから返す
                         a = self.prepare(
-                            i, f_type, data_body, socket_instance_mock
+                            i, f_type, data_body, socket_instance_mock, 2
                         )
                         a.target = self.target
                         with a:
@@ -944,6 +1250,295 @@ class SLMPClientDeviceTestCase(SLMPClientTestCase):
                             f_type, i, data_body, socket_instance_mock
                         )
 
+    def test_write_block_buffer(self):
+        words = [0x8, 0x00, 0x00, 0x2800]
+        bits = [1, 0, 0, 1] * 8
+        for f_type in ("a", "b"):
+            sent = list()
+            for w_data in (words, np.array(words, "<u2")):
+                socket_instance_mock = mock.NonCallableMagicMock(
+                    spec=_socket.socket
+                )
+                a = self.prepare_no_res(f_type, 4, socket_instance_mock)
+                with a:
+                    a.write_block(
+                        [(DeviceCode.D, 0, 4, w_data)],
+                        [(DeviceCode.M, 0, 2, np.array(bits, bool))],
+                    )
+                sent.append(socket_instance_mock.sendall.call_args)
+            self.assertEqual(sent[0], sent[1])
+
+
+class SLMPClientLabelTestCase(SLMPClientTestCase):
+    def test_read_random_labels(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"0001020000021234"
+                        else:
+                            data_body = b"\x01\x00\x02\x00\x02\x00\x34\x12"
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            b = a.read_random_labels(["ab"], timeout=6)
+                        self.assertListEqual(
+                            b, [(LabelDataType.Word, b"\x34\x12")]
+                        )
+                        if f_type == "a":
+                            data_body = b"041C000000010000000200610062"
+                        else:
+                            data_body = (
+                                b"\x1C\x04\x00\x00\x01\x00\x00\x00"
+                                b"\x02\x00a\x00b\x00"
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_write_random_labels(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        a = self.prepare_no_res(
+                            f_type, i, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            a.write_random_labels(
+                                [("ab", b"\x34\x12")], timeout=6
+                            )
+                        if f_type == "a":
+                            data_body = (
+                                b"141B000000010000000200610062"
+                                b"00021234"
+                            )
+                        else:
+                            data_body = (
+                                b"\x1B\x14\x00\x00\x01\x00\x00\x00"
+                                b"\x02\x00a\x00b\x00\x02\x00\x34\x12"
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_read_array_labels(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"00020201000402010403010000030005"
+                        else:
+                            data_body = (
+                                b"\x02\x00\x02\x01\x04\x00\x01\x02\x03\x04"
+                                b"\x01\x00\x03\x00\x05\x00"
+                            )
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            b = a.read_array_labels(
+                                [("ab", 1, 4), ("c", 0, 3)], timeout=6
+                            )
+                        self.assertListEqual(
+                            b,
+                            [
+                                (LabelDataType.Word, 1, b"\x01\x02\x03\x04"),
+                                (LabelDataType.Bit, 0, b"\x05\x00"),
+                            ],
+                        )
+                        if f_type == "a":
+                            data_body = (
+                                b"041A0000000200000002006100620100"
+                                b"00040001006300000003"
+                            )
+                        else:
+                            data_body = (
+                                b"\x1A\x04\x00\x00\x02\x00\x00\x00"
+                                b"\x02\x00a\x00b\x00\x01\x00\x04\x00"
+                                b"\x01\x00c\x00\x00\x00\x03\x00"
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_read_labels_layout(self):
+        # 全体の長さが同じでもラベル毎のデータ長が異なれば書式を作り直す
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(
+                    0,
+                    b"\x02\x00\x02\x00\x02\x00\x34\x12"
+                    b"\x03\x00\x04\x00\x78\x56\x34\x12",
+                ),
+                self.response_4e_b(
+                    1,
+                    b"\x02\x00\x03\x00\x04\x00\x78\x56\x34\x12"
+                    b"\x02\x00\x02\x00\x34\x12",
+                ),
+            ],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        with a:
+            b = a.read_random_labels(["a", "b"], timeout=6)
+            c = a.read_random_labels(["a", "b"], timeout=6)
+        self.assertListEqual(
+            b,
+            [
+                (LabelDataType.Word, b"\x34\x12"),
+                (LabelDataType.DoubleWord, b"\x78\x56\x34\x12"),
+            ],
+        )
+        self.assertListEqual(
+            c,
+            [
+                (LabelDataType.DoubleWord, b"\x78\x56\x34\x12"),
+                (LabelDataType.Word, b"\x34\x12"),
+            ],
+        )
+
+    def test_write_array_labels(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        a = self.prepare_no_res(
+                            f_type, i, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            a.write_array_labels(
+                                [("ab", 1, 4, b"\x01\x02\x03\x04")],
+                                timeout=6,
+                            )
+                        if f_type == "a":
+                            data_body = (
+                                b"141A0000000100000002006100620100"
+                                b"000402010403"
+                            )
+                        else:
+                            data_body = (
+                                b"\x1A\x14\x00\x00\x01\x00\x00\x00"
+                                b"\x02\x00a\x00b\x00\x01\x00\x04\x00"
+                                b"\x01\x02\x03\x04"
+                            )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+
+class SLMPClientFileTestCase(SLMPClientTestCase):
+    def test_download_file(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        body = bytes(range(256)) * 10
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0, b"\x05\x00"),
+                self.response_4e_b(1, b"\x80\x07" + body[:1920]),
+                self.response_4e_b(2, b"\x80\x02" + body[1920:]),
+                self.response_4e_b(3, b""),
+            ],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        a.target = self.target
+        out = io.BytesIO()
+        with a:
+            b = a.download_file("A.CSV", out, size=2560, window=2, timeout=6)
+        self.assertEqual(b, 2560)
+        self.assertEqual(out.getvalue(), body)
+        sent = [c[0][0] for c in socket_instance_mock.sendall.call_args_list]
+        self.assertEqual(len(sent), 4)
+        self.assertEqual(
+            sent[0][15:],
+            b"\x27\x18\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+            b"\x05\x00A.CSV",
+        )
+        self.assertEqual(
+            sent[2][15:],
+            b"\x28\x18\x00\x00\x05\x00\x80\x07\x00\x00\x80\x02",
+        )
+        self.assertEqual(
+            sent[3][15:], b"\x2A\x18\x00\x00\x05\x00\x00\x00"
+        )
+
+
+    def test_download_file_until_eof(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        body = bytes(range(256)) * 10
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0, b"\x05\x00"),
+                self.response_4e_b(1, b"\x80\x07" + body[:1920]),
+                self.response_4e_b(2, b"\x80\x02" + body[1920:]),
+                self.response_4e_b(3, b""),
+            ],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        a.target = self.target
+        out = io.BytesIO()
+        with a:
+            b = a.download_file("A.CSV", out, window=4, timeout=6)
+        self.assertEqual(b, 2560)
+        self.assertEqual(out.getvalue(), body)
+        sent = [c[0][0] for c in socket_instance_mock.sendall.call_args_list]
+        self.assertEqual(len(sent), 4)
+        self.assertEqual(
+            sent[3][15:], b"\x2A\x18\x00\x00\x05\x00\x00\x00"
+        )
+
+    def test_download_file_interrupted(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        body = bytes(range(256)) * 10
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0, b"\x05\x00"),
+                self.response_4e_b(1, b"\x80\x07" + body[:1920]),
+                struct.pack("<HHH", 0xD4, 2, 0)
+                + b"\x01\x01\x01\x00\x01"
+                + struct.pack("<HH", 2, 0xC061),
+                struct.pack("<HHH", 0xD4, 3, 0)
+                + b"\x01\x01\x01\x00\x01"
+                + struct.pack("<HH", 2, 0xC061),
+            ],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        a.target = self.target
+        out = io.BytesIO()
+        with a:
+            with self.assertRaises(SLMPTransferInterrupted) as cm:
+                a.download_file(
+                    "A.CSV", out, size=2560, window=1, timeout=6
+                )
+        self.assertEqual(cm.exception.offset, 1920)
+        self.assertEqual(out.getvalue(), body[:1920])
+
 
 class SLMPClientRemoteControlTestCase(SLMPClientTestCase):
     def test_read_type_name(self):
@@ -1004,6 +1599,281 @@ class SLMPClientOtherTestCase(SLMPClientTestCase):
                             f_type, i, data_body, socket_instance_mock
                         )
 
+    def test_close_tcp(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        shutdown = threading.Event()
+        finished = threading.Event()
+
+        def recv_into(buf):
+            # 実際のソケットと同様に、閉じるまで受信を待ち、閉じると0を返す
+            if not shutdown.wait(0.01):
+                raise _socket.timeout()
+            finished.set()
+            return 0
+
+        socket_instance_mock.recv_into.side_effect = recv_into
+        socket_instance_mock.shutdown.side_effect = (
+            lambda how: shutdown.set()
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, tcp=True)
+        a.on_connection_lost = mock.Mock()
+        a.logger = mock.Mock()
+        with a:
+            pass
+        self.assertTrue(finished.wait(1))
+        time.sleep(0.05)
+        a.on_connection_lost.assert_not_called()
+        a.logger.error.assert_not_called()
+
+    def test_threads(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(seq, struct.pack("<H", seq))
+                for seq in reversed(range(8))
+            ],
+            [8] * 8,
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        results = list()
+        with a:
+            threads = [
+                threading.Thread(
+                    target=lambda: results.append(
+                        a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)[0]
+                    )
+                )
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertListEqual(sorted(results), list(range(8)))
+
+    def test_drop_replies(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0, b""),
+                self.response_4e_b(5, b""),
+                self.response_4e_b(1, b"\x34\x12"),
+            ],
+            [1, 2, 2],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        with a:
+            a.write_word_devices(DeviceCode.D, 0, [1], timeout=4)
+            ret = a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)
+        self.assertListEqual(list(ret), [0x1234])
+        # 書き込みの応答と、要求していないシリアル番号の応答は捨てる
+        self.assertEqual(a.dropped_replies, 2)
+
+    def test_duplicate_replies(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0, b"\x34\x12"),
+                self.response_4e_b(0, b"\x34\x12"),
+                self.response_4e_b(1, b""),
+            ],
+            [1, 2, 2],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        with a:
+            ret = a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)
+            a.write_word_devices(DeviceCode.D, 0, [1], timeout=4)
+            for _ in range(100):
+                if a.dropped_replies:
+                    break
+                time.sleep(0.01)
+        self.assertListEqual(list(ret), [0x1234])
+        # 受け取り済みの要求への応答は重複として数える
+        self.assertEqual(a.duplicate_replies, 1)
+        self.assertEqual(a.dropped_replies, 1)
+
+
+class SLMPClientOnDemandTestCase(SLMPClientTestCase):
+    def test_on_demand(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"210100001234"
+                            expected = b"1234"
+                        else:
+                            data_body = b"\x01\x21\x00\x00\x12\x34"
+                            expected = b"\x12\x34"
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock, 0
+                        )
+                        callback = mock.Mock()
+                        a.on_demand_callback = callback
+                        with a:
+                            b = a.wait_on_demand_data(1)
+                        self.assertEqual(b, expected)
+                        callback.assert_called_once_with(expected)
+                        self.assertIsNone(a.check_on_demand_data())
+
+
+    def test_reply_like_on_demand(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"21010000"
+                        else:
+                            data_body = b"\x01\x21\x00\x00"
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock
+                        )
+                        with a:
+                            ret = a.read_word_devices(
+                                DeviceCode.D, 0, 2, timeout=6
+                            )
+                        self.assertListEqual(list(ret), [0x2101, 0])
+                        self.assertIsNone(a.check_on_demand_data())
+
+
+class SLMPClientDataCollectionTestCase(SLMPClientTestCase):
+    def test_data_collection_auth(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        a = self.prepare(i, f_type, b"", socket_instance_mock)
+                        a.target = self.target
+                        with a:
+                            a.data_collection_auth("pass", timeout=6)
+                        data_body = (
+                            b"400000000004pass"
+                            if f_type == "a"
+                            else b"\x00\x40\x00\x00\x04\x00pass"
+                        )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_data_collection_keep_alive(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        a = self.prepare(i, f_type, b"", socket_instance_mock)
+                        a.target = self.target
+                        with a:
+                            a.data_collection_keep_alive(timeout=6)
+                        data_body = (
+                            b"40010000"
+                            if f_type == "a"
+                            else b"\x01\x40\x00\x00"
+                        )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_data_collection_get_data(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"40030000AB"
+                            expected = b"\x40\x03\x00\x00\xAB"
+                        else:
+                            data_body = b"\x03\x40\x00\x00\xAB"
+                            expected = data_body
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock
+                        )
+                        a.target = self.target
+                        callback = mock.Mock()
+                        a.distribute_callback = callback
+                        with a:
+                            ret = a.data_collection_get_data(
+                                b"\x01\x02", timeout=6
+                            )
+                        # 応答待ちの要求への応答は配信データとみなさない
+                        self.assertEqual(ret, expected)
+                        callback.assert_not_called()
+                        data_body = (
+                            b"400200000102"
+                            if f_type == "a"
+                            else b"\x02\x40\x00\x00\x01\x02"
+                        )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_distribute_4e(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0x1234, b"\x03\x40\x00\x00\x56"),
+                self.response_4e_b(0, b"\x03\x40\x00\x00\xAB"),
+            ],
+            [1, 1],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        a.target = self.target
+        callback = mock.Mock()
+        a.distribute_callback = callback
+        with a:
+            ret = a.data_collection_get_data(timeout=6)
+        self.assertEqual(ret, b"\x03\x40\x00\x00\xAB")
+        callback.assert_called_once_with(b"\x56")
+
+    def test_distribute_3e(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                b"\xD0\x00\x01\x01\x01\x00\x01\x07\x00\x00\x00"
+                b"\x03\x40\x00\x00\x56",
+                b"\xD0\x00\x01\x01\x01\x00\x01\x07\x00\x00\x00"
+                b"\x03\x40\x00\x00\xAB",
+            ],
+            [0, 1],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=3)
+        a.target = self.target
+        received = threading.Event()
+        callback = mock.Mock(side_effect=lambda data: received.set())
+        a.distribute_callback = callback
+        with a:
+            # 応答待ちの要求がない間に受信したものは配信データ
+            self.assertTrue(received.wait(1))
+            ret = a.data_collection_get_data(timeout=6)
+        self.assertEqual(ret, b"\x03\x40\x00\x00\xAB")
+        callback.assert_called_once_with(b"\x56")
+
 
 class SLMPClientMemoryTestCase(SLMPClientTestCase):
     target_bytes = (b"00FF000101", b"\x00\xff\x01\x00\x01")
@@ -1096,6 +1966,111 @@ class SLMPClientMemoryTestCase(SLMPClientTestCase):
                             f_type, i, data_body, socket_instance_mock
                         )
 
+    def test_read_bulk(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        body = bytes(range(200)) * 6
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0, body[:960]),
+                self.response_4e_b(1, body[960:]),
+            ],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        a.target = Target(0, 0xFF, 1, 1)
+        with a:
+            ret = a.memory_read_bulk(0x78, 600, window=2, timeout=6)
+        self.assertIsInstance(ret, memoryview)
+        self.assertEqual(ret, body)
+        sent = [c[0][0] for c in socket_instance_mock.sendall.call_args_list]
+        self.assertEqual(
+            sent[0][15:], b"\x13\x06\x00\x00\x78\x00\x00\x00\xE0\x01"
+        )
+        self.assertEqual(
+            sent[1][15:], b"\x13\x06\x00\x00\x58\x02\x00\x00\x78\x00"
+        )
+
+    def test_read_bulk_interrupted(self):
+        body = bytes(range(200)) * 6
+        for name, frames, error, offset in (
+            ("short", [body[:960], body[960:1000]], None, 1000),
+            ("oserror", [body[:960]], ConnectionResetError(), 960),
+        ):
+            with self.subTest(name=name):
+                socket_instance_mock = mock.NonCallableMagicMock(
+                    spec=_socket.socket
+                )
+                self.reply_after_send(
+                    socket_instance_mock,
+                    [self.response_4e_b(i, f) for i, f in enumerate(frames)],
+                )
+                socket_instance_mock.sendall.side_effect = [None, error]
+                self.socket_mock.return_value = socket_instance_mock
+                a = SLMPClient(
+                    addr="192.168.0.1", port=5000, binary=True, ver=4
+                )
+                a.target = Target(0, 0xFF, 1, 1)
+                with a:
+                    with self.assertRaises(SLMPTransferInterrupted) as cm:
+                        a.memory_read_bulk(0x78, 600, window=1, timeout=6)
+                self.assertEqual(cm.exception.offset, offset)
+
+
+class SLMPClientExtendUnitTestCase(SLMPClientTestCase):
+    def test_read(self):
+        for f_type in ("a", "b"):
+            with self.subTest(ftype=f_type):
+                for i in (3, 4):
+                    with self.subTest(i=i):
+                        socket_instance_mock = mock.NonCallableMagicMock(
+                            spec=_socket.socket
+                        )
+                        if f_type == "a":
+                            data_body = b"12340002"
+                        else:
+                            data_body = b"\x34\x12\x02\x00"
+                        a = self.prepare(
+                            i, f_type, data_body, socket_instance_mock
+                        )
+                        a.target = self.target
+                        with a:
+                            ret = a.extend_unit_read(1, 0x100, 4, timeout=6)
+                        self.assertEqual(ret, b"\x34\x12\x02\x00")
+                        data_body = (
+                            b"060100000000010000040001"
+                            if f_type == "a"
+                            else b"\x01\x06\x00\x00\x00\x01\x00\x00"
+                            b"\x04\x00\x01\x00"
+                        )
+                        self.check_send_data(
+                            f_type, i, data_body, socket_instance_mock
+                        )
+
+    def test_read_bulk(self):
+        socket_instance_mock = mock.NonCallableMagicMock(spec=_socket.socket)
+        body = bytes(range(250)) * 8
+        self.reply_after_send(
+            socket_instance_mock,
+            [
+                self.response_4e_b(0, body[:1920]),
+                self.response_4e_b(1, body[1920:]),
+            ],
+        )
+        self.socket_mock.return_value = socket_instance_mock
+        a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+        a.target = self.target
+        out = bytearray(2000)
+        with a:
+            ret = a.extend_unit_read_bulk(1, 0, 2000, out=out, timeout=6)
+        self.assertEqual(ret, body)
+        self.assertEqual(out, body)
+        sent = [c[0][0] for c in socket_instance_mock.sendall.call_args_list]
+        self.assertEqual(
+            sent[1][15:],
+            b"\x01\x06\x00\x00\x80\x07\x00\x00\x50\x00\x01\x00",
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
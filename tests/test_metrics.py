@@ -0,0 +1,156 @@
+import _socket
+import io
+import struct
+import time
+import unittest
+from unittest import mock
+
+from pyslmpclient import SLMPClient
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.const import SLMPCommand
+from pyslmpclient.metrics import ClientMetrics
+from pyslmpclient.metrics import Histogram
+from pyslmpclient.util import Target
+
+
+class HistogramTestCase(unittest.TestCase):
+    def test_observe(self):
+        a = Histogram((1, 10))
+        for v in (0.5, 1, 5, 20):
+            a.observe(v)
+        self.assertListEqual(a.counts, [2, 1, 1])
+        self.assertListEqual(
+            a.cumulative(), [(1, 2), (10, 3), (float("inf"), 4)]
+        )
+        self.assertEqual(a.sum, 26.5)
+
+
+class ClientMetricsTestCase(unittest.TestCase):
+    def test_hooks(self):
+        a = ClientMetrics()
+        target = Target(1, 2, 3, 4)
+        cmd = SLMPCommand.Device_Read
+        endpoint = "192.168.0.1:5000"
+        key = a.on_send(endpoint, 0, target, cmd, 21, 0.0)
+        a.on_sent(key, 0.001)
+        a.on_send(endpoint, 1, target, cmd, 21, 0.0)
+        self.assertEqual(a.in_flight, 2)
+        a.on_reply(endpoint, 0, 0xC059, 11)
+        a.on_timeout(endpoint, 1)
+        a.on_reply(endpoint, 1, 0, 11)
+        self.assertTupleEqual(
+            key, (endpoint, "SLMPTarget(1,2,3,4)", "Device_Read")
+        )
+        self.assertEqual(a.send_time[key].count, 1)
+        self.assertEqual(a.counters["requests", key], 2)
+        self.assertEqual(a.counters["replies", key], 1)
+        self.assertEqual(a.counters["errors", key], 1)
+        self.assertEqual(a.counters["timeouts", key], 1)
+        self.assertEqual(a.counters["orphan_replies", ()], 1)
+        self.assertEqual(a.latency[key].count, 1)
+        text = a.to_prometheus()
+        self.assertIn(
+            'slmp_requests_total{command="Device_Read",'
+            'endpoint="192.168.0.1:5000",target="SLMPTarget(1,2,3,4)"} 2',
+            text,
+        )
+        self.assertIn('slmp_in_flight_bucket{le="2"} 2', text)
+
+    def test_shared(self):
+        a = ClientMetrics()
+        target = Target(1, 2, 3, 4)
+        cmd = SLMPCommand.Device_Read
+        # 複数のクライアントで同じシリアル番号を使っても区別する
+        key1 = a.on_send("192.168.0.1:5000", 0, target, cmd, 21, 0.0)
+        key2 = a.on_send("192.168.0.2:5000", 0, target, cmd, 21, 0.0)
+        self.assertNotEqual(key1, key2)
+        self.assertEqual(a.in_flight, 2)
+        a.on_reply("192.168.0.2:5000", 0, 0, 11)
+        a.on_timeout("192.168.0.1:5000", 0)
+        self.assertEqual(a.in_flight, 0)
+        self.assertEqual(a.counters["replies", key2], 1)
+        self.assertEqual(a.counters["replies", key1], 0)
+        self.assertEqual(a.counters["timeouts", key1], 1)
+        self.assertEqual(a.counters["orphan_replies", ()], 0)
+
+    def test_pending(self):
+        target = Target(1, 2, 3, 4)
+        cmd = SLMPCommand.Device_Read
+        endpoint = "192.168.0.1:5000"
+        with mock.patch("pyslmpclient.metrics.time") as time_mock:
+            time_mock.monotonic.return_value = 100.0
+            a = ClientMetrics()
+            # 3Eフレームのシリアル番号は常に0
+            key = a.on_send(endpoint, 0, target, cmd, 21, 100.0, 1.0)
+            a.on_send(endpoint, 0, target, cmd, 21, 100.0, 1.0)
+            a.on_send(endpoint, 0, target, cmd, 21, 100.0, 1.0)
+            self.assertEqual(a.in_flight, 3)
+            a.on_reply(endpoint, 0, 0, 11)
+            a.on_send_failed(endpoint, 0)
+            self.assertEqual(a.in_flight, 1)
+            # 応答のない要求は期限でタイムアウトとする
+            time_mock.monotonic.return_value = 102.0
+            self.assertEqual(a.in_flight, 0)
+        self.assertEqual(a.counters["replies", key], 1)
+        self.assertEqual(a.counters["send_errors", key], 1)
+        self.assertEqual(a.counters["timeouts", key], 1)
+        self.assertEqual(a.counters["orphan_replies", ()], 0)
+
+    def test_client(self):
+        with mock.patch("socket.socket") as socket_mock:
+            socket_instance_mock = mock.NonCallableMagicMock(
+                spec=_socket.socket
+            )
+            frame = (
+                struct.pack("<HHH", 0xD4, 0, 0)
+                + b"\x00\xFF\xFF\x03\x00"
+                + struct.pack("<HH", 4, 0)
+                + b"\x34\x12"
+            )
+            # 重複した応答
+            reply = io.BytesIO(frame * 2)
+
+            def recv_into(buf):
+                # 要求を送信してから応答を返す
+                if not socket_instance_mock.sendall.called:
+                    return 0
+                return reply.readinto(buf)
+
+            socket_instance_mock.recv_into.side_effect = recv_into
+            socket_mock.return_value = socket_instance_mock
+            a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+            a.metrics = ClientMetrics()
+            with a:
+                a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)
+                for _ in range(100):
+                    if a.duplicate_replies:
+                        break
+                    time.sleep(0.01)
+        key = ("192.168.0.1:5000", "SLMPTarget(0,0,0,0)", "Device_Read")
+        self.assertEqual(a.duplicate_replies, 1)
+        self.assertEqual(a.metrics.counters["requests", key], 1)
+        self.assertEqual(a.metrics.counters["replies", key], 1)
+        self.assertEqual(a.metrics.counters["bytes_received", key], 17)
+        self.assertEqual(a.metrics.counters["orphan_replies", ()], 0)
+        self.assertEqual(a.metrics.in_flight, 0)
+
+    def test_client_send_error(self):
+        with mock.patch("socket.socket") as socket_mock:
+            socket_instance_mock = mock.NonCallableMagicMock(
+                spec=_socket.socket
+            )
+            socket_instance_mock.recv_into.return_value = 0
+            socket_instance_mock.sendall.side_effect = BrokenPipeError()
+            socket_mock.return_value = socket_instance_mock
+            a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+            a.metrics = ClientMetrics()
+            with a:
+                with self.assertRaises(BrokenPipeError):
+                    a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)
+        key = ("192.168.0.1:5000", "SLMPTarget(0,0,0,0)", "Device_Read")
+        self.assertEqual(a.metrics.counters["send_errors", key], 1)
+        self.assertEqual(a.metrics.in_flight, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.recorder import Recorder
+from pyslmpclient.recorder import RecordReader
+from pyslmpclient.tag import DataType
+from pyslmpclient.tag import ReadPlan
+from pyslmpclient.tag import Tag
+
+
+class RecorderTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "rec.bin")
+        self.plan = ReadPlan(
+            [
+                Tag("a", DeviceCode.D, 100, DataType.INT),
+                Tag("b", DeviceCode.D, 102, DataType.REAL),
+            ]
+        )
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.dir)
+
+    def test_ring(self):
+        with Recorder(self.path, self.plan, 4) as a:
+            for i in range(6):
+                a.append(struct.pack("<hxxf", i, i / 2), 100.0 + i)
+            self.assertEqual(a.count, 6)
+            self.assertEqual(len(a), 4)
+        with RecordReader(self.path) as b:
+            self.assertEqual(len(b), 4)
+            segments = b.segments()
+            self.assertEqual(len(segments), 2)
+            self.assertListEqual(
+                list(np.concatenate(b.column("a"))), [2, 3, 4, 5]
+            )
+            self.assertListEqual(
+                list(np.concatenate(b.column("timestamp", last=2))),
+                [104.0, 105.0],
+            )
+            (b_col,) = b.column("b", last=1)
+            self.assertEqual(b_col[0], 2.5)
+            self.assertTrue(np.shares_memory(b_col, segments[1]))
+
+    def test_record(self):
+        client = mock.MagicMock()
+        client.read_block_raw.return_value = struct.pack("<hxxf", 7, 1.5)
+        with Recorder(self.path, self.plan, 10) as a:
+            a.record(client)
+        with Recorder(self.path, self.plan, 10) as a:
+            a.record(client)
+            self.assertEqual(a.count, 2)
+            self.assertListEqual(list(a.column("a")[0]), [7, 7])
+        with self.assertRaises(ValueError):
+            Recorder(self.path, self.plan, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import _socket
+import struct
+import unittest
+from unittest import mock
+
+from pyslmpclient import SLMPClient
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.const import SLMPCommand
+from pyslmpclient.redundant import RedundantClient
+
+
+class RedundantClientTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.patcher1 = mock.patch("socket.socket")
+        self.socket_mock = self.patcher1.start()
+        self.socket_mock.side_effect = self.new_socket
+        self.values = {"192.168.0.1": b"\x01\x00", "192.168.1.1": b"\x02\x00"}
+        self.down = set()
+
+    def tearDown(self) -> None:
+        self.patcher1.stop()
+
+    def new_socket(self, *args):
+        """UDPの接続先のモック、down に含まれる接続先は応答しない"""
+        sock = mock.NonCallableMagicMock(spec=_socket.socket)
+        frames = list()
+        addr = list()
+
+        def recv_into(buf):
+            if not frames:
+                return 0
+            req = frames.pop(0)
+            if addr[0] in self.down:
+                return 0
+            (cmd,) = struct.unpack("<H", req[15:17])
+            if cmd == SLMPCommand.Device_Read.value:
+                body = self.values[addr[0]]
+            else:
+                body = req[19:]
+            reply = (
+                b"\xD4\x00"
+                + req[2:11]
+                + struct.pack("<HH", len(body) + 2, 0)
+                + body
+            )
+            buf[: len(reply)] = reply
+            return len(reply)
+
+        sock.connect.side_effect = lambda a: addr.append(a[0])
+        sock.sendall.side_effect = frames.append
+        sock.recv_into.side_effect = recv_into
+        return sock
+
+    def test_failover(self):
+        switched = list()
+        a = RedundantClient(
+            SLMPClient("192.168.0.1"),
+            SLMPClient("192.168.1.1"),
+            probe_interval=0.05,
+            probe_timeout=1,
+        )
+        a.on_switch = switched.append
+        self.assertAlmostEqual(a.failover_bound, 0.6)
+        with a:
+            self.assertEqual(a.active, "primary")
+            ret = a.read_word_devices(DeviceCode.D, 0, 1, timeout=1)
+            self.assertListEqual(list(ret), [1])
+            # 実行中の要求は稼働系のタイムアウトで待機系に送り直す
+            self.down.add("192.168.0.1")
+            ret = a.read_word_devices(DeviceCode.D, 0, 1, timeout=1)
+            self.assertListEqual(list(ret), [2])
+            self.assertEqual(a.active, "standby")
+            self.assertIs(a.client, a.paths[1].client)
+            # 両系とも応答しない場合はタイムアウトする
+            self.down.add("192.168.1.1")
+            with self.assertRaises(TimeoutError):
+                a.self_test("01", timeout=1)
+        self.assertEqual(a.switchovers, 1)
+        self.assertListEqual(switched, ["standby"])
+
+
+if __name__ == "__main__":
+    unittest.main()
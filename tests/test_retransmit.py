@@ -0,0 +1,87 @@
+import _socket
+import struct
+import time
+import unittest
+from unittest import mock
+
+from pyslmpclient import SLMPClient
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.retransmit import Retransmitter
+from pyslmpclient.retransmit import RttEstimator
+
+
+class RttEstimatorTestCase(unittest.TestCase):
+    def test_rto(self):
+        a = RttEstimator(initial=0.2, min_rto=0.01, max_rto=1.0)
+        self.assertEqual(a.rto, 0.2)
+        self.assertIsNone(a.quantile(0.95))
+        a.update(0.1)
+        self.assertAlmostEqual(a.rto, 0.1 + 4 * 0.05)
+        for i in range(100):
+            a.update(0.001 * i)
+        self.assertAlmostEqual(a.quantile(0.95), 0.095)
+        self.assertGreaterEqual(a.rto, 0.01)
+
+
+class RetransmitterTestCase(unittest.TestCase):
+    def test_retransmit(self):
+        send = mock.Mock()
+        a = Retransmitter(send, max_retries=2, min_rto=0.01, max_rto=0.02)
+        try:
+            a.track(1, b"frame")
+            for _ in range(100):
+                if send.call_count >= 2:
+                    break
+                time.sleep(0.01)
+            send.assert_called_with(b"frame")
+            self.assertEqual(a.retransmits, 2)
+            self.assertTrue(a.done(1))
+            self.assertFalse(a.done(1))
+        finally:
+            a.stop()
+
+    def test_client(self):
+        frame = (
+            struct.pack("<HHH", 0xD4, 0, 0)
+            + b"\x00\xFF\xFF\x03\x00"
+            + struct.pack("<HH", 4, 0)
+            + b"\x34\x12"
+        )
+        with mock.patch("socket.socket") as socket_mock:
+            socket_instance_mock = mock.NonCallableMagicMock(
+                spec=_socket.socket
+            )
+            replies = [frame, frame]
+
+            def recv_into(buf):
+                # 最初の要求は失われたものとし、再送後に応答を2回返す
+                if socket_instance_mock.sendall.call_count < 2 or not replies:
+                    return 0
+                reply = replies.pop()
+                buf[: len(reply)] = reply
+                return len(reply)
+
+            socket_instance_mock.recv_into.side_effect = recv_into
+            socket_mock.return_value = socket_instance_mock
+            a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+            b = a.enable_retransmit(min_rto=0.01)
+            try:
+                with a:
+                    ret = a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)
+                    for _ in range(100):
+                        if not replies:
+                            break
+                        time.sleep(0.01)
+            finally:
+                a.disable_retransmit()
+        self.assertListEqual(list(ret), [0x1234])
+        self.assertGreaterEqual(b.retransmits, 1)
+        self.assertEqual(a.duplicate_replies, 1)
+        self.assertEqual(a.dropped_replies, 0)
+        self.assertEqual(a.expired_replies, 0)
+        with self.assertRaises(ValueError):
+            SLMPClient("192.168.0.1", tcp=True).enable_retransmit()
+
+
+if __name__ == "__main__":
+    unittest.main()
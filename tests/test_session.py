@@ -0,0 +1,87 @@
+import _socket
+import socket
+import struct
+import time
+import unittest
+from unittest import mock
+
+from pyslmpclient import SLMPClient
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.const import SLMPCommand
+from pyslmpclient.session import ResilientSession
+
+
+class ResilientSessionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.patcher1 = mock.patch("socket.socket")
+        self.socket_mock = self.patcher1.start()
+        self.socket_mock.side_effect = self.new_socket
+        self.sockets = list()
+
+    def tearDown(self) -> None:
+        self.patcher1.stop()
+
+    def new_socket(self, *args):
+        """TCPの接続先のモック、1つ目の接続は読み出し要求を受けると切断する"""
+        sock = mock.NonCallableMagicMock(spec=_socket.socket)
+        sock.commands = list()
+        frames = list()
+        drop = not self.sockets
+
+        def sendall(req):
+            (cmd,) = struct.unpack("<H", req[15:17])
+            sock.commands.append(cmd)
+            frames.append(req)
+
+        def recv_into(buf):
+            if not frames:
+                time.sleep(0.001)
+                raise socket.timeout()
+            req = frames.pop(0)
+            (cmd,) = struct.unpack("<H", req[15:17])
+            if cmd == SLMPCommand.Device_Read.value:
+                if drop:
+                    return 0
+                body = b"\x34\x12"
+            elif cmd == SLMPCommand.SelfTest.value:
+                body = req[19:]
+            else:
+                body = b""
+            reply = (
+                b"\xD4\x00"
+                + req[2:11]
+                + struct.pack("<HH", len(body) + 2, 0)
+                + body
+            )
+            buf[: len(reply)] = reply
+            return len(reply)
+
+        sock.sendall.side_effect = sendall
+        sock.recv_into.side_effect = recv_into
+        self.sockets.append(sock)
+        return sock
+
+    def test_reconnect(self):
+        client = SLMPClient("192.168.0.1", tcp=True)
+        with ResilientSession(client, backoff=0.01) as a:
+            a.remote_password_unlock("secret")
+            a.entry_monitor_device([(DeviceCode.D, 0), (DeviceCode.D, 1)], [])
+            # 切断された要求は再接続後に送り直す
+            ret = a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)
+            self.assertListEqual(list(ret), [0x1234])
+            self.assertEqual(a.reconnects, 1)
+            self.assertTrue(a.connected)
+        self.assertEqual(len(self.sockets), 2)
+        self.assertListEqual(
+            self.sockets[1].commands,
+            [
+                SLMPCommand.RemotePassword_Unlock.value,
+                SLMPCommand.Device_EntryMonitorDevice.value,
+                SLMPCommand.Device_Read.value,
+            ],
+        )
+        self.sockets[1].close.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
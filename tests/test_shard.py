@@ -0,0 +1,179 @@
+import itertools
+import struct
+import threading
+import time
+import unittest
+from unittest import mock
+
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.tag import DataType
+from pyslmpclient.tag import Tag
+
+try:
+    from multiprocessing import shared_memory
+    from pyslmpclient.shard import _SharedRing
+    from pyslmpclient.shard import _shard_worker
+    from pyslmpclient.shard import Endpoint
+    from pyslmpclient.shard import ShardedCollector
+except ImportError:
+    shared_memory = None
+
+
+@unittest.skipIf(shared_memory is None, "multiprocessing.shared_memory")
+class ShardTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.endpoint = Endpoint(
+            "plc1",
+            "192.168.0.1",
+            [
+                Tag("a", DeviceCode.D, 100, DataType.INT),
+                Tag("b", DeviceCode.D, 102, DataType.REAL),
+            ],
+            interval=0.01,
+        )
+
+    def test_worker(self):
+        plan = self.endpoint.plan()
+        shm = shared_memory.SharedMemory(
+            create=True, size=_SharedRing.size(plan, 8)
+        )
+        shm.buf[:] = bytes(shm.size)
+        ring = _SharedRing(shm, plan, 8)
+        stop = threading.Event()
+        try:
+            with mock.patch("pyslmpclient.shard.SLMPClient") as client:
+                client.return_value.read_block_raw.return_value = struct.pack(
+                    "<hxxf", 3, 0.5
+                )
+                t = threading.Thread(
+                    target=_shard_worker,
+                    args=([self.endpoint], [shm.name], 8, stop),
+                )
+                t.start()
+                for _ in range(100):
+                    if ring.count >= 3:
+                        break
+                    time.sleep(0.01)
+                stop.set()
+                t.join()
+            client.return_value.open.assert_called_once_with()
+            client.return_value.close.assert_called_once_with()
+            self.assertGreaterEqual(ring.count, 3)
+            self.assertEqual(ring.column("a", last=1)[0][0], 3)
+            self.assertEqual(ring.errors, 0)
+        finally:
+            ring.close()
+            shm.close()
+            shm.unlink()
+
+    def test_worker_reconnect(self):
+        plan = self.endpoint.plan()
+        shm = shared_memory.SharedMemory(
+            create=True, size=_SharedRing.size(plan, 8)
+        )
+        shm.buf[:] = bytes(shm.size)
+        ring = _SharedRing(shm, plan, 8)
+        stop = threading.Event()
+        client = mock.Mock()
+        raw = struct.pack("<hxxf", 3, 0.5)
+        client.read_block_raw.side_effect = itertools.chain(
+            [ConnectionResetError()], itertools.repeat(raw)
+        )
+        try:
+            with mock.patch.object(Endpoint, "client", return_value=client):
+                t = threading.Thread(
+                    target=_shard_worker,
+                    args=([self.endpoint], [shm.name], 8, stop),
+                )
+                t.start()
+                for _ in range(100):
+                    if ring.count >= 2:
+                        break
+                    time.sleep(0.01)
+                stop.set()
+                t.join()
+            # 読み出しに失敗した接続は閉じて、接続し直してから読み出しを続ける
+            self.assertGreaterEqual(ring.count, 2)
+            self.assertEqual(ring.errors, 1)
+            self.assertEqual(client.open.call_count, 2)
+            self.assertEqual(client.close.call_count, 2)
+        finally:
+            ring.close()
+            shm.close()
+            shm.unlink()
+
+    def test_worker_unreachable(self):
+        down = Endpoint(
+            "plc2",
+            "192.168.0.2",
+            self.endpoint.tags,
+            interval=0.01,
+            backoff=0.01,
+            max_backoff=0.02,
+        )
+        plan = self.endpoint.plan()
+        shms = [
+            shared_memory.SharedMemory(
+                create=True, size=_SharedRing.size(plan, 8)
+            )
+            for _ in range(2)
+        ]
+        rings = []
+        for shm in shms:
+            shm.buf[:] = bytes(shm.size)
+            rings.append(_SharedRing(shm, plan, 8))
+        stop = threading.Event()
+        up_client = mock.Mock()
+        up_client.read_block_raw.return_value = struct.pack("<hxxf", 3, 0.5)
+        down_client = mock.Mock()
+        down_client.open.side_effect = ConnectionRefusedError()
+        try:
+            with mock.patch.object(
+                Endpoint, "client", side_effect=[down_client, up_client]
+            ):
+                t = threading.Thread(
+                    target=_shard_worker,
+                    args=(
+                        [down, self.endpoint],
+                        [shm.name for shm in shms],
+                        8,
+                        stop,
+                    ),
+                )
+                t.start()
+                for _ in range(100):
+                    if rings[1].count >= 3 and rings[0].errors >= 2:
+                        break
+                    time.sleep(0.01)
+                stop.set()
+                t.join()
+            # 接続できない接続先があっても他の接続先の読み出しは続ける
+            self.assertGreaterEqual(rings[1].count, 3)
+            self.assertEqual(rings[1].errors, 0)
+            self.assertEqual(rings[0].count, 0)
+            self.assertGreaterEqual(rings[0].errors, 2)
+            self.assertEqual(down_client.open.call_count, rings[0].errors)
+            down_client.close.assert_not_called()
+            up_client.close.assert_called_once_with()
+        finally:
+            for ring in rings:
+                ring.close()
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+    def test_collector(self):
+        with mock.patch("multiprocessing.Process") as process:
+            with ShardedCollector([self.endpoint], shards=4) as a:
+                self.assertEqual(process.call_count, 1)
+                self.assertIsNone(a.read("plc1"))
+                a.ring("plc1")._write(struct.pack("<hxxf", -2, 1.5), 1.0)
+                self.assertDictEqual(a.read("plc1"), {"a": -2, "b": 1.5})
+                self.assertListEqual(
+                    list(a.column("plc1", "timestamp")[0]), [1.0]
+                )
+            process.return_value.join.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
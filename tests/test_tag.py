@@ -0,0 +1,152 @@
+import struct
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from pyslmpclient.const import DeviceCode
+from pyslmpclient.tag import DataType
+from pyslmpclient.tag import dump_tags
+from pyslmpclient.tag import load_tags
+from pyslmpclient.tag import ReadPlan
+from pyslmpclient.tag import Tag
+from pyslmpclient.tag import write_tags
+
+
+class TagTestCase(unittest.TestCase):
+    def test_encode(self):
+        a = Tag("a", DeviceCode.D, 0, DataType.DINT)
+        self.assertEqual(a.words, 2)
+        self.assertListEqual(a.encode_words(0x12345678), [0x5678, 0x1234])
+        b = Tag("b", DeviceCode.D, 0, DataType.STRING, length=5)
+        self.assertEqual(b.words, 3)
+        with self.assertRaises(ValueError):
+            Tag("m", DeviceCode.M, 0)
+        self.assertEqual(b.encode("ABC"), b"ABC\x00\x00\x00")
+        c = Tag("c", DeviceCode.D, 0, DataType.BCD, count=2)
+        self.assertEqual(c.encode([1234, 56]), b"\x34\x12\x56\x00")
+
+
+class ReadPlanTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tags = [
+            Tag("real", DeviceCode.D, 102, DataType.REAL),
+            Tag("int", DeviceCode.D, 100, DataType.INT, count=2),
+            Tag("low", DeviceCode.D, 102, DataType.UINT),
+            Tag("str", DeviceCode.W, 0x10, DataType.STRING, length=4),
+            Tag("bcd", DeviceCode.D, 200, DataType.BCD),
+        ]
+
+    def test_plan(self):
+        a = ReadPlan(self.tags)
+        self.assertListEqual(
+            a.frames,
+            [
+                [
+                    (DeviceCode.D, 100, 4),
+                    (DeviceCode.D, 200, 1),
+                    (DeviceCode.W, 0x10, 2),
+                ]
+            ],
+        )
+        self.assertEqual(a.size, 14)
+        self.assertDictEqual(
+            a.offsets, {"int": 0, "real": 4, "low": 4, "bcd": 8, "str": 10}
+        )
+
+    def test_layout(self):
+        a = ReadPlan(self.tags)
+        b = ReadPlan(self.tags, layout=a.layout)
+        self.assertEqual(b.struct.format, a.struct.format)
+        frames, offsets = a.layout
+        for name, offset in (("str", 12), ("int", -2)):
+            with self.subTest(name=name):
+                broken = dict(offsets)
+                broken[name] = offset
+                with self.assertRaisesRegex(ValueError, "配置の範囲外"):
+                    ReadPlan(self.tags, layout=(frames, broken))
+        with self.assertRaisesRegex(ValueError, "配置の範囲外"):
+            ReadPlan(self.tags, layout=([frames[0][:2]], offsets))
+        bits = [[(DeviceCode.M, s, n) for _, s, n in frames[0]]]
+        with self.assertRaisesRegex(ValueError, "ビットデバイス"):
+            ReadPlan(self.tags, layout=(bits, offsets))
+
+    def test_dump(self):
+        buf = dump_tags(self.tags, 5)
+        tags, max_gap = load_tags(buf)
+        self.assertEqual(max_gap, 5)
+        self.assertEqual(repr(tags), repr(self.tags))
+        self.assertEqual(dump_tags(tags, max_gap), buf)
+
+    def test_read(self):
+        a = ReadPlan(self.tags)
+        raw = (
+            struct.pack("<hhf", -1, 2, 1.5)
+            + b"\x34\x12"
+            + b"AB\x00\x00"
+        )
+        client = mock.MagicMock()
+        client.read_block_raw.return_value = raw
+        b = a.read(client)
+        client.read_block_raw.assert_called_once_with(a.frames[0], [], 0)
+        self.assertDictEqual(
+            b,
+            {
+                "int": (-1, 2),
+                "real": 1.5,
+                "low": 0,
+                "bcd": 1234,
+                "str": "AB",
+            },
+        )
+        d = np.frombuffer(raw, a.dtype)
+        self.assertEqual(d["real"][0], 1.5)
+        self.assertListEqual(list(d["int"][0]), [-1, 2])
+
+    def test_split(self):
+        tags = [
+            Tag("t%d" % i, DeviceCode.D, i * 400, DataType.LREAL, count=100)
+            for i in range(3)
+        ]
+        a = ReadPlan(tags)
+        self.assertListEqual(
+            a.frames, [[(DeviceCode.D, 0, 960)], [(DeviceCode.D, 960, 240)]]
+        )
+        raw = struct.pack("<300d", *range(300))
+        client = mock.MagicMock()
+        client.read_block_raw.side_effect = [raw[:1920], raw[1920:]]
+        b = a.read(client)
+        self.assertTupleEqual(
+            b["t2"], tuple(float(x) for x in range(200, 300))
+        )
+
+
+class WriteTagsTestCase(unittest.TestCase):
+    def test_write(self):
+        client = mock.MagicMock()
+        write_tags(
+            client,
+            [
+                (Tag("a", DeviceCode.D, 100, DataType.DINT), 0x10002),
+                (Tag("b", DeviceCode.W, 0, DataType.REAL), 1.0),
+            ],
+        )
+        client.write_block.assert_called_once_with(
+            [
+                (DeviceCode.D, 100, 2, [2, 1]),
+                (DeviceCode.W, 0, 2, [0, 0x3F80]),
+            ],
+            [],
+            0,
+        )
+
+    def test_oversize(self):
+        client = mock.MagicMock()
+        tag = Tag("a", DeviceCode.D, 0, DataType.LREAL, count=241)
+        with self.assertRaises(ValueError):
+            write_tags(client, [(tag, [0.0] * 241)])
+        client.write_block.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from pyslmpclient.timer import TimerWheel
+
+
+class TimerWheelTestCase(unittest.TestCase):
+    def test_advance(self):
+        a = TimerWheel(0.0, tick=0.25, size=8)
+        a.add("a", 0.5, 0.0)
+        a.add("b", 1.0, 0.0)
+        a.add("c", 10.0, 0.0)
+        self.assertEqual(len(a), 3)
+        self.assertListEqual(a.advance(0.5), [])
+        self.assertListEqual(a.advance(0.8), ["a"])
+        self.assertTrue(a.cancel("b"))
+        self.assertFalse(a.cancel("b"))
+        # スロットを一巡しても期限前のものは残る
+        self.assertListEqual(a.advance(5.0), [])
+        self.assertIn("c", a)
+        self.assertListEqual(a.advance(100.0), ["c"])
+        self.assertEqual(len(a), 0)
+
+    def test_replace(self):
+        a = TimerWheel(0.0)
+        a.add(1, 0.25, 0.0)
+        a.add(1, 2.0, 0.0)
+        self.assertListEqual(a.advance(1.0), [])
+        self.assertListEqual(a.advance(2.5), [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
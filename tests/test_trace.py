@@ -0,0 +1,108 @@
+import _socket
+import io
+import json
+import struct
+import unittest
+from unittest import mock
+
+from pyslmpclient import SLMPClient
+from pyslmpclient.const import DeviceCode
+
+from pyslmpclient.trace import FrameTracer
+from pyslmpclient.trace import RECV
+from pyslmpclient.trace import SEND
+
+
+class FrameTracerTestCase(unittest.TestCase):
+    def test_ring(self):
+        a = FrameTracer(capacity=3, every=2)
+        for i in range(10):
+            a.record(SEND, bytes([i]))
+        self.assertEqual(a.seen, 10)
+        self.assertEqual(a.skipped, 5)
+        self.assertListEqual(
+            [f for _, _, f in a.snapshot()], [b"\x05", b"\x07", b"\x09"]
+        )
+        b = FrameTracer(max_rate=2)
+        for i in range(5):
+            b.record(RECV, bytes([i]), 100.0 + i * 0.1)
+        b.record(RECV, b"\x05", 101.0)
+        self.assertEqual(b.skipped, 3)
+        self.assertListEqual(
+            [f for _, _, f in b.snapshot()], [b"\x00", b"\x01", b"\x05"]
+        )
+
+    def test_export(self):
+        a = FrameTracer()
+        a.record(SEND, b"\x54\x00")
+        a.record(RECV, memoryview(b"\xD4\x00\x01"))
+        fp = io.StringIO()
+        self.assertEqual(a.to_jsonl(fp), 2)
+        lines = [json.loads(x) for x in fp.getvalue().splitlines()]
+        self.assertEqual(lines[1]["dir"], "rx")
+        self.assertEqual(lines[1]["data"], "d40001")
+        fp = io.BytesIO()
+        self.assertEqual(a.to_pcap(fp, ("192.168.0.1", 5000)), 2)
+        buf = fp.getvalue()
+        self.assertEqual(struct.unpack("<I", buf[:4])[0], 0xA1B2C3D4)
+        self.assertEqual(struct.unpack("<I", buf[20:24])[0], 101)
+        (length,) = struct.unpack("<I", buf[32:36])
+        self.assertEqual(length, 20 + 8 + 2)
+        packet = buf[40 : 40 + length]
+        self.assertEqual(packet[16:20], bytes([192, 168, 0, 1]))
+        self.assertEqual(packet[-2:], b"\x54\x00")
+        # IPヘッダのチェックサムの検証
+        total = sum(struct.unpack("!10H", packet[:20]))
+        total = (total & 0xFFFF) + (total >> 16)
+        self.assertEqual(total, 0xFFFF)
+
+    def test_client(self):
+        reply = (
+            struct.pack("<HHH", 0xD4, 0, 0)
+            + b"\x00\xFF\xFF\x03\x00"
+            + struct.pack("<HH", 4, 0)
+            + b"\x34\x12"
+        )
+        with mock.patch("socket.socket") as socket_mock:
+            socket_instance_mock = mock.NonCallableMagicMock(
+                spec=_socket.socket
+            )
+            stream = io.BytesIO(reply)
+
+            def recv_into(buf):
+                # 要求を送信してから応答を返す
+                if not socket_instance_mock.sendall.called:
+                    return 0
+                return stream.readinto(buf)
+
+            socket_instance_mock.recv_into.side_effect = recv_into
+            socket_mock.return_value = socket_instance_mock
+            a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+            a.tracer = FrameTracer()
+            with a:
+                a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)
+        frames = {d: f for _, d, f in a.tracer.snapshot()}
+        self.assertEqual(frames[RECV], reply)
+        self.assertEqual(
+            frames[SEND], socket_instance_mock.sendall.call_args[0][0]
+        )
+
+    def test_client_send_error(self):
+        with mock.patch("socket.socket") as socket_mock:
+            socket_instance_mock = mock.NonCallableMagicMock(
+                spec=_socket.socket
+            )
+            socket_instance_mock.recv_into.return_value = 0
+            socket_instance_mock.sendall.side_effect = BrokenPipeError()
+            socket_mock.return_value = socket_instance_mock
+            a = SLMPClient(addr="192.168.0.1", port=5000, binary=True, ver=4)
+            a.tracer = FrameTracer()
+            with a:
+                with self.assertRaises(BrokenPipeError):
+                    a.read_word_devices(DeviceCode.D, 0, 1, timeout=4)
+        # 送信できなかったフレームは記録しない
+        self.assertListEqual(a.tracer.snapshot(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,24 @@
 import unittest
+from array import array
 
+import numpy as np
+
+from pyslmpclient.const import DeviceCode
 from pyslmpclient.const import SLMPCommand
 from pyslmpclient.util import decode_bcd
+from pyslmpclient.util import device2ascii
+from pyslmpclient.util import device2binary
 from pyslmpclient.util import encode_bcd
+from pyslmpclient.util import hex2words
 from pyslmpclient.util import make_ascii_frame
 from pyslmpclient.util import make_binary_frame
 from pyslmpclient.util import pack_bits
+from pyslmpclient.util import LRUCache
 from pyslmpclient.util import Target
 from pyslmpclient.util import unpack_bits
+from pyslmpclient.util import unpack_word_bits
+from pyslmpclient.util import word_buffer
+from pyslmpclient.util import words2hex
 
 
 class BCDTestCase(unittest.TestCase):
@@ -54,6 +65,13 @@ class BitPackTestCase(unittest.TestCase):
             b, [0, 0, 1, 0, 1, 1, 0, 0, 0, 1, 0, 0, 1, 0, 0, 0], list
         )
 
+    def test_unpack_word_bits(self):
+        b = unpack_word_bits(b"\x34\x12")
+        self.assertListEqual(
+            b.tolist(),
+            [bool(x) for x in unpack_bits([0x34, 0x12])],
+        )
+
     def test_pack_unpack(self):
         a = [0x34, 0x12, 0x02, 0x00]
         b = unpack_bits(a)
@@ -61,6 +79,74 @@ class BitPackTestCase(unittest.TestCase):
         self.assertSequenceEqual(a, c, list)
 
 
+class DeviceTestCase(unittest.TestCase):
+    def test_device2ascii(self):
+        self.assertEqual(device2ascii(DeviceCode.D, 100), b"D*000100")
+        self.assertEqual(device2ascii(DeviceCode.X, 0x1F), b"X*00001F")
+        self.assertEqual(
+            device2ascii(DeviceCode.SS, 12, True), b"STS*00000012"
+        )
+        self.assertEqual(
+            device2ascii(DeviceCode.ZR, 0x1000000, True), b"ZR**01000000"
+        )
+
+    def test_device2binary(self):
+        self.assertEqual(
+            device2binary(DeviceCode.D, 100), b"\x64\x00\x00\xA8"
+        )
+        self.assertEqual(
+            device2binary(DeviceCode.LZ, 1, True),
+            b"\x01\x00\x00\x00\x62\x00",
+        )
+
+
+class HexTestCase(unittest.TestCase):
+    def test_hex2words(self):
+        self.assertEqual(hex2words("12340002"), b"\x34\x12\x02\x00")
+
+    def test_word_buffer(self):
+        expected = b"\x34\x12\x02\x00"
+        for data in (
+            [0x1234, 2],
+            array("H", [0x1234, 2]),
+            np.array([0x1234, 2], ">u2"),
+            np.array([[0x1234], [2]], "i4")[:, 0],
+            expected,
+            bytearray(expected),
+        ):
+            with self.subTest(data=data):
+                self.assertEqual(bytes(word_buffer(data)), expected)
+        a = np.array([0x1234, 2], "<u2")
+        b = word_buffer(a)
+        a[1] = 0xABCD  # コピーせずに使う
+        self.assertEqual(words2hex(b), b"1234ABCD")
+
+
+class TargetTestCase(unittest.TestCase):
+    def test_header(self):
+        a = Target(2, 3, 4, 5)
+        self.assertEqual(a.binary_header, b"\x02\x03\x04\x00\x05")
+        self.assertEqual(a.ascii_header, b"0203000405")
+        a.dst_proc = 0x3FF
+        self.assertEqual(a.binary_header, b"\x02\x03\xff\x03\x05")
+        self.assertEqual(a.ascii_header, b"020303FF05")
+        with self.assertRaises(AttributeError):
+            a.extra = 1
+
+
+class LRUCacheTestCase(unittest.TestCase):
+    def test_bound(self):
+        a = LRUCache(2)
+        a.put("a", 1)
+        a.put("b", 2)
+        self.assertEqual(a.get("a"), 1)
+        a.put("c", 3)
+        self.assertEqual(len(a), 2)
+        self.assertIsNone(a.get("b"))
+        self.assertEqual(a.get("a"), 1)
+        self.assertEqual(a.get("c"), 3)
+
+
 class MakeFrameTestCase(unittest.TestCase):
     def test_make_binary_frame(self):
         seq = 1
@@ -100,6 +186,13 @@ class MakeFrameTestCase(unittest.TestCase):
             header_4e + target_bytes + data_length + timer_bytes + cmd_text,
             bytes,
         )
+        frags = (b"\x05\x00", memoryview(b"ABCDE"))
+        self.assertEqual(
+            make_binary_frame(
+                seq, target, timeout, SLMPCommand.SelfTest, 0x0, frags, 4
+            ),
+            buf,
+        )
 
     def test_make_ascii_frame(self):
         seq = 1